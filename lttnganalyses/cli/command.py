@@ -29,14 +29,31 @@ import re
 import sys
 import subprocess
 import traceback
-from babeltrace import TraceCollection
+from babeltrace import CTFScope, TraceCollection
 from . import mi, progressbar, period_parsing
 from .. import __version__
 from ..core import analysis, period as core_period
 from ..common import (
-    format_utils, parse_utils, trace_utils, version_utils
+    ctf_utils, event_cache, event_pipeline, format_utils, parse_utils,
+    stats_utils, trace_utils, version_utils
 )
-from ..linuxautomaton import automaton
+from ..linuxautomaton import automaton, checkpoint
+
+
+def _read_trace_events(path, intersect_mode, seek_ts, end_ts):
+    # Runs in the decoder process of the event pipeline, which opens
+    # its own trace collection.
+    if intersect_mode is None:
+        traces = TraceCollection()
+    else:
+        traces = TraceCollection(intersect_mode=intersect_mode)
+
+    traces.add_traces_recursive(path, 'ctf')
+
+    if seek_ts is None:
+        return traces.events
+
+    return traces.events_timestamps(seek_ts, end_ts)
 
 
 class Command:
@@ -50,6 +67,33 @@ class Command:
     _VERSION = version_utils.Version.new_from_string(__version__)
     _BT_INTERSECT_VERSION = version_utils.Version(1, 4, 0)
     _DEBUG_ENV_VAR = 'LTTNG_ANALYSES_DEBUG'
+    _ARGS_CONFLICT_HANDLER = 'error'
+    # Percentiles of the statistics tables: (column key prefix,
+    # percentile)
+    _PERCENTILES = [
+        ('p50', 50),
+        ('p90', 90),
+        ('p99', 99),
+        ('p99_9', 99.9),
+    ]
+    # Fields of the cached or pipelined events, in lookup order. The
+    # CPU ID is the only packet context field used by the state
+    # providers.
+    _EVENT_SCOPES = [
+        (CTFScope.EVENT_FIELDS, None),
+        (CTFScope.EVENT_CONTEXT, None),
+        (CTFScope.STREAM_EVENT_CONTEXT, None),
+        (CTFScope.STREAM_PACKET_CONTEXT, ('cpu_id',)),
+    ]
+    # All the fields, which period definitions can refer to
+    _ALL_EVENT_SCOPES = [
+        (CTFScope.EVENT_FIELDS, None),
+        (CTFScope.EVENT_CONTEXT, None),
+        (CTFScope.STREAM_EVENT_CONTEXT, None),
+        (CTFScope.STREAM_EVENT_HEADER, None),
+        (CTFScope.STREAM_PACKET_CONTEXT, None),
+        (CTFScope.TRACE_PACKET_HEADER, None),
+    ]
 
     def __init__(self, mi_mode=False):
         self._analysis = None
@@ -59,6 +103,10 @@ class Command:
         self._handles = None
         self._traces = None
         self._period_ticks = 0
+        self._resume_ts = None
+        self._mi_results_sink = None
+        self._event_cache = None
+        self._event_cache_signature = None
         self._mi_mode = mi_mode
         self._debug_mode = os.environ.get(self._DEBUG_ENV_VAR)
         self._run_step('create automaton', self._create_automaton)
@@ -138,12 +186,15 @@ class Command:
         return mi.ResultTable(self._mi_table_classes[table_class_name],
                               begin, end, subtitle)
 
-    def _mi_setup(self):
+    def _mi_setup(self, table_class_prefix=''):
+        # The table classes are indexed by their name in
+        # _MI_TABLE_CLASSES, whatever the prefix of their MI name.
         self._mi_table_classes = {}
 
         for tc_tuple in self._MI_TABLE_CLASSES:
-            table_class = mi.TableClass(tc_tuple[0], tc_tuple[1], tc_tuple[2])
-            self._mi_table_classes[table_class.name] = table_class
+            table_class = mi.TableClass(table_class_prefix + tc_tuple[0],
+                                        tc_tuple[1], tc_tuple[2])
+            self._mi_table_classes[tc_tuple[0]] = table_class
 
         self._mi_clear_result_tables()
 
@@ -161,7 +212,11 @@ class Command:
             return
 
         tc_name = result_table.table_class.name
-        self._mi_get_result_tables(tc_name).append(result_table)
+
+        if tc_name not in self._result_tables:
+            self._result_tables[tc_name] = []
+
+        self._result_tables[tc_name].append(result_table)
 
     def _mi_append_result_tables(self, result_tables):
         if not result_tables:
@@ -174,10 +229,13 @@ class Command:
         self._result_tables = {}
 
     def _mi_get_result_tables(self, table_class_name):
-        if table_class_name not in self._result_tables:
-            self._result_tables[table_class_name] = []
+        # The result tables are indexed by the MI name of their class
+        tc_name = self._mi_table_classes[table_class_name].name
 
-        return self._result_tables[table_class_name]
+        if tc_name not in self._result_tables:
+            self._result_tables[tc_name] = []
+
+        return self._result_tables[tc_name]
 
     def _mi_print(self):
         results = []
@@ -186,6 +244,12 @@ class Command:
             for result_table in result_tables:
                 results.append(result_table.to_native_object())
 
+        # Part of a multi-analysis command, which prints the results
+        # of all its analyses at once.
+        if self._mi_results_sink is not None:
+            self._mi_results_sink.extend(results)
+            return
+
         obj = {
             'results': results,
         }
@@ -221,6 +285,24 @@ class Command:
             self._check_lost_events()
         if not self._check_period_args():
             self._gen_error('Invalid period parameters')
+        self._load_checkpoint()
+        self._open_event_cache()
+
+    def _load_checkpoint(self):
+        begin_ts = self._analysis_conf.begin_ts
+
+        if begin_ts is None or self._checkpoint_dir is None:
+            return
+
+        loaded = checkpoint.load_checkpoint(self._checkpoint_dir,
+                                            self._args.path, begin_ts,
+                                            self._state_notifications())
+
+        if loaded is None:
+            return
+
+        self._resume_ts, self._automaton = loaded
+        self.state = self._automaton.state
 
     def _close_trace(self):
         for handle in self._handles.values():
@@ -293,6 +375,29 @@ class Command:
         if self._mi_mode and self._args.output_progress:
             mi.print_progress(0, msg)
 
+        try:
+            lost_events = ctf_utils.get_lost_events(self._args.path)
+        except (ctf_utils.UnsupportedTraceError, OSError):
+            # Fallback to a full decode, babeltrace reports the lost
+            # events itself.
+            self._check_lost_events_babeltrace()
+            return
+
+        for stream in lost_events:
+            if stream.cpu_id is None:
+                location = stream.path
+            else:
+                location = '{} (CPU {})'.format(stream.path, stream.cpu_id)
+
+            if stream.discarded:
+                self._warn('Tracer discarded {} events in {}'.format(
+                    stream.discarded, location))
+
+            if stream.missing_packets:
+                self._warn('{} packets are missing in {}'.format(
+                    stream.missing_packets, location))
+
+    def _check_lost_events_babeltrace(self):
         try:
             subprocess.check_output('babeltrace "%s"' % self._args.path,
                                     shell=True)
@@ -353,8 +458,14 @@ class Command:
                 self._gen_error('Trace has no intersection. '
                                 'Use --no-intersection to override')
 
+        checkpoint_writer = None
+        if self._checkpoint_interval_ns is not None:
+            checkpoint_writer = checkpoint.CheckpointWriter(
+                self._automaton, self._checkpoint_dir, self._args.path,
+                self._checkpoint_interval_ns)
+
         first_event = True
-        for event in self._traces.events:
+        for event in self._get_events():
             if first_event is True:
                 self._analysis.begin_analysis(event)
                 first_event = False
@@ -362,12 +473,171 @@ class Command:
             self._analysis.process_event(event)
             if self._analysis.ended:
                 break
+            if checkpoint_writer is not None:
+                checkpoint_writer.process_event(event)
             self._automaton.process_event(event)
 
         self._pb_finish()
+
+        if checkpoint_writer is not None and \
+                checkpoint_writer.error is not None:
+            self._warn('Cannot write state checkpoints: {}'.format(
+                checkpoint_writer.error))
+
+        self._check_evicted_block_requests()
         self._analysis.end_analysis()
         self._post_analysis()
 
+    def _check_evicted_block_requests(self):
+        state = self._automaton.state
+
+        if state.evicted_block_remaps:
+            self._warn('Evicted {} stale block remap requests'.format(
+                state.evicted_block_remaps))
+
+        if state.evicted_block_rqs:
+            self._warn('Evicted {} block I/O requests without '
+                       'completion'.format(state.evicted_block_rqs))
+
+    def _get_seek_ts(self):
+        # Timestamp from which the events must be read, None to read
+        # them from the beginning of the trace.
+
+        # A checkpoint holds the exact state at the time it was taken,
+        # so it is preferred over a warm-up window.
+        if self._resume_ts is not None:
+            return self._resume_ts
+
+        begin_ts = self._analysis_conf.begin_ts
+
+        if begin_ts is None or self._warmup_ns is None:
+            return None
+
+        # The state is only partially known for the events of the
+        # warm-up window, the analysis itself starts at begin_ts.
+        seek_ts = max(begin_ts - self._warmup_ns, 0)
+
+        try:
+            first_ts = ctf_utils.get_first_packet_timestamp(
+                self._args.path, seek_ts, self._analysis_conf.end_ts)
+        except (ctf_utils.UnsupportedTraceError, OSError):
+            first_ts = None
+
+        # Nothing to skip if the warm-up window starts within the
+        # first packets of the trace.
+        if first_ts is not None and self._ts_begin is not None and \
+                first_ts <= self._ts_begin:
+            return None
+
+        return seek_ts
+
+    def _get_events(self):
+        seek_ts = self._get_seek_ts()
+        end_ts = self._analysis_conf.end_ts
+
+        if self._event_cache is not None:
+            return self._event_cache.events(seek_ts, end_ts)
+
+        # The cache can only be built from a run over the whole trace
+        build_cache = self._event_cache_signature is not None and \
+            seek_ts is None and end_ts is None
+
+        if self._args.pipeline:
+            events = self._get_pipeline_events(seek_ts, end_ts, build_cache)
+        elif seek_ts is not None:
+            events = self._traces.events_timestamps(seek_ts, end_ts)
+        else:
+            events = self._traces.events
+
+        if build_cache:
+            return self._build_event_cache(events)
+
+        return events
+
+    def _get_pipeline_events(self, seek_ts, end_ts, build_cache=False):
+        intersect_mode = None
+
+        if self._babeltrace_version >= self._BT_INTERSECT_VERSION:
+            intersect_mode = self._args.intersect_mode
+
+        # Without period definitions, only the fields of the events
+        # handled by the state providers are of interest. The analysis
+        # still gets the timestamps of all the events.
+        if self._analysis_conf.period_def_registry.is_empty:
+            scopes = self._EVENT_SCOPES
+
+            if build_cache:
+                event_filter = self._get_cache_event_filter()
+            else:
+                event_filter = self._automaton.get_event_filter()
+        else:
+            scopes = self._ALL_EVENT_SCOPES
+            event_filter = None
+
+        pipeline = event_pipeline.EventPipeline(
+            _read_trace_events,
+            (self._args.path, intersect_mode, seek_ts, end_ts),
+            scopes, event_filter)
+
+        return pipeline.events()
+
+    def _get_event_cache_dir(self):
+        return os.path.join(self._args.path, event_cache.CACHE_DIRNAME)
+
+    def _open_event_cache(self):
+        # Only the fields of the events consumed by the state providers
+        # are cached, the period definitions can match any event.
+        if not self._args.cache or \
+                not self._analysis_conf.period_def_registry.is_empty:
+            return
+
+        self._event_cache_signature = trace_utils.get_trace_signature(
+            self._args.path)
+        self._event_cache = event_cache.EventCache.open(
+            self._get_event_cache_dir(), self._event_cache_signature)
+
+    def _get_cache_event_filter(self):
+        # The event cache is shared by all the commands, so it holds
+        # the events of all the state providers, not only of the ones
+        # run for this command.
+        return automaton.Automaton().get_event_filter()
+
+    def _build_event_cache(self, events):
+        try:
+            writer = event_cache.EventCacheWriter(
+                self._get_event_cache_dir(), self._event_cache_signature,
+                self._EVENT_SCOPES, self._get_cache_event_filter())
+        except OSError as e:
+            self._warn('Cannot create the event cache: {}'.format(e))
+            writer = None
+
+        try:
+            for event in events:
+                if writer is not None:
+                    try:
+                        writer.add_event(event)
+                    except (event_cache.EventCacheError, OSError) as e:
+                        self._warn(
+                            'Cannot build the event cache: {}'.format(e))
+                        writer.abort()
+                        writer = None
+
+                yield event
+
+            if writer is not None:
+                try:
+                    writer.finalize()
+                except OSError as e:
+                    self._warn('Cannot build the event cache: {}'.format(e))
+                    writer.abort()
+
+                writer = None
+        finally:
+            # The events were not all consumed (e.g. error or
+            # interrupted analysis): drop the partial cache
+            if writer is not None:
+                writer.abort()
+
     def _print_date(self, begin_ns, end_ns):
         time_range_str = format_utils.format_time_range(
             begin_ns, end_ns, print_date=True, gmt=self._args.gmt
@@ -390,6 +660,49 @@ class Command:
     def _uniform_freq_step(self, category='default'):
         return self._analysis_conf.uniform_step[category]
 
+    @staticmethod
+    def _get_percentile_column_infos(suffix, title):
+        # MI column infos of the percentiles of a statistics table,
+        # keyed `<prefix>_<suffix>` (see _get_percentile_row_values())
+        return [
+            ('{}_{}'.format(prefix, suffix),
+             '{:g}th percentile {}'.format(percentile, title), mi.Duration)
+            for prefix, percentile in Command._PERCENTILES
+        ]
+
+    def _get_percentile_row_values(self, hist, suffix):
+        # MI values of the percentile columns of a row, from a
+        # stats.LogLinearHistogram
+        values = {}
+
+        for prefix, percentile in self._PERCENTILES:
+            key = '{}_{}'.format(prefix, suffix)
+
+            if hist.count == 0:
+                values[key] = mi.Unknown()
+            else:
+                values[key] = mi.Duration(hist.quantile(percentile / 100))
+
+        return values
+
+    def _get_percentile_headers(self):
+        return ['p{:g}'.format(percentile)
+                for prefix, percentile in self._PERCENTILES]
+
+    def _get_percentile_strs(self, row, suffix):
+        # Human-readable percentiles of a row, in µs
+        strs = []
+
+        for prefix, percentile in self._PERCENTILES:
+            value = getattr(row, '{}_{}'.format(prefix, suffix))
+
+            if type(value) is mi.Unknown:
+                strs.append('?')
+            else:
+                strs.append('%0.03f' % value.to_us())
+
+        return strs
+
     def _find_uniform_freq_values(self, durations, ratio=1000,
                                   category='default'):
         if category not in self._analysis_conf.uniform_step.keys():
@@ -397,28 +710,31 @@ class Command:
             self._analysis_conf.uniform_max[category] = None
             self._analysis_conf.uniform_step[category] = None
 
+        if self._args.min is None or self._args.max is None:
+            summary = stats_utils.summarize(durations)
+
         if self._args.min is not None:
             self._analysis_conf.uniform_min[category] = self._args.min
         else:
-            if len(durations) == 0:
+            if summary.count == 0:
                 self._analysis_conf.uniform_min[category] = 0
             else:
                 if self._analysis_conf.uniform_min[category] is None or \
-                        min(durations) / ratio < \
+                        summary.min / ratio < \
                         self._analysis_conf.uniform_min[category]:
                     self._analysis_conf.uniform_min[category] = \
-                        min(durations) / ratio
+                        summary.min / ratio
         if self._args.max is not None:
             self._analysis_conf.uniform_max[category] = self._args.max
         else:
-            if len(durations) == 0:
+            if summary.count == 0:
                 self._analysis_conf.uniform_max[category] = 0
             else:
                 if self._analysis_conf.uniform_max[category] is None or \
-                        max(durations) / ratio > \
+                        summary.max / ratio > \
                         self._analysis_conf.uniform_max[category]:
                     self._analysis_conf.uniform_max[category] = \
-                        max(durations) / ratio
+                        summary.max / ratio
 
         # ns to µs
         self._analysis_conf.uniform_step[category] = (
@@ -430,6 +746,73 @@ class Command:
             self._analysis_conf.uniform_max[category], \
             self._analysis_conf.uniform_step[category]
 
+    def _find_uniform_freq_values_from_hists(self, duration_hists):
+        # Only the extreme values matter to find the uniform range
+        extremes = []
+
+        for duration_hist in duration_hists:
+            if duration_hist.count:
+                extremes += [duration_hist.min, duration_hist.max]
+
+        return self._find_uniform_freq_values(extremes)
+
+    def _get_freq_bins(self, duration_hist, min_duration=None,
+                       max_duration=None, step=None, durations=None):
+        # (lower, upper, count) bins of the frequency distribution of a
+        # stats.LogLinearHistogram of durations in ns, with bounds in
+        # µs. The range is the given uniform one with --freq-uniform,
+        # otherwise the one of --min and --max, or of the histogram.
+        #
+        # The counts of the histogram buckets are spread over the bins
+        # (see stats.LogLinearHistogram.rebin()), so they are
+        # approximate. When the individual durations of the histogram
+        # are still kept anyway (e.g. for --log), `durations` gives
+        # them, and the counts are exact.
+        resolution = self._args.freq_resolution
+
+        if not self._args.freq_uniform:
+            if self._args.min is not None:
+                min_duration = self._args.min
+            else:
+                min_duration = duration_hist.min
+
+            if self._args.max is not None:
+                max_duration = self._args.max
+            else:
+                max_duration = duration_hist.max
+
+            # ns to µs
+            if min_duration is None:
+                min_duration = 0
+            else:
+                min_duration /= 1000
+
+            if max_duration is None:
+                max_duration = 0
+            else:
+                max_duration /= 1000
+
+            step = (max_duration - min_duration) / resolution
+
+        if step == 0:
+            return []
+
+        if durations is not None:
+            # ns to µs
+            counts = stats_utils.uniform_counts(durations, min_duration,
+                                                max_duration, resolution,
+                                                1000)
+        else:
+            # µs to ns
+            counts = duration_hist.rebin(min_duration * 1000,
+                                         max_duration * 1000, resolution)
+
+        return [
+            (index * step + min_duration, (index + 1) * step + min_duration,
+             count)
+            for index, count in enumerate(counts)
+        ]
+
     def _check_period_args(self):
         # FIXME
         return True
@@ -640,6 +1023,31 @@ Please consider using the --period option.''')
             except ValueError as e:
                 self._cmdline_error(str(e))
 
+        self._checkpoint_interval_ns = None
+        if args.checkpoint_interval is not None:
+            try:
+                self._checkpoint_interval_ns = parse_utils.parse_duration(
+                    args.checkpoint_interval)
+            except ValueError as e:
+                self._cmdline_error(str(e))
+            if self._checkpoint_interval_ns <= 0:
+                self._cmdline_error('Invalid checkpoint interval')
+            if args.checkpoint_dir is None:
+                self._cmdline_error('--checkpoint-interval requires '
+                                    '--checkpoint-dir')
+
+        self._checkpoint_dir = None
+        if args.checkpoint_dir is not None:
+            self._checkpoint_dir = checkpoint.get_checkpoint_dir(
+                args.checkpoint_dir, args.path)
+
+        self._warmup_ns = None
+        if args.warmup is not None:
+            try:
+                self._warmup_ns = parse_utils.parse_duration(args.warmup)
+            except ValueError as e:
+                self._cmdline_error(str(e))
+
         self._analysis_conf = analysis.AnalysisConfig()
         self._analysis_conf.refresh_period = refresh_period_ns
         self._validate_transform_period_args(self._analysis_conf)
@@ -707,7 +1115,9 @@ Please consider using the --period option.''')
         pass
 
     def _parse_args(self):
-        ap = argparse.ArgumentParser(description=self._DESC)
+        ap = argparse.ArgumentParser(
+            description=self._DESC,
+            conflict_handler=self._ARGS_CONFLICT_HANDLER)
 
         # common arguments
         ap.add_argument('-r', '--refresh', type=str,
@@ -722,6 +1132,26 @@ Please consider using the --period option.''')
                                                   'hh:mm:ss[.nnnnnnnnn]')
         ap.add_argument('--end', type=str, help='end time: '
                                                 'hh:mm:ss[.nnnnnnnnn]')
+        ap.add_argument('--warmup', type=str,
+                        help='Only replay the trace from this duration '
+                        'before the start time, with optional units suffix '
+                        '(default units: s), instead of from its beginning')
+        ap.add_argument('--checkpoint-interval', type=str,
+                        help='Save the state every interval of trace time, '
+                        'with optional units suffix (default units: s), '
+                        'to start the next analyses with --begin from the '
+                        'nearest checkpoint (requires --checkpoint-dir)')
+        ap.add_argument('--checkpoint-dir', type=str,
+                        help='Directory where the state checkpoints are '
+                        'saved, and loaded from with --begin. The '
+                        'checkpoints can run arbitrary code when loaded: '
+                        'only those owned by the current user are used')
+        ap.add_argument('--cache', action='store_true',
+                        help='Read the events from a columnar cache of the '
+                        'trace, built by the first run over the whole trace')
+        ap.add_argument('--pipeline', action='store_true',
+                        help='Decode the events in a separate process, in '
+                        'parallel with the analysis')
         ap.add_argument('--period', action='append', help='Period definition')
         ap.add_argument('--period-captures', action='append',
                         help='Period captures definition')
@@ -820,7 +1250,10 @@ Please consider using the --period option.''')
         ap.add_argument('--freq', action='store_true', help=help)
         ap.add_argument('--freq-resolution', type=int, default=20,
                         help='Frequency distribution resolution '
-                        '(default 20)')
+                        '(default 20). Unless the individual values are '
+                        'kept (e.g. with --log), the counts are estimated '
+                        'from histograms, the buckets of which are at '
+                        'most 1/128 as wide as their values')
         ap.add_argument('--freq-uniform', action='store_true',
                         help='Use a uniform resolution across distributions')
         ap.add_argument('--freq-series', action='store_true',
@@ -903,9 +1336,26 @@ Please consider using the --period option.''')
 
         self._analysis = self._ANALYSIS_CLASS(self.state, self._analysis_conf)
         self._analysis.register_notification_cbs(notification_cbs)
+        self._analysis.keep_events = self._needs_events()
+        self._analysis.top_limit = self._top_limit()
+
+    # Returns whether or not the requested outputs need the individual
+    # events of the analysis, rather than only their statistics.
+    def _needs_events(self):
+        return True
+
+    # Returns the number of top events the analysis must keep as they
+    # are processed, or None if no such top is requested.
+    def _top_limit(self):
+        return None
+
+    # Returns the names of the state notifications the analysis
+    # subscribes to.
+    def _state_notifications(self):
+        return self._ANALYSIS_CLASS.STATE_NOTIFICATIONS
 
     def _create_automaton(self):
-        self._automaton = automaton.Automaton()
+        self._automaton = automaton.Automaton(self._state_notifications())
         self.state = self._automaton.state
 
     def _analysis_tick_cb(self, period, end_ns):
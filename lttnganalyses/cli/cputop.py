@@ -22,6 +22,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import heapq
 import operator
 from ..common import format_utils
 from .command import Command
@@ -117,11 +118,17 @@ class Cputop(Command):
         result_table = \
             self._mi_create_result_table(self._MI_TABLE_CLASS_PER_PROC,
                                          begin_ns, end_ns)
-        count = 0
+        key = operator.attrgetter('usage_percent')
 
-        for tid in sorted(period_data.tids.values(),
-                          key=operator.attrgetter('usage_percent'),
-                          reverse=True):
+        if self._args.limit > 0:
+            # no need to sort all the threads for the few top ones
+            top_tids = heapq.nlargest(self._args.limit,
+                                      period_data.tids.values(), key=key)
+        else:
+            top_tids = sorted(period_data.tids.values(), key=key,
+                              reverse=True)
+
+        for tid in top_tids:
             prio_list = format_utils.format_prio_list(tid.prio_list)
 
             result_table.append_row(
@@ -130,10 +137,6 @@ class Cputop(Command):
                 prio_list=mi.String(prio_list),
                 usage=mi.Ratio.from_percentage(tid.usage_percent)
             )
-            count += 1
-
-            if self._args.limit > 0 and count >= self._args.limit:
-                break
 
         return result_table
 
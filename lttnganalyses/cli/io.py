@@ -23,13 +23,14 @@
 # SOFTWARE.
 
 import collections
+import heapq
 import operator
-import statistics
 import sys
 from . import mi
 from . import termgraph
-from ..core import io
-from ..common import format_utils
+from ..core import io, records, stats
+from ..common import format_utils, stats_utils
+from ..linuxautomaton import sv
 from .command import Command
 
 
@@ -86,7 +87,8 @@ class IoAnalysisCommand(Command):
                 ('max_latency', 'Maximum call latency', mi.Duration),
                 ('stdev_latency', 'System call latency standard deviation',
                  mi.Duration),
-            ]
+            ] + Command._get_percentile_column_infos('latency',
+                                                     'call latency')
         ),
         (
             _MI_TABLE_CLASS_PART_LATENCY_STATS,
@@ -98,7 +100,8 @@ class IoAnalysisCommand(Command):
                 ('max_latency', 'Maximum access latency', mi.Duration),
                 ('stdev_latency', 'System access latency standard deviation',
                  mi.Duration),
-            ]
+            ] + Command._get_percentile_column_infos('latency',
+                                                     'access latency')
         ),
         (
             _MI_TABLE_CLASS_FREQ,
@@ -188,8 +191,14 @@ class IoAnalysisCommand(Command):
             ]
         ),
     ]
-    _LATENCY_STATS_FORMAT = '{:<14} {:>14} {:>14} {:>14} {:>14} {:>14}'
-    _SECTION_SEPARATOR_STRING = '-' * 89
+    _IO_OPERATIONS = [
+        sv.IORequest.OP_OPEN, sv.IORequest.OP_READ, sv.IORequest.OP_WRITE,
+        sv.IORequest.OP_CLOSE, sv.IORequest.OP_SYNC,
+        sv.IORequest.OP_READ_WRITE,
+    ]
+    _LATENCY_STATS_FORMAT = '{:<14} {:>14} {:>14} {:>14} {:>14} {:>14}' + \
+        ' {:>14}' * len(Command._PERCENTILES)
+    _SECTION_SEPARATOR_STRING = '-' * (89 + 15 * len(Command._PERCENTILES))
 
     def _analysis_tick(self, period_data, end_ns):
         if period_data is None:
@@ -282,11 +291,116 @@ class IoAnalysisCommand(Command):
             end and begin > self._analysis_conf.end_ts
         )
 
+    def _has_io_request_filters(self):
+        return self._args.minsize is not None or \
+            self._args.maxsize is not None or \
+            self._args.min is not None or self._args.max is not None
+
+    def _needs_events(self):
+        # The size and latency filters apply to individual requests
+        return self._args.log or self._has_io_request_filters()
+
+    def _top_limit(self):
+        if not self._args.top or self._has_io_request_filters():
+            return None
+
+        return self._args.limit
+
     def _filter_io_request(self, io_rq):
         return self._filter_size(io_rq.size) and \
             self._filter_latency(io_rq.duration) and \
             self._filter_time_range(io_rq.begin_ts, io_rq.end_ts)
 
+    def _get_io_request_mask(self, rq_store, is_syscall, operation=None):
+        # Vectorized _filter_io_request() over the columns of a store of
+        # requests (NumPy only). If is_syscall is true, only the syscall
+        # requests, of the given operation if not None, are kept.
+        numpy = records.numpy
+        mask = numpy.ones(len(rq_store), dtype=bool)
+
+        if self._args.minsize is not None or self._args.maxsize is not None:
+            size = rq_store.column('size')
+            size_mask = numpy.ones(len(rq_store), dtype=bool)
+
+            if self._args.maxsize is not None:
+                size_mask &= size <= self._args.maxsize
+
+            if self._args.minsize is not None:
+                size_mask &= size >= self._args.minsize
+
+            mask &= size_mask | (size == records.NONE)
+
+        if self._args.min is not None or self._args.max is not None:
+            duration = rq_store.column('duration')
+
+            if self._args.max is not None:
+                mask &= duration <= self._args.max
+
+            if self._args.min is not None:
+                mask &= duration >= self._args.min
+
+        if self._analysis_conf.begin_ts and self._analysis_conf.end_ts:
+            end_ts = rq_store.column('end_ts')
+            mask &= (rq_store.column('begin_ts') <=
+                     self._analysis_conf.end_ts) | \
+                (end_ts == records.NONE) | (end_ts == 0)
+
+        if is_syscall:
+            mask &= rq_store.column('dev') == records.NONE
+
+        if operation is not None:
+            rq_operations = rq_store.column('operation')
+            operation_mask = numpy.zeros(len(rq_store), dtype=bool)
+
+            for rq_operation in self._IO_OPERATIONS:
+                if sv.IORequest.is_equivalent_operation(operation,
+                                                        rq_operation):
+                    operation_mask |= rq_operations == rq_operation
+
+            mask &= operation_mask
+
+        return mask
+
+    def _filter_io_requests(self, rq_stores, is_syscall, operation=None):
+        # Generates the requests of the stores passing the request
+        # filters (see _get_io_request_mask())
+        for rq_store in rq_stores:
+            if records.numpy is None:
+                for io_rq in rq_store:
+                    if is_syscall and io_rq.is_block:
+                        continue
+
+                    if operation is not None and \
+                            not sv.IORequest.is_equivalent_operation(
+                                operation, io_rq.operation):
+                        continue
+
+                    if self._filter_io_request(io_rq):
+                        yield io_rq
+            else:
+                mask = self._get_io_request_mask(rq_store, is_syscall,
+                                                 operation)
+                yield from rq_store.take(records.numpy.flatnonzero(mask))
+
+    def _get_filtered_durations(self, rq_stores, is_syscall, operation=None):
+        # Durations of the requests of the stores passing the request
+        # filters, as a NumPy array if available
+        if records.numpy is None:
+            return [io_rq.duration for io_rq in
+                    self._filter_io_requests(rq_stores, is_syscall,
+                                             operation)]
+
+        durations = [
+            rq_store.column('duration')[
+                self._get_io_request_mask(rq_store, is_syscall, operation)]
+            for rq_store in rq_stores
+        ]
+
+        if not durations:
+            return records.numpy.empty(0, dtype=records.numpy.int64)
+
+        return records.numpy.concatenate(durations)
+
     def _is_io_rq_out_of_range(self, io_rq):
         return (
             self._analysis_conf.begin_ts and
@@ -758,35 +872,32 @@ class IoAnalysisCommand(Command):
         self._print_per_netif_io(usage_tables.per_netif_recv, 'Received')
         self._print_per_netif_io(usage_tables.per_netif_send, 'Sent')
 
-    def _fill_freq_result_table(self, duration_list, result_table):
-        if not duration_list:
+    def _fill_freq_result_table(self, latency_hist, result_table,
+                                latencies=None):
+        # The latencies of the histogram, if given, give the exact
+        # counts (see Command._get_freq_bins())
+        if not latency_hist.count:
             return
 
         # The number of bins for the histogram
         resolution = self._args.freq_resolution
 
-        min_duration = min(duration_list)
-        max_duration = max(duration_list)
         # ns to µs
-        min_duration /= 1000
-        max_duration /= 1000
+        min_duration = latency_hist.min / 1000
+        max_duration = latency_hist.max / 1000
 
         step = (max_duration - min_duration) / resolution
 
         if step == 0:
             return
 
-        buckets = []
-        values = []
-
-        for i in range(resolution):
-            buckets.append(i * step)
-            values.append(0)
-
-        for duration in duration_list:
-            duration /= 1000
-            index = min(int((duration - min_duration) / step), resolution - 1)
-            values[index] += 1
+        if latencies is not None:
+            values = stats_utils.uniform_counts(latencies, min_duration,
+                                                max_duration, resolution,
+                                                1000)
+        else:
+            values = latency_hist.rebin(latency_hist.min, latency_hist.max,
+                                        resolution)
 
         for index, value in enumerate(values):
             result_table.append_row(
@@ -796,52 +907,65 @@ class IoAnalysisCommand(Command):
                 count=mi.Number(value),
             )
 
+    def _get_filtered_latencies_hist(self, rq_stores, is_syscall,
+                                     operation=None):
+        # Latencies of the kept requests passing the request filters,
+        # and their histogram
+        latencies = self._get_filtered_durations(rq_stores, is_syscall,
+                                                 operation)
+        latency_hist = stats.LogLinearHistogram()
+        latency_hist.update_values(latencies)
+
+        return latencies, latency_hist
+
     def _get_disk_freq_result_tables(self, period_data, begin, end):
         result_tables = []
 
         for disk in period_data.disks.values():
-            rq_durations = [rq.duration for rq in disk.rq_list if
-                            self._filter_io_request(rq)]
+            if self._analysis.keep_events:
+                latencies, latency_hist = self._get_filtered_latencies_hist(
+                    [disk.rq_list], False)
+            else:
+                latencies = None
+                latency_hist = disk.rq_latency_hist
+
             subtitle = 'disk: {}'.format(disk.diskname)
             result_table = \
                 self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
                                              begin, end, subtitle)
-            self._fill_freq_result_table(rq_durations, result_table)
+            self._fill_freq_result_table(latency_hist, result_table,
+                                         latencies)
             result_tables.append(result_table)
 
         return result_tables
 
     def _get_syscall_freq_result_tables(self, period_data, begin, end):
-        open_table = \
-            self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
-                                         begin, end, 'open')
-        read_table = \
-            self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
-                                         begin, end, 'read')
-        write_table = \
-            self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
-                                         begin, end, 'write')
-        sync_table = \
-            self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
-                                         begin, end, 'sync')
-        self._fill_freq_result_table(
-            [io_rq.duration for io_rq in
-             self._analysis.open_io_requests(period_data)
-             if self._filter_io_request(io_rq)], open_table)
-        self._fill_freq_result_table(
-            [io_rq.duration for io_rq in
-             self._analysis.read_io_requests(period_data)
-             if self._filter_io_request(io_rq)], read_table)
-        self._fill_freq_result_table(
-            [io_rq.duration for io_rq in
-             self._analysis.write_io_requests(period_data)
-             if self._filter_io_request(io_rq)], write_table)
-        self._fill_freq_result_table(
-            [io_rq.duration for io_rq in
-             self._analysis.sync_io_requests(period_data)
-             if self._filter_io_request(io_rq)], sync_table)
+        operations = [
+            ('open', sv.IORequest.OP_OPEN),
+            ('read', sv.IORequest.OP_READ),
+            ('write', sv.IORequest.OP_WRITE),
+            ('sync', sv.IORequest.OP_SYNC),
+        ]
+        result_tables = []
 
-        return [open_table, read_table, write_table, sync_table]
+        for subtitle, operation in operations:
+            if self._analysis.keep_events:
+                latencies, latency_hist = self._get_filtered_latencies_hist(
+                    self._analysis.io_request_stores(period_data), True,
+                    operation)
+            else:
+                latencies = None
+                latency_hist = self._analysis.syscall_latency_hist(
+                    period_data, operation)
+
+            result_table = \
+                self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
+                                             begin, end, subtitle)
+            self._fill_freq_result_table(latency_hist, result_table,
+                                         latencies)
+            result_tables.append(result_table)
+
+        return result_tables
 
     def _get_freq_result_tables(self, period_data, begin, end):
         syscall_tables = self._get_syscall_freq_result_tables(period_data,
@@ -910,21 +1034,22 @@ class IoAnalysisCommand(Command):
         if not rq_list:
             return
 
-        count = 0
-
-        for io_rq in sorted(rq_list, key=operator.attrgetter(sort_key),
-                            reverse=is_top):
-            if is_top and count > self._args.limit:
-                break
+        if is_top:
+            # no need to sort all the requests for the few top ones
+            rq_list = heapq.nlargest(self._args.limit, rq_list,
+                                     key=operator.attrgetter(sort_key))
+        else:
+            rq_list = sorted(rq_list, key=operator.attrgetter(sort_key))
 
+        for io_rq in rq_list:
             self._append_log_row(period_data, io_rq, result_table)
-            count += 1
 
-    def _fill_log_result_table_from_io_requests(self, period_data, io_requests,
+    def _fill_log_result_table_from_io_requests(self, period_data, operation,
                                                 sort_key, is_top,
                                                 result_table):
-        io_requests = [io_rq for io_rq in io_requests if
-                       self._filter_io_request(io_rq)]
+        # syscall requests of the operation (all if None)
+        io_requests = list(self._filter_io_requests(
+            self._analysis.io_request_stores(period_data), True, operation))
         self._fill_log_result_table(period_data, io_requests, sort_key, is_top,
                                     result_table)
 
@@ -941,18 +1066,29 @@ class IoAnalysisCommand(Command):
         sync_table = \
             self._mi_create_result_table(self._MI_TABLE_CLASS_TOP_SYSCALL,
                                          begin, end, 'sync')
-        self._fill_log_result_table_from_io_requests(
-            period_data, self._analysis.open_io_requests(period_data),
-            'duration', True, open_table)
-        self._fill_log_result_table_from_io_requests(
-            period_data, self._analysis.read_io_requests(period_data),
-            'duration', True, read_table)
-        self._fill_log_result_table_from_io_requests(
-            period_data, self._analysis.write_io_requests(period_data),
-            'duration', True, write_table)
-        self._fill_log_result_table_from_io_requests(
-            period_data, self._analysis.sync_io_requests(period_data),
-            'duration', True, sync_table)
+
+        if self._analysis.top_limit is None:
+            # the requests must be filtered first
+            self._fill_log_result_table_from_io_requests(
+                period_data, sv.IORequest.OP_OPEN, 'duration', True,
+                open_table)
+            self._fill_log_result_table_from_io_requests(
+                period_data, sv.IORequest.OP_READ, 'duration', True,
+                read_table)
+            self._fill_log_result_table_from_io_requests(
+                period_data, sv.IORequest.OP_WRITE, 'duration', True,
+                write_table)
+            self._fill_log_result_table_from_io_requests(
+                period_data, sv.IORequest.OP_SYNC, 'duration', True,
+                sync_table)
+        else:
+            for operation, table in [(sv.IORequest.OP_OPEN, open_table),
+                                     (sv.IORequest.OP_READ, read_table),
+                                     (sv.IORequest.OP_WRITE, write_table),
+                                     (sv.IORequest.OP_SYNC, sync_table)]:
+                for io_rq in self._analysis.syscall_top_requests(
+                        period_data, operation):
+                    self._append_log_row(period_data, io_rq, table)
 
         return [open_table, read_table, write_table, sync_table]
 
@@ -1026,31 +1162,31 @@ class IoAnalysisCommand(Command):
         log_table = self._mi_create_result_table(self._MI_TABLE_CLASS_LOG,
                                                  begin, end)
         self._fill_log_result_table_from_io_requests(
-            period_data, self._analysis.io_requests(period_data),
-            'begin_ts', False, log_table)
+            period_data, None, 'begin_ts', False, log_table)
 
         return log_table
 
     def _append_latency_stats_row(self, obj, rq_durations, result_table):
-        rq_count = len(rq_durations)
-        total_duration = sum(rq_durations)
+        # rq_durations is a NumPy array if available (see
+        # _get_filtered_durations())
+        summary = stats_utils.summarize(rq_durations)
+        latency_hist = stats.LogLinearHistogram()
+        latency_hist.update_values(rq_durations)
+        rq_count = summary.count
 
-        if len(rq_durations) > 0:
-            min_duration = min(rq_durations)
-            max_duration = max(rq_durations)
+        if rq_count > 0:
+            min_duration = summary.min
+            max_duration = summary.max
+            avg = summary.total / rq_count
         else:
             min_duration = 0
             max_duration = 0
+            avg = 0
 
         if rq_count < 2:
             stdev = mi.Unknown()
         else:
-            stdev = mi.Duration(statistics.stdev(rq_durations))
-
-        if rq_count > 0:
-            avg = total_duration / rq_count
-        else:
-            avg = 0
+            stdev = mi.Duration(summary.stdev)
 
         result_table.append_row(
             obj=obj,
@@ -1059,26 +1195,61 @@ class IoAnalysisCommand(Command):
             avg_latency=mi.Duration(avg),
             max_latency=mi.Duration(max_duration),
             stdev_latency=stdev,
+            **self._get_percentile_row_values(latency_hist, 'latency')
         )
 
-    def _append_latency_stats_row_from_requests(self, obj, io_requests,
-                                                result_table):
-        rq_durations = [io_rq.duration for io_rq in io_requests if
-                        self._filter_io_request(io_rq)]
-        self._append_latency_stats_row(obj, rq_durations, result_table)
+    def _append_latency_stats_row_from_stats(self, obj, latency_stats,
+                                             latency_hist, result_table):
+        if latency_stats.count < 2:
+            stdev = mi.Unknown()
+        else:
+            stdev = mi.Duration(latency_stats.stdev)
+
+        if latency_stats.count > 0:
+            min_duration = latency_stats.min
+            max_duration = latency_stats.max
+        else:
+            min_duration = 0
+            max_duration = 0
+
+        result_table.append_row(
+            obj=obj,
+            count=mi.Number(latency_stats.count),
+            min_latency=mi.Duration(min_duration),
+            avg_latency=mi.Duration(latency_stats.mean),
+            max_latency=mi.Duration(max_duration),
+            stdev_latency=stdev,
+            **self._get_percentile_row_values(latency_hist, 'latency')
+        )
 
     def _get_syscall_latency_stats_result_table(self, period_data, begin, end):
         result_table = self._mi_create_result_table(
             self._MI_TABLE_CLASS_SYSCALL_LATENCY_STATS, begin, end)
-        append_fn = self._append_latency_stats_row_from_requests
-        append_fn(mi.String('Open'),
-                  self._analysis.open_io_requests(period_data), result_table)
-        append_fn(mi.String('Read'),
-                  self._analysis.read_io_requests(period_data), result_table)
-        append_fn(mi.String('Write'),
-                  self._analysis.write_io_requests(period_data), result_table)
-        append_fn(mi.String('Sync'),
-                  self._analysis.sync_io_requests(period_data), result_table)
+        operations = [
+            ('Open', sv.IORequest.OP_OPEN),
+            ('Read', sv.IORequest.OP_READ),
+            ('Write', sv.IORequest.OP_WRITE),
+            ('Sync', sv.IORequest.OP_SYNC),
+        ]
+
+        for name, operation in operations:
+            # Without individual requests, there is no request filter
+            # to apply either: the online statistics are exact.
+            if self._analysis.keep_events:
+                self._append_latency_stats_row(
+                    mi.String(name),
+                    self._get_filtered_durations(
+                        self._analysis.io_request_stores(period_data), True,
+                        operation),
+                    result_table)
+            else:
+                self._append_latency_stats_row_from_stats(
+                    mi.String(name),
+                    self._analysis.syscall_latency_stats(period_data,
+                                                         operation),
+                    self._analysis.syscall_latency_hist(period_data,
+                                                        operation),
+                    result_table)
 
         return result_table
 
@@ -1090,12 +1261,18 @@ class IoAnalysisCommand(Command):
             self._MI_TABLE_CLASS_PART_LATENCY_STATS, begin, end)
 
         for disk in period_data.disks.values():
-            if disk.rq_count:
-                rq_durations = [rq.duration for rq in disk.rq_list if
-                                self._filter_io_request(rq)]
-                disk = mi.Disk(disk.diskname)
-                self._append_latency_stats_row(disk, rq_durations,
-                                               result_table)
+            if not disk.rq_count:
+                continue
+
+            if self._analysis.keep_events:
+                self._append_latency_stats_row(
+                    mi.Disk(disk.diskname),
+                    self._get_filtered_durations([disk.rq_list], False),
+                    result_table)
+            else:
+                self._append_latency_stats_row_from_stats(
+                    mi.Disk(disk.diskname), disk.rq_latency_stats,
+                    disk.rq_latency_hist, result_table)
 
         return result_table
 
@@ -1119,12 +1296,14 @@ class IoAnalysisCommand(Command):
 
         print(IoAnalysisCommand._LATENCY_STATS_FORMAT.format(
             str(row.obj), row.count.value, min_duration,
-            avg, max_duration, stdev))
+            avg, max_duration, stdev,
+            *self._get_percentile_strs(row, 'latency')))
 
     def _print_syscall_latency_stats(self, stats_table):
         print('\nSyscalls latency statistics (usec):')
         print(IoAnalysisCommand._LATENCY_STATS_FORMAT.format(
-            'Type', 'Count', 'Min', 'Average', 'Max', 'Stdev'))
+            'Type', 'Count', 'Min', 'Average', 'Max', 'Stdev',
+            *self._get_percentile_headers()))
         print(IoAnalysisCommand._SECTION_SEPARATOR_STRING)
 
         for row in stats_table.rows:
@@ -1136,7 +1315,8 @@ class IoAnalysisCommand(Command):
 
         print('\nDisk latency statistics (usec):')
         print(IoAnalysisCommand._LATENCY_STATS_FORMAT.format(
-            'Name', 'Count', 'Min', 'Average', 'Max', 'Stdev'))
+            'Name', 'Count', 'Min', 'Average', 'Max', 'Stdev',
+            *self._get_percentile_headers()))
         print(IoAnalysisCommand._SECTION_SEPARATOR_STRING)
 
         for row in stats_table.rows:
@@ -24,7 +24,6 @@
 
 import itertools
 import math
-import statistics
 import sys
 from . import mi
 from . import termgraph
@@ -64,7 +63,8 @@ class IrqAnalysisCommand(Command):
                 ('max_duration', 'Maximum duration', mi.Duration),
                 ('stdev_duration', 'Interrupt duration standard deviation',
                  mi.Duration),
-            ]
+            ] + Command._get_percentile_column_infos('duration',
+                                                     'duration')
         ),
         (
             _MI_TABLE_CLASS_SOFT_STATS,
@@ -76,6 +76,8 @@ class IrqAnalysisCommand(Command):
                 ('max_duration', 'Maximum duration', mi.Duration),
                 ('stdev_duration', 'Interrupt duration standard deviation',
                  mi.Duration),
+            ] + Command._get_percentile_column_infos('duration',
+                                                     'duration') + [
                 ('raise_count', 'Interrupt raise count', mi.Number,
                  'interrupt raises'),
                 ('min_latency', 'Minimum raise latency', mi.Duration),
@@ -229,6 +231,8 @@ class IrqAnalysisCommand(Command):
             avg_duration=common_row[3],
             max_duration=common_row[4],
             stdev_duration=common_row[5],
+            **self._get_percentile_row_values(irq_stats.duration_hist,
+                                              'duration')
         )
 
     def _append_soft_stats_result_table_row(self, irq_nr, irq_stats,
@@ -265,71 +269,28 @@ class IrqAnalysisCommand(Command):
             avg_latency=avg_latency,
             max_latency=max_latency,
             stdev_latency=stdev_latency,
+            **self._get_percentile_row_values(irq_stats.duration_hist,
+                                              'duration')
         )
 
-    def _fill_freq_result_table(self, period_data, irq_stats, freq_table):
-        # The number of bins for the histogram
-        resolution = self._args.freq_resolution
-        if self._args.min is not None:
-            min_duration = self._args.min
-        else:
-            min_duration = irq_stats.min_duration
-        if self._args.max is not None:
-            max_duration = self._args.max
-        else:
-            max_duration = irq_stats.max_duration
-
-        # ns to µs
-        min_duration /= 1000
-        max_duration /= 1000
-
-        # histogram's step
-        if self._args.freq_uniform:
-            # TODO: perform only one time
-            durations = [irq.duration for irq in period_data.irq_list]
-            min_duration, max_duration, step = \
-                self._find_uniform_freq_values(durations)
-        else:
-            step = (max_duration - min_duration) / resolution
-
-        if step == 0:
-            return
-
-        buckets = []
-        counts = []
-
-        for i in range(resolution):
-            buckets.append(i * step)
-            counts.append(0)
-
-        for irq in irq_stats.irq_list:
-            duration = irq.duration / 1000
-            index = int((duration - min_duration) / step)
-
-            if index >= resolution:
-                # special case for max value: put in last bucket (includes
-                # its upper bound)
-                if duration == max_duration:
-                    counts[index - 1] += 1
+    def _fill_freq_result_table(self, irq_stats, freq_range, freq_table):
+        durations = None
 
-                continue
-
-            counts[index] += 1
+        if self._analysis.keep_events:
+            durations = [irq.duration for irq in irq_stats.irq_list]
 
-        for index, count in enumerate(counts):
-            lower_bound = index * step + min_duration
-            upper_bound = (index + 1) * step + min_duration
+        for lower_bound, upper_bound, count in self._get_freq_bins(
+                irq_stats.duration_hist, *freq_range, durations=durations):
             freq_table.append_row(
                 duration_lower=mi.Duration.from_us(lower_bound),
                 duration_upper=mi.Duration.from_us(upper_bound),
                 count=mi.Number(count),
             )
 
-    def _fill_stats_freq_result_tables(self, period_data, begin_ns,
-                                       end_ns, is_hard,
+    def _fill_stats_freq_result_tables(self, begin_ns, end_ns, is_hard,
                                        analysis_stats, filter_list,
-                                       hard_stats_table, soft_stats_table,
-                                       freq_tables):
+                                       freq_range, hard_stats_table,
+                                       soft_stats_table, freq_tables):
         for id in sorted(analysis_stats):
             if filter_list and str(id) not in filter_list:
                 continue
@@ -354,7 +315,7 @@ class IrqAnalysisCommand(Command):
                 freq_table = \
                     self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
                                                  begin_ns, end_ns, subtitle)
-                self._fill_freq_result_table(period_data, irq_stats,
+                self._fill_freq_result_table(irq_stats, freq_range,
                                              freq_table)
 
                 # it is possible that the frequency distribution result
@@ -402,11 +363,10 @@ class IrqAnalysisCommand(Command):
         return result_table
 
     def _get_stats_freq_result_tables(self, period_data, begin_ns, end_ns):
-        def fill_stats_freq_result_tables(period_data, is_hard,
-                                          stats, filter_list):
-            self._fill_stats_freq_result_tables(period_data, begin_ns, end_ns,
-                                                is_hard, stats, filter_list,
-                                                hard_stats_table,
+        def fill_stats_freq_result_tables(is_hard, stats, filter_list):
+            self._fill_stats_freq_result_tables(begin_ns, end_ns, is_hard,
+                                                stats, filter_list,
+                                                freq_range, hard_stats_table,
                                                 soft_stats_table, freq_tables)
 
         hard_stats_table = \
@@ -416,16 +376,28 @@ class IrqAnalysisCommand(Command):
             self._mi_create_result_table(self._MI_TABLE_CLASS_SOFT_STATS,
                                          begin_ns, end_ns)
         freq_tables = []
+        freq_range = (None, None, None)
+
+        if self._args.freq and self._args.freq_uniform:
+            # The uniform range is the same for all the IRQs
+            duration_hists = [
+                irq_stats.duration_hist
+                for all_irq_stats in [period_data.hard_irq_stats,
+                                      period_data.softirq_stats]
+                for irq_stats in all_irq_stats.values()
+            ]
+            freq_range = \
+                self._find_uniform_freq_values_from_hists(duration_hists)
 
         if self._args.irq_filter_list is not None or \
            self._args.softirq_filter_list is None:
-            fill_stats_freq_result_tables(period_data, True,
+            fill_stats_freq_result_tables(True,
                                           period_data.hard_irq_stats,
                                           self._args.irq_filter_list)
 
         if self._args.softirq_filter_list is not None or \
            self._args.irq_filter_list is None:
-            fill_stats_freq_result_tables(period_data, False,
+            fill_stats_freq_result_tables(False,
                                           period_data.softirq_stats,
                                           self._args.softirq_filter_list)
 
@@ -472,28 +444,14 @@ class IrqAnalysisCommand(Command):
         if args.softirq:
             args.softirq_filter_list = args.softirq.split(',')
 
-    def _compute_duration_stdev(self, irq_stats_item):
-        if irq_stats_item.count < 2:
-            return float('nan')
-
-        durations = []
-        for irq in irq_stats_item.irq_list:
-            durations.append(irq.end_ts - irq.begin_ts)
+    def _needs_events(self):
+        return self._args.log
 
-        return statistics.stdev(durations)
+    def _compute_duration_stdev(self, irq_stats_item):
+        return irq_stats_item.duration_stats.stdev
 
     def _compute_raise_latency_stdev(self, irq_stats_item):
-        if irq_stats_item.raise_count < 2:
-            return float('nan')
-
-        raise_latencies = []
-        for irq in irq_stats_item.irq_list:
-            if irq.raise_ts is None:
-                continue
-
-            raise_latencies.append(irq.begin_ts - irq.raise_ts)
-
-        return statistics.stdev(raise_latencies)
+        return irq_stats_item.raise_latency_stats.stdev
 
     def _print_frequency_distribution(self, freq_table):
         title_fmt = 'Handler duration frequency distribution {}'
@@ -535,7 +493,8 @@ class IrqAnalysisCommand(Command):
         print(output_str)
 
     def _get_duration_stats_str(self, row):
-        format_str = '{:<3} {:<18} {:>5} {:>12} {:>12} {:>12} {:>12} {:<2}'
+        format_str = '{:<3} {:<18} {:>5} {:>12} {:>12} {:>12} {:>12}' + \
+            ' {:>12}' * len(self._PERCENTILES) + ' {:<2}'
         irq_do = row.irq
         count = row.count.value
         min_duration = row.min_duration.to_us()
@@ -554,7 +513,8 @@ class IrqAnalysisCommand(Command):
                                        '%0.03f' % avg_duration,
                                        '%0.03f' % max_duration,
                                        '%s' % duration_stdev_str,
-                                       ' |')
+                                       *(self._get_percentile_strs(
+                                           row, 'duration') + [' |']))
         return output_str
 
     def _get_raise_latency_str(self, row):
@@ -579,23 +539,29 @@ class IrqAnalysisCommand(Command):
 
     def _print_stats_freq(self, hard_stats_table, soft_stats_table,
                           freq_tables):
+        # the percentile columns are part of the duration columns
+        percentiles_width = 13 * len(self._PERCENTILES)
+        percentiles_header = ''.join(
+            ' {:>12}'.format(header)
+            for header in self._get_percentile_headers())
         hard_header_format = '{:<52} {:<12}\n' \
-                             '{:<22} {:<14} {:<12} {:<12} {:<10} {:<12}\n'
+                             '{:<22} {:<14} {:<12} {:<12} {:<10} {:<5}{}\n'
         hard_header = hard_header_format.format(
             'Hard IRQ', 'Duration (us)',
-            '', 'count', 'min', 'avg', 'max', 'stdev'
+            '', 'count', 'min', 'avg', 'max', 'stdev', percentiles_header
         )
-        hard_header += ('-' * 82 + '|')
-        soft_header_format = '{:<52} {:<52} {:<12}\n' \
-                             '{:<22} {:<14} {:<12} {:<12} {:<10} {:<4} ' \
+        hard_header += ('-' * (82 + percentiles_width) + '|')
+        soft_header_format = '{:<52} {:<' + str(52 + percentiles_width) + \
+                             '} {:<12}\n' \
+                             '{:<22} {:<14} {:<12} {:<12} {:<10} {:<5}{} ' \
                              '{:<3} {:<14} {:<12} {:<12} {:<10} {:<12}\n'
         soft_header = soft_header_format.format(
             'Soft IRQ', 'Duration (us)',
             'Raise latency (us)', '',
-            'count', 'min', 'avg', 'max', 'stdev', ' |',
+            'count', 'min', 'avg', 'max', 'stdev', percentiles_header, ' |',
             'count', 'min', 'avg', 'max', 'stdev'
         )
-        soft_header += '-' * 82 + '|' + '-' * 60
+        soft_header += '-' * (82 + percentiles_width) + '|' + '-' * 60
 
         if hard_stats_table.rows or soft_stats_table.rows:
             stats_rows = itertools.chain(hard_stats_table.rows,
@@ -22,6 +22,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import heapq
 import operator
 from .command import Command
 from ..core import memtop
@@ -117,19 +118,21 @@ class Memtop(Command):
                                        begin_ns, end_ns):
         result_table = self._mi_create_result_table(table_class,
                                                     begin_ns, end_ns)
-        count = 0
+        key = operator.attrgetter(attr)
 
-        for tid in sorted(period_data.tids.values(),
-                          key=operator.attrgetter(attr),
-                          reverse=True):
+        if self._args.limit > 0:
+            # no need to sort all the threads for the few top ones
+            top_tids = heapq.nlargest(self._args.limit,
+                                      period_data.tids.values(), key=key)
+        else:
+            top_tids = sorted(period_data.tids.values(), key=key,
+                              reverse=True)
+
+        for tid in top_tids:
             result_table.append_row(
                 process=mi.Process(tid.comm, tid=tid.tid),
                 pages=mi.Number(getattr(tid, attr)),
             )
-            count += 1
-
-            if self._args.limit > 0 and count >= self._args.limit:
-                break
 
         return result_table
 
@@ -0,0 +1,166 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import copy
+import json
+from . import mi
+from .command import Command
+from .cputop import Cputop
+from .io import IoAnalysisCommand
+from .irq import IrqAnalysisCommand
+from .memtop import Memtop
+from .sched import SchedAnalysisCommand
+from .syscallstats import SyscallsAnalysis
+
+
+class _AnalysisGroup():
+    # Drive several analyses sharing the same state as a single one.
+    def __init__(self, analyses):
+        self._analyses = analyses
+
+    @property
+    def ended(self):
+        return all(analysis.ended for analysis in self._analyses)
+
+    def begin_analysis(self, evt):
+        for analysis in self._analyses:
+            analysis.begin_analysis(evt)
+
+    def process_event(self, ev):
+        for analysis in self._analyses:
+            analysis.process_event(ev)
+
+    def end_analysis(self):
+        for analysis in self._analyses:
+            analysis.end_analysis()
+
+
+class MultiAnalysisCommand(Command):
+    _DESC = """The all-analyses command."""
+    _MI_TITLE = 'All analyses'
+    _MI_DESCRIPTION = 'CPU, I/O, IRQ, scheduling, system call and memory ' \
+                      'analyses in a single pass'
+    _MI_TAGS = [mi.Tags.CPU, mi.Tags.IO, mi.Tags.INTERRUPT, mi.Tags.SCHED,
+                mi.Tags.SYSCALL, mi.Tags.MEMORY]
+    # The table classes are the ones of the sub-commands (see
+    # _mi_setup())
+    _MI_TABLE_CLASSES = []
+    # The sub-commands share most of their arguments, keep a single
+    # definition of each.
+    _ARGS_CONFLICT_HANDLER = 'resolve'
+    # Prefix of the MI table classes of the command, command class and
+    # the arguments it needs to output the same results as its own
+    # lttng-* entry point.
+    _COMMANDS = [
+        ('cputop', Cputop, {}),
+        ('io', IoAnalysisCommand, {'usage': True}),
+        ('irq', IrqAnalysisCommand, {'stats': True}),
+        ('sched', SchedAnalysisCommand, {'stats': True}),
+        ('syscall', SyscallsAnalysis, {}),
+        ('memtop', Memtop, {}),
+    ]
+
+    def __init__(self, mi_mode=False):
+        self._commands = []
+        self._mi_results = []
+
+        for prefix, cmd_cls, forced_args in self._COMMANDS:
+            cmd = cmd_cls(mi_mode=mi_mode)
+            # Different sub-commands have table classes of the same
+            # name (e.g. per-process), tell them apart.
+            cmd._mi_setup('{}-'.format(prefix))
+            cmd._mi_results_sink = self._mi_results
+            self._commands.append((cmd, forced_args))
+
+        super().__init__(mi_mode=mi_mode)
+
+    def _mi_setup(self):
+        super()._mi_setup()
+
+        for cmd, _ in self._commands:
+            for table_class in cmd._mi_table_classes.values():
+                self._mi_table_classes[table_class.name] = table_class
+
+    def _state_notifications(self):
+        notifications = set()
+
+        for cmd, _ in self._commands:
+            notifications.update(cmd._state_notifications())
+
+        return notifications
+
+    def _setup_command(self, cmd, forced_args):
+        # The sub-commands share the trace, the automaton and the
+        # analysis configuration of this command.
+        cmd._args = copy.copy(self._args)
+        vars(cmd._args).update(forced_args)
+        cmd._analysis_conf = self._analysis_conf
+        cmd._babeltrace_version = self._babeltrace_version
+        cmd._handles = self._handles
+        cmd._traces = self._traces
+        cmd._ts_begin = self._ts_begin
+        cmd._ts_end = self._ts_end
+        cmd._automaton = self._automaton
+        cmd.state = self.state
+        cmd._validate_transform_args()
+
+    def _create_analysis(self):
+        analyses = []
+
+        for cmd, forced_args in self._commands:
+            self._setup_command(cmd, forced_args)
+            cmd._create_analysis()
+            analyses.append(cmd._analysis)
+
+        self._analysis = _AnalysisGroup(analyses)
+
+    def _pre_analysis(self):
+        for cmd, _ in self._commands:
+            cmd._pre_analysis()
+
+    def _post_analysis(self):
+        for cmd, _ in self._commands:
+            cmd._post_analysis()
+
+        if self._mi_mode:
+            print(json.dumps({'results': self._mi_results}))
+
+    def _analysis_tick(self, period_data, end_ns):
+        # Each sub-command outputs the results of its own analysis
+        pass
+
+    def _add_arguments(self, ap):
+        for cmd, _ in self._commands:
+            cmd._add_arguments(ap)
+
+
+def _run(mi_mode):
+    multicmd = MultiAnalysisCommand(mi_mode=mi_mode)
+    multicmd.run()
+
+
+def run():
+    _run(mi_mode=False)
+
+
+def run_mi():
+    _run(mi_mode=True)
@@ -21,15 +21,17 @@
 
 import sys
 import math
+import heapq
 import operator
-import statistics
 import collections
 import ast
+import copy
 import re
 from collections import OrderedDict
 from . import mi, termgraph
-from ..core import periods
+from ..core import periods, stats
 from .command import Command
+from ..common import stats_utils
 
 
 class _StatsFreqTables():
@@ -42,8 +44,8 @@ class _StatsFreqTables():
         self.global_count_table = None
         self.global_pc_table = None
 
-        # Raw values for the frequency distributions
-        # *_values[period][child] = []
+        # Distributions of the values for the frequency distributions
+        # *_values[period][child] = _ValueDistribution
         self.duration_values = {}
         self.count_values = {}
         self.pc_values = {}
@@ -60,15 +62,45 @@ class _StatsFreqTables():
         self.global_pc_freq_tables = []
 
 
+class _ValueDistribution():
+    # Statistics of a series of values, and frequency distribution of
+    # the ones accepted by `value_filter`. The histogram holds the
+    # values multiplied by `hist_scale`, which keeps the precision of
+    # the non-integer ones.
+    def __init__(self, value_filter=None, hist_scale=1):
+        self.stats = stats.RunningStats()
+        self.hist = stats.LogLinearHistogram()
+        self.hist_scale = hist_scale
+        self._value_filter = value_filter
+
+    def update(self, value, count=1):
+        self.stats.update(value, count)
+
+        if self._value_filter is None or self._value_filter(value):
+            self.hist.update(round(value * self.hist_scale), count)
+
+    def copy(self):
+        dist = _ValueDistribution(self._value_filter, self.hist_scale)
+        dist.stats = copy.copy(self.stats)
+        dist.hist += self.hist
+
+        return dist
+
+
 class _PeriodStats():
-    def __init__(self, count=0, min=None, max=0, stdev=0, total=0):
+    # The usage ratios are kept in millionths of percent in their
+    # histogram
+    _PC_HIST_SCALE = 1000000
+
+    def __init__(self, count=0, min=None, max=0, stdev=0, total=0,
+                 value_filter=None):
         self.count = count
         self.min = min
         self.max = max
         self.stdev = stdev
         self.total = total
-        self.count_array = []
-        self.durations = []
+        self.counts = _ValueDistribution(value_filter)
+        self.durations = _ValueDistribution(value_filter)
         self.min_count = None
         self.max_count = 0
         self.total_count = 0
@@ -76,7 +108,7 @@ class _PeriodStats():
         self.min_pc = None
         self.max_pc = 0
         self.total_pc = 0
-        self.pc_array = []
+        self.pcs = _ValueDistribution(value_filter, self._PC_HIST_SCALE)
         # How many parent periods have us as a child, indexed by
         # parent period name.
         self.parent_count = {}
@@ -87,7 +119,7 @@ class _PeriodStats():
         if self.max_count < count:
             self.max_count = count
         self.total_count += count
-        self.count_array.append(count)
+        self.counts.update(count)
 
     def add_duration(self, duration):
         if self.min is None or duration < self.min:
@@ -95,7 +127,7 @@ class _PeriodStats():
         if self.max < duration:
             self.max = duration
         self.total += duration
-        self.durations.append(duration)
+        self.durations.update(duration)
 
     def add_percentage(self, pc):
         if self.min_pc is None or pc < self.min_pc:
@@ -103,15 +135,14 @@ class _PeriodStats():
         if self.max_pc < pc:
             self.max_pc = pc
         self.total_pc += pc
-        self.pc_array.append(pc)
+        self.pcs.update(pc)
 
 
 class _TmpAggregation():
     def __init__(self, parent=None):
-        # self._children[name] = [durations]
+        # self._children[name] = histogram of the durations
         self._children = {}
         self._parent = parent
-        self.capture_groups = None
 
     @property
     def children(self):
@@ -119,8 +150,8 @@ class _TmpAggregation():
 
     def add_child(self, name, duration):
         if name not in self._children.keys():
-            self._children[name] = []
-        self._children[name].append(duration)
+            self._children[name] = stats.LogLinearHistogram()
+        self._children[name].update(duration)
 
         parent = self._parent
         while parent is not None:
@@ -129,17 +160,18 @@ class _TmpAggregation():
 
 
 class _AggregatedPeriodStats():
-    def __init__(self, registry, name):
+    def __init__(self, registry, name, value_filter=None):
         self._reg = registry
         self._name = name
         self._children = OrderedDict()
-        self._stats = _PeriodStats()
+        self._value_filter = value_filter
         self.nr_periods = 0
         self._init_children()
 
     def _recurs_find_children(self, period):
         for child in period.children:
-            self._children[child.name] = _PeriodStats()
+            self._children[child.name] = _PeriodStats(
+                value_filter=self._value_filter)
             self._recurs_find_children(child)
 
     def _init_children(self):
@@ -151,10 +183,8 @@ class _AggregatedPeriodStats():
     def finish_period(self, start_ts, end_ts, child_dict):
         parent_duration = end_ts - start_ts
         for child in child_dict.keys():
-            count = len(child_dict[child])
-            duration = 0
-            for period in child_dict[child]:
-                duration += period
+            count = child_dict[child].count
+            duration = child_dict[child].total
             c = self._children[child]
             pc = (duration / parent_duration) * 100
 
@@ -192,6 +222,62 @@ class _AggregatedItem():
         return self._full_captures
 
 
+class _PeriodAggregation():
+    def __init__(self, keep_hierarchy=True):
+        # Dict with parent period as key. Each entry contains a dict
+        # of all child period that each contain a list of _AggregatedItem.
+        # parent_aggregated_dict[parent_period][child_period] = []
+        self.parent_aggregated_dict = {}
+        # List of PeriodEvent ordered in hierarchy (parents are followed
+        # by their children), None when not needed
+        self.hierarchical_list = [] if keep_hierarchy else None
+        # dict of _AggregatedPeriodStats
+        # OrderedDict because we want the same order as the period_tree
+        self.per_period_stats = OrderedDict()
+        self.per_parent_period_group_by_stats = OrderedDict()
+        # Just the stats for the period per group (not relative to
+        # its parents)
+        self.per_period_group_by_stats = OrderedDict()
+        # group key (tuple of captures) -> group name
+        self._group_names = {}
+
+    def get_group(self, captures):
+        # Returns the (key, name) of the group of a list of captures.
+        # The key is a tuple of the captures sorted by field name.
+        key = tuple(sorted(captures, key=operator.itemgetter(0)))
+
+        try:
+            name = self._group_names.get(key)
+        except TypeError:
+            # unhashable captured value (e.g. array field): use the
+            # name as the key
+            name = _format_group_key(key)
+            return name, name
+
+        if name is None:
+            name = _format_group_key(key)
+            self._group_names[key] = name
+
+        return key, name
+
+
+class _PeriodFrame():
+    # State of a period being visited by
+    # PeriodAnalysisCommand._aggregate_period_tree_stats()
+    def __init__(self, event, captures, ancestors_captures):
+        self.event = event
+        # Group by captures of this period, and of all its ancestors
+        self.captures = captures
+        self.ancestors_captures = ancestors_captures
+        self.children = iter(event.children)
+        # Capture combinations returned by the visited children
+        self.children_captures = []
+
+
+def _format_group_key(group_key):
+    return ', '.join('%s = %s' % (name, value) for name, value in group_key)
+
+
 class PeriodAnalysisCommand(Command):
     _DESC = """The periods command."""
     _ANALYSIS_CLASS = periods.PeriodAnalysis
@@ -246,7 +332,7 @@ class PeriodAnalysisCommand(Command):
                 ('stdev_duration', 'Period duration standard deviation',
                  mi.Duration),
                 ('runtime', 'Total runtime', mi.Duration),
-            ]
+            ] + Command._get_percentile_column_infos('duration', 'duration')
         ),
         (
             _MI_TABLE_CLASS_FREQ_DURATION,
@@ -365,6 +451,45 @@ class PeriodAnalysisCommand(Command):
     def _filter_event_duration(self, period_event):
         return self._filter_duration(period_event.duration)
 
+    def _filter_top_event(self, period_event):
+        if not self._filter_event_duration(period_event):
+            return False
+        if self._args.select and period_event.name not in \
+                self._args.select:
+            return False
+        return True
+
+    def _create_analysis(self):
+        super()._create_analysis()
+        self._aggregation = None
+
+        if self._args.min_duration is not None or \
+                self._args.max_duration is not None:
+            self._analysis.filter_durations(self._filter_duration)
+
+        # The individual periods are only needed by the log views and
+        # by the aggregation per parent period: otherwise, each tree of
+        # periods is folded into the statistics as soon as its root
+        # period ends, and only the top periods are kept.
+        if self._args.log or self._analysis_conf._aggregate_by is not None:
+            return
+
+        period_tree_cb = None
+        top_limit = None
+
+        if self._args.stats or self._args.freq:
+            self._aggregation = _PeriodAggregation(keep_hierarchy=False)
+            period_tree_cb = self._aggregate_period_tree
+
+        if self._args.top:
+            top_limit = self._args.limit
+
+        self._analysis.stream_periods(period_tree_cb, top_limit,
+                                      self._filter_top_event)
+
+    def _aggregate_period_tree(self, period_event):
+        self._aggregate_period_event(self._aggregation, period_event)
+
     def _get_period_tree(self, period, period_tree):
         period_tree[period.name] = OrderedDict()
         for child in period.children:
@@ -432,8 +557,17 @@ class PeriodAnalysisCommand(Command):
                     begin_ns, end_ns, self._analysis.all_period_list)
 
         if self._args.top:
+            if self._analysis.all_period_list:
+                top_events = heapq.nlargest(
+                    self._args.limit,
+                    filter(self._filter_top_event,
+                           self._analysis.all_period_list),
+                    key=operator.attrgetter('duration'))
+            else:
+                top_events = self._analysis.top_periods
+
             top_table = self._get_top_result_table(
-                begin_ns, end_ns, self._analysis.all_period_list)
+                begin_ns, end_ns, top_events)
 
         # Common tables for stats and freq
         if self._args.stats or self._args.freq:
@@ -667,28 +801,17 @@ class PeriodAnalysisCommand(Command):
             if aggregated_log_tables:
                 self._print_aggregated_log(aggregated_log_tables)
 
-    def _get_filtered_min_max_count_avg_total_values(self, durations):
-        min = None
-        max = None
-        count = 0
-        avg = 0
-        total = 0
-        filter_list = []
-        for d in durations:
-            if not self._filter_duration(d):
-                continue
-            if min is None or min > d:
-                min = d
-            if max is None or max < d:
-                max = d
-            count += 1
-            total += d
-            filter_list.append(d)
-        if count > 0:
-            avg = total / count
-        else:
-            avg = 0
-        return min, max, count, avg, total, filter_list
+    def _filter_durations(self, durations):
+        lower = None
+        upper = None
+
+        if self._args.min_duration is not None:
+            lower = self._args.min_duration * 1000
+
+        if self._args.max_duration is not None:
+            upper = self._args.max_duration * 1000
+
+        return stats_utils.filter_range(durations, lower, upper)
 
     def _get_filtered_min_max_count_avg_total_flist(self, period_list):
         min = None
@@ -755,206 +878,223 @@ class PeriodAnalysisCommand(Command):
                                              group_by_captures,
                                              full_captures)
 
-    def _add_parent_per_group_active_periods(self, event,
-                                             per_group_active_periods,
-                                             group_key):
-        p = None
-        if event.parent is not None and \
-                event.parent not in per_group_active_periods[group_key].keys():
-            p = self._add_parent_per_group_active_periods(
-                event.parent, per_group_active_periods, group_key)
-        per_group_active_periods[group_key][event] = _TmpAggregation(p)
-        return per_group_active_periods[group_key][event]
-
-    def _account_parents_in_group(self, event, full_captures,
-                                  per_parent_period_group_by_stats,
-                                  per_group_active_periods,
-                                  per_period_group_by_stats):
+    def _add_parent_per_group_active_periods(self, event, active_periods):
+        # Adds the missing ancestors of `event` from the top, each one
+        # being nested in the previous one.
+        missing = [event]
+
+        while missing[-1].parent is not None and \
+                missing[-1].parent not in active_periods:
+            missing.append(missing[-1].parent)
+
+        tmp_aggregation = None
+
+        for period_event in reversed(missing):
+            tmp_aggregation = _TmpAggregation(tmp_aggregation)
+            active_periods[period_event] = tmp_aggregation
+
+    def _account_parents_in_group(self, agg, event, full_captures,
+                                  per_group_active_periods):
+        per_parent_period_group_by_stats = \
+            agg.per_parent_period_group_by_stats
+        per_period_group_by_stats = agg.per_period_group_by_stats
+        registry = self._analysis_conf.period_def_registry
+        nr_group_by = len(self._analysis_conf._group_by)
+
         for g in full_captures:
-            group_key = ''
-            if len(g) < len(self._analysis_conf._group_by.keys()):
+            if not g or len(g) < nr_group_by:
                 continue
-            for group in sorted(g, key=lambda x: x[0]):
-                if len(group_key) == 0:
-                    group_key = '%s = %s' % (group[0], group[1])
-                else:
-                    group_key = '%s, %s = %s' % (group_key, group[0],
-                                                 group[1])
 
-            if len(group_key) == 0:
-                continue
+            group_key, group_name = agg.get_group(g)
+            active_periods = per_group_active_periods.get(group_key)
 
-            if group_key not in per_group_active_periods.keys():
-                per_group_active_periods[group_key] = OrderedDict()
+            if active_periods is None:
+                active_periods = {}
+                per_group_active_periods[group_key] = active_periods
 
             # Statistics for this event alone in this group
-            if group_key not in per_period_group_by_stats.keys():
-                per_period_group_by_stats[group_key] = OrderedDict()
-            if event.name not in per_period_group_by_stats[group_key].keys():
-                per_period_group_by_stats[group_key][event.name] = \
-                    _PeriodStats()
-            per_period_group_by_stats[group_key][event.name].add_duration(
-                event.duration)
-
-            if group_key not in per_parent_period_group_by_stats.keys():
-                per_parent_period_group_by_stats[group_key] = OrderedDict()
-            if event.name not in \
-                    per_parent_period_group_by_stats[group_key].keys():
-                per_parent_period_group_by_stats[group_key][event.name] = \
-                    _AggregatedPeriodStats(
-                        self._analysis_conf.period_def_registry,
-                        event.name)
+            period_stats = per_period_group_by_stats.get(group_name)
+
+            if period_stats is None:
+                period_stats = OrderedDict()
+                per_period_group_by_stats[group_name] = period_stats
+            if event.name not in period_stats:
+                period_stats[event.name] = _PeriodStats(
+                    value_filter=self._filter_duration)
+            period_stats[event.name].add_duration(event.duration)
+
+            parent_stats = per_parent_period_group_by_stats.get(group_name)
+
+            if parent_stats is None:
+                parent_stats = OrderedDict()
+                per_parent_period_group_by_stats[group_name] = parent_stats
+            if event.name not in parent_stats:
+                parent_stats[event.name] = _AggregatedPeriodStats(
+                    registry, event.name, self._filter_duration)
+
             # Account all parent periods of this event in all of its groups
             _parent = event.parent
-            _child = event
             while _parent is not None:
-                if _parent not in per_group_active_periods[group_key].keys():
+                if _parent not in active_periods:
                     self._add_parent_per_group_active_periods(
-                        _parent, per_group_active_periods, group_key)
-                if _parent.name not in \
-                        per_parent_period_group_by_stats[group_key].keys():
-                    per_parent_period_group_by_stats[group_key][_parent.name] \
-                        = _AggregatedPeriodStats(
-                        self._analysis_conf.period_def_registry,
-                        _parent.name)
-                per_group_active_periods[group_key][_parent].add_child(
-                    _child.name, _child.duration)
+                        _parent, active_periods)
+                if _parent.name not in parent_stats:
+                    parent_stats[_parent.name] = _AggregatedPeriodStats(
+                        registry, _parent.name, self._filter_duration)
+                active_periods[_parent].add_child(event.name,
+                                                  event.duration)
                 _parent = _parent.parent
 
-            if event in per_group_active_periods[group_key].keys():
-                per_parent_period_group_by_stats[group_key][event.name]. \
-                    finish_period(
-                        event.start_ts, event.end_ts,
-                        per_group_active_periods[group_key][event].children)
-
-    def _hierarchical_sub(self, tmp_hierarchical_list, event, per_period_stats,
-                          per_parent_period_group_by_stats, active_periods,
-                          ancestors_captures, per_group_active_periods,
-                          per_period_group_by_stats):
-        tmp_hierarchical_list.append(event)
+            if event in active_periods:
+                parent_stats[event.name].finish_period(
+                    event.start_ts, event.end_ts,
+                    active_periods[event].children)
 
-        event_captures = event.filtered_captures(self._analysis_conf._group_by)
-#        print(parent_captures, event_captures)
+    def _finish_period_frame(self, agg, frame, active_periods,
+                             per_group_active_periods):
+        event = frame.event
 
         # Our local level capture to return to our parent combined with the
         # captures of our children.
-        local_captures = []
-        global_captures = []
+        if frame.children_captures:
+            local_captures = [frame.captures + c
+                              for c in frame.children_captures]
+        else:
+            local_captures = [frame.captures]
 
-        # Recursively iterate over all the children of this period
-        for child in event.children:
-            if not self._filter_event_duration(child):
-                continue
-            if child.name not in per_period_stats.keys():
-                per_period_stats[child.name] = _AggregatedPeriodStats(
-                    self._analysis_conf.period_def_registry,
-                    child.name)
-            active_periods[event].add_child(child.name, child.duration)
-            active_periods[child] = _TmpAggregation(active_periods[event])
-            child_captures = self._hierarchical_sub(
-                tmp_hierarchical_list, child, per_period_stats,
-                per_parent_period_group_by_stats, active_periods,
-                ancestors_captures + event_captures,
-                per_group_active_periods, per_period_group_by_stats)
-            del active_periods[child]
-            for c in child_captures:
-                local_captures.append(event_captures + c)
-                global_captures.append(event_captures.copy() + c)
-        if len(local_captures) == 0:
-            local_captures = [event_captures]
-            global_captures = [event_captures.copy()]
+        # Deduplicated full capture combinations, in order
         full_captures = []
-        for c in global_captures:
-            tmp_c = c.copy()
-            for d in ancestors_captures:
-                tmp_c.append(d)
-            # dedup
-            if tmp_c not in full_captures:
-                full_captures.append(tmp_c)
-        active_periods[event].capture_groups = full_captures
-
-        self._account_parents_in_group(event, full_captures,
-                                       per_parent_period_group_by_stats,
-                                       per_group_active_periods,
-                                       per_period_group_by_stats)
-
-        per_period_stats[event.name].finish_period(
+        seen = set()
+
+        for c in local_captures:
+            c += frame.ancestors_captures
+
+            try:
+                if c in seen:
+                    continue
+                seen.add(c)
+            except TypeError:
+                # unhashable captured value
+                if c in full_captures:
+                    continue
+
+            full_captures.append(c)
+
+        self._account_parents_in_group(agg, event, full_captures,
+                                       per_group_active_periods)
+        agg.per_period_stats[event.name].finish_period(
             event.start_ts, event.end_ts,
-            active_periods[event].children)
+            active_periods.pop(event).children)
 
         return local_captures
 
-    def _get_aggregated_lists(self):
-        # Dict with parent period as key. Each entry contains a dict
-        # of all child period that each contain a list of _AggregatedItem.
-        # parent_aggregated_dict[parent_period][child_period] = []
-        parent_aggregated_dict = {}
-        # List of PeriodEvent ordered in hierarchy (parents are followed
-        # by their children)
-        hierarchical_list = []
-        # dict of _AggregatedPeriodStats
-        # OrderedDict because we want the same order as the period_tree
-        per_period_stats = OrderedDict()
-        per_parent_period_group_by_stats = OrderedDict()
-        # Just the stats for the period per group (not relative to
-        # its parents)
-        per_period_group_by_stats = OrderedDict()
+    def _aggregate_period_tree_stats(self, agg, root):
+        # Iterative depth-first traversal of a tree of periods which
+        # computes the per-period, per-parent and per-group statistics
+        # of each period once all its children are visited.
+        group_by = self._analysis_conf._group_by
+        registry = self._analysis_conf.period_def_registry
+        per_period_stats = agg.per_period_stats
+        hierarchical_list = agg.hierarchical_list
         # active_periods[period_event] = _TmpAggregation()
-        active_periods = {}
+        active_periods = {root: _TmpAggregation()}
+        # Only refer to the periods of this tree
         per_group_active_periods = {}
-        for period_event in self._analysis.all_period_list:
-            if not self._filter_event_duration(period_event):
-                continue
-            if self._analysis_conf._order_by == "hierarchy" or \
-                    self._args.stats or self._args.freq:
-                # Only top-level events to start the recursive iteration
-                # and extract per_parent stats/freq and hierarchical list
-                # of periods
-                if period_event.parent is None:
-                    active_periods[period_event] = _TmpAggregation()
-                    if period_event.name not in per_period_stats.keys():
-                        per_period_stats[period_event.name] = \
-                            _AggregatedPeriodStats(
-                                self._analysis_conf.period_def_registry,
-                                period_event.name)
-
-                    tmp_hierarchical_list = []
-                    self._hierarchical_sub(
-                        tmp_hierarchical_list, period_event, per_period_stats,
-                        per_parent_period_group_by_stats, active_periods, [],
-                        per_group_active_periods, per_period_group_by_stats)
-                    del active_periods[period_event]
-                    for item in tmp_hierarchical_list:
-                        hierarchical_list.append(item)
-
-            if period_event.name != self._analysis_conf._aggregate_by:
-                continue
-            if period_event not in parent_aggregated_dict.keys():
-                parent_aggregated_dict[period_event] = {}
-            # Associate the periods with their full capture list (each period
-            # sees its own capture and the capture of all its children)
-            tmp_list = []
-            for child in period_event.children:
+
+        if hierarchical_list is not None:
+            hierarchical_list.append(root)
+
+        stack = [_PeriodFrame(root, tuple(root.filtered_captures(group_by)),
+                              ())]
+
+        while stack:
+            frame = stack[-1]
+            event = frame.event
+
+            for child in frame.children:
                 if not self._filter_event_duration(child):
                     continue
-                self._find_aggregated_subperiods(
-                    period_event,
-                    child, tmp_list,
-                    period_event.filtered_captures(
-                        self._analysis_conf._group_by),
-                    period_event.full_captures())
-            for item in tmp_list:
-                if item.event.name not in \
-                        parent_aggregated_dict[period_event].keys():
-                    parent_aggregated_dict[period_event][item.event.name] = []
-                parent_aggregated_dict[period_event][item.event.name]. \
-                    append(item)
+                if child.name not in per_period_stats:
+                    per_period_stats[child.name] = _AggregatedPeriodStats(
+                        registry, child.name, self._filter_duration)
+                active_periods[event].add_child(child.name, child.duration)
+                active_periods[child] = _TmpAggregation(
+                    active_periods[event])
+
+                if hierarchical_list is not None:
+                    hierarchical_list.append(child)
+
+                stack.append(_PeriodFrame(
+                    child, tuple(child.filtered_captures(group_by)),
+                    frame.ancestors_captures + frame.captures))
+                break
+            else:
+                stack.pop()
+                local_captures = self._finish_period_frame(
+                    agg, frame, active_periods, per_group_active_periods)
+
+                if stack:
+                    stack[-1].children_captures.extend(local_captures)
+
+    def _aggregate_period_event(self, agg, period_event):
+        if not self._filter_event_duration(period_event):
+            return
+        if self._analysis_conf._order_by == "hierarchy" or \
+                self._args.stats or self._args.freq:
+            # Only top-level events to start the iteration
+            # and extract per_parent stats/freq and hierarchical list
+            # of periods
+            if period_event.parent is None:
+                if period_event.name not in agg.per_period_stats:
+                    agg.per_period_stats[period_event.name] = \
+                        _AggregatedPeriodStats(
+                            self._analysis_conf.period_def_registry,
+                            period_event.name, self._filter_duration)
+
+                self._aggregate_period_tree_stats(agg, period_event)
+
+        if period_event.name != self._analysis_conf._aggregate_by:
+            return
+        parent_aggregated_dict = agg.parent_aggregated_dict
+        if period_event not in parent_aggregated_dict.keys():
+            parent_aggregated_dict[period_event] = {}
+        # Associate the periods with their full capture list (each period
+        # sees its own capture and the capture of all its children)
+        tmp_list = []
+        for child in period_event.children:
+            if not self._filter_event_duration(child):
+                continue
+            self._find_aggregated_subperiods(
+                period_event,
+                child, tmp_list,
+                period_event.filtered_captures(
+                    self._analysis_conf._group_by),
+                period_event.full_captures())
+        for item in tmp_list:
+            if item.event.name not in \
+                    parent_aggregated_dict[period_event].keys():
+                parent_aggregated_dict[period_event][item.event.name] = []
+            parent_aggregated_dict[period_event][item.event.name]. \
+                append(item)
+
+    def _get_aggregated_lists(self):
+        agg = self._aggregation
+
+        if agg is None:
+            agg = _PeriodAggregation()
+            for period_event in self._analysis.all_period_list:
+                self._aggregate_period_event(agg, period_event)
+
         ordered_parent = collections.OrderedDict(
-            sorted(parent_aggregated_dict.items(),
+            sorted(agg.parent_aggregated_dict.items(),
                    key=lambda t: t[0].start_ts))
+        hierarchical_list = agg.hierarchical_list
+        if hierarchical_list is None:
+            hierarchical_list = []
 
-        return ordered_parent, hierarchical_list, per_period_stats, \
-            per_parent_period_group_by_stats, per_period_group_by_stats
+        return ordered_parent, hierarchical_list, agg.per_period_stats, \
+            agg.per_parent_period_group_by_stats, \
+            agg.per_period_group_by_stats
 
     def _get_aggregated_groups(self, per_parent_aggregated_dict):
         # Group and flatten event list by captured keys, aggregate by parent
@@ -963,20 +1103,15 @@ class PeriodAnalysisCommand(Command):
         for parent in per_parent_aggregated_dict.keys():
             for child in per_parent_aggregated_dict[parent].keys():
                 for ag_event in per_parent_aggregated_dict[parent][child]:
-                    group_key = ""
-                    for group in sorted(ag_event.group_by_captures,
-                                        key=lambda x: x[0]):
-                        if len(group_key) == 0:
-                            group_key = "%s = %s" % (group[0], group[1])
-                        else:
-                            group_key = "%s, %s = %s" % (group_key, group[0],
-                                                         group[1])
-
-                    if group_key not in groups.keys():
+                    group_key = _format_group_key(
+                        sorted(ag_event.group_by_captures,
+                               key=operator.itemgetter(0)))
+
+                    if group_key not in groups:
                         groups[group_key] = {}
-                    if parent not in groups[group_key].keys():
+                    if parent not in groups[group_key]:
                         groups[group_key][parent] = {}
-                    if child not in groups[group_key][parent].keys():
+                    if child not in groups[group_key][parent]:
                         groups[group_key][parent][child] = []
                     groups[group_key][parent][child].append(ag_event)
         return groups
@@ -1005,7 +1140,8 @@ class PeriodAnalysisCommand(Command):
                 total=total,
             )
 
-        return [total_list], total_stats
+        return [[period_event.duration for period_event in total_list]], \
+            total_stats
 
     def _get_one_hierarchical_log_table(self, begin_ns, end_ns,
                                         aggregated_list, sub, top):
@@ -1013,9 +1149,9 @@ class PeriodAnalysisCommand(Command):
             table = self._mi_create_result_table(
                 self._MI_TABLE_CLASS_AGGREGATED_TOP, begin_ns, end_ns,
                 subtitle=sub)
-            top_events = sorted(aggregated_list, key=operator.attrgetter(
-                'event.duration'), reverse=True)
-            top_events = top_events[:self._args.limit]
+            top_events = heapq.nlargest(
+                self._args.limit, aggregated_list,
+                key=operator.attrgetter('event.duration'))
             for ag_event in top_events:
                 table.append_row(
                     parent_begin_ts=mi.Timestamp(
@@ -1104,17 +1240,8 @@ class PeriodAnalysisCommand(Command):
         result_table = self._mi_create_result_table(
             self._MI_TABLE_CLASS_TOP, begin_ns, end_ns)
 
-        top_events = sorted(event_list,
-                            key=operator.attrgetter('duration'),
-                            reverse=True)
-        count = 0
-
-        for period_event in top_events:
-            if not self._filter_event_duration(period_event):
-                continue
-            if self._args.select and period_event.name not in \
-                    self._args.select:
-                continue
+        # event_list is already sorted and limited
+        for period_event in event_list:
             result_table.append_row(
                 begin_ts=mi.Timestamp(period_event.start_ts),
                 end_ts=mi.Timestamp(period_event.end_ts),
@@ -1123,9 +1250,6 @@ class PeriodAnalysisCommand(Command):
                 begin_captures=mi.String(period_event.begin_captures),
                 end_captures=mi.String(period_event.end_captures),
             )
-            count += 1
-            if count == self._args.limit:
-                break
         return result_table
 
     def _get_ordered_period_stats_list(self, parent_name, period_stats_list,
@@ -1201,41 +1325,37 @@ class PeriodAnalysisCommand(Command):
                     global_pc_avg = c.total_pc / \
                         nogroup_c.nr_periods
 
-                if len(c.durations) > 2:
-                    duration_stdev = mi.Duration(statistics.stdev(c.durations))
-                    count_stdev = mi.Number(statistics.stdev(c.count_array))
-                    pc_stdev = mi.Number(statistics.stdev(c.pc_array))
+                if c.durations.stats.count > 2:
+                    duration_stdev = mi.Duration(c.durations.stats.stdev)
+                    count_stdev = mi.Number(c.counts.stats.stdev)
+                    pc_stdev = mi.Number(c.pcs.stats.stdev)
                 else:
                     duration_stdev = mi.Unknown()
                     count_stdev = mi.Unknown()
                     pc_stdev = mi.Unknown()
 
-                # Make temporary copies in case we need to reuse the
-                # original table afterwards.
+                # Save the distributions if we need them for the
+                # frequency distributions. The global ones also count
+                # the parent periods without this child.
+                ret.duration_values[period][child] = c.durations
+                ret.count_values[period][child] = c.counts
+                ret.pc_values[period][child] = c.pcs
                 global_durations = c.durations.copy()
-                global_count_array = c.count_array.copy()
-                global_pc_array = c.pc_array.copy()
-                # Save the raw values if we need them for the frequency
-                # distributions
-                ret.duration_values[period][child] = c.durations.copy()
-                ret.count_values[period][child] = c.count_array.copy()
-                ret.pc_values[period][child] = c.pc_array.copy()
-                ret.global_duration_values[period][child] = c.durations.copy()
-                ret.global_count_values[period][child] = c.count_array.copy()
-                ret.global_pc_values[period][child] = c.pc_array.copy()
+                global_counts = c.counts.copy()
+                global_pcs = c.pcs.copy()
+                ret.global_duration_values[period][child] = global_durations
+                ret.global_count_values[period][child] = global_counts
+                ret.global_pc_values[period][child] = global_pcs
                 if c.parent_count[period] < \
                         nogroup_c.nr_periods:
                     global_min = 0
                     global_min_count = 0
                     global_min_pc = 0
-                    for i in range(nogroup_c.nr_periods -
-                                   c.parent_count[period]):
-                        global_durations.append(0)
-                        global_count_array.append(0)
-                        global_pc_array.append(0)
-                        ret.global_duration_values[period][child].append(0)
-                        ret.global_count_values[period][child].append(0)
-                        ret.global_pc_values[period][child].append(0)
+                    missing_count = nogroup_c.nr_periods - \
+                        c.parent_count[period]
+                    global_durations.update(0, missing_count)
+                    global_counts.update(0, missing_count)
+                    global_pcs.update(0, missing_count)
                 else:
                     global_min = c.min
                     global_min_count = c.min_count
@@ -1243,11 +1363,9 @@ class PeriodAnalysisCommand(Command):
 
                 if nogroup_c.nr_periods > 2:
                     global_duration_stdev = mi.Duration(
-                        statistics.stdev(global_durations))
-                    global_count_stdev = mi.Number(
-                        statistics.stdev(global_count_array))
-                    global_pc_stdev = mi.Number(
-                        statistics.stdev(global_pc_array))
+                        global_durations.stats.stdev)
+                    global_count_stdev = mi.Number(global_counts.stats.stdev)
+                    global_pc_stdev = mi.Number(global_pcs.stats.stdev)
                 else:
                     global_duration_stdev = mi.Unknown()
                     global_count_stdev = mi.Unknown()
@@ -1310,12 +1428,9 @@ class PeriodAnalysisCommand(Command):
 
     def _find_filtered_uniform_freq_values(self, per_period_group_stats):
         for period in per_period_group_stats.keys():
-            table = per_period_group_stats[period]
-            min, max, count, avg, total, total_list = \
-                self._get_filtered_min_max_count_avg_total_values(
-                    table.durations)
-            min, max, step = self._find_uniform_freq_values(total_list, 1000,
-                                                            'duration')
+            duration_stats = per_period_group_stats[period].durations.stats
+            min, max, step = self._find_uniform_freq_values(
+                [duration_stats.min, duration_stats.max], 1000, 'duration')
         # We only care about the last values
         return min, max, step
 
@@ -1333,31 +1448,31 @@ class PeriodAnalysisCommand(Command):
             if self._args.select is not None and \
                     period not in self._args.select:
                 continue
-            table = per_period_group_stats[period]
-            min, max, count, avg, total, total_list = \
-                self._get_filtered_min_max_count_avg_total_values(
-                    table.durations)
-            stdev = self._compute_period_duration_stdev_values(total_list)
+            # The periods are filtered by duration before being
+            # aggregated
+            durations = per_period_group_stats[period].durations
+            duration_stats = durations.stats
+            stdev = duration_stats.stdev
             if math.isnan(stdev):
                 stdev = mi.Unknown()
             else:
                 stdev = mi.Duration(stdev)
-            count = len(total_list)
 
             stats_table.append_row(
                 name=mi.String(self._get_full_period_path(period)),
-                count=mi.Number(count),
-                min_duration=mi.Duration(min),
-                avg_duration=mi.Duration(avg),
-                max_duration=mi.Duration(max),
+                count=mi.Number(duration_stats.count),
+                min_duration=mi.Duration(duration_stats.min),
+                avg_duration=mi.Duration(duration_stats.mean),
+                max_duration=mi.Duration(duration_stats.max),
                 stdev_duration=stdev,
-                runtime=mi.Duration(total),
+                runtime=mi.Duration(duration_stats.total),
+                **self._get_percentile_row_values(durations.hist, 'duration')
             )
 
             subtitle = '{}Duration of period: {}'.format(group_prefix, period)
             tmp_table = self._get_one_freq_result_table(
                 self._MI_TABLE_CLASS_FREQ_DURATION, begin_ns, end_ns,
-                freq_min, freq_max, freq_step, total_list, subtitle, 1000)
+                freq_min, freq_max, freq_step, durations, subtitle, 1000)
             freq_tables.append(tmp_table)
             freq_tables_by_period_name[period] = tmp_table
         return stats_table, freq_tables, freq_tables_by_period_name
@@ -1374,7 +1489,7 @@ class PeriodAnalysisCommand(Command):
                                                 period_tree[parent])
 
         for period_stats in period_stats_list:
-            if not period_stats.period_list:
+            if not period_stats.count:
                 continue
 
             if self._args.select is not None and \
@@ -1383,8 +1498,8 @@ class PeriodAnalysisCommand(Command):
 
             if self._args.min_duration is None and \
                     self._args.max_duration is None:
-                stdev = self._compute_period_duration_stdev(
-                    period_stats.period_list)
+                stdev = period_stats.stdev
+                duration_hist = period_stats.duration_hist
                 min = period_stats.min_duration
                 max = period_stats.max_duration
                 count = period_stats.count
@@ -1395,12 +1510,16 @@ class PeriodAnalysisCommand(Command):
                 else:
                     avg = 0
             else:
-                min, max, count, avg, total, period_list = \
-                    self._get_filtered_min_max_count_avg_total_flist(
-                        period_stats.period_list)
-                if count == 0:
+                filtered_stats = period_stats.filtered_stats
+                if filtered_stats.count == 0:
                     continue
-                stdev = self._compute_period_duration_stdev(period_list)
+                stdev = filtered_stats.stdev
+                duration_hist = period_stats.filtered_duration_hist
+                min = filtered_stats.min
+                max = filtered_stats.max
+                count = filtered_stats.count
+                total = filtered_stats.total
+                avg = filtered_stats.mean
 
             if math.isnan(stdev):
                 stdev = mi.Unknown()
@@ -1415,6 +1534,7 @@ class PeriodAnalysisCommand(Command):
                 max_duration=mi.Duration(max),
                 stdev_duration=stdev,
                 runtime=mi.Duration(total),
+                **self._get_percentile_row_values(duration_hist, 'duration')
             )
 
         return stats_table
@@ -1485,74 +1605,28 @@ class PeriodAnalysisCommand(Command):
 
         return result_tables
 
-    def _fill_freq_result_table(self, period_list, stats, min_duration,
-                                max_duration, step, freq_table):
-        # The number of bins for the histogram
-        resolution = self._args.freq_resolution
-
-        if not self._args.freq_uniform:
-            if self._args.min is not None:
-                min_duration = self._args.min
-            else:
-                min_duration = stats.min
-
-            if self._args.max is not None:
-                max_duration = self._args.max
-            else:
-                max_duration = stats.max
-
-            # ns to µs
-            if min_duration is None:
-                min_duration = 0
-            else:
-                min_duration /= 1000
-
-            if max_duration is None:
-                max_duration = 0
-            else:
-                max_duration /= 1000
-
-            step = (max_duration - min_duration) / resolution
-
-        if step == 0:
-            return
-
-        buckets = []
-        counts = []
-
-        for i in range(resolution):
-            buckets.append(i * step)
-            counts.append(0)
-
-        for period_event in period_list:
-            if not self._filter_event_duration(period_event):
-                continue
-            duration = period_event.duration / 1000
-            index = int((duration - min_duration) / step)
-
-            if index >= resolution:
-                # special case for max value: put in last bucket (includes
-                # its upper bound)
-                if duration == max_duration:
-                    counts[index - 1] += 1
-
-                continue
-
-            counts[index] += 1
-
-        for index, count in enumerate(counts):
-            lower_bound = index * step + min_duration
-            upper_bound = (index + 1) * step + min_duration
+    def _fill_freq_result_table(self, duration_hist, min_duration,
+                                max_duration, step, freq_table,
+                                durations=None):
+        for lower_bound, upper_bound, count in self._get_freq_bins(
+                duration_hist, min_duration, max_duration, step, durations):
             freq_table.append_row(
                 lower=mi.Duration.from_us(lower_bound),
                 upper=mi.Duration.from_us(upper_bound),
                 count=mi.Number(count),
             )
 
-    def _fill_freq_result_table_values(self, values, min_duration,
+    def _get_duration_hist(self, durations):
+        duration_hist = stats.LogLinearHistogram()
+        duration_hist.update_values(durations)
+
+        return duration_hist
+
+    def _fill_freq_result_table_values(self, dist, min_duration,
                                        max_duration, step, freq_table, ratio):
         # Differ from _fill_freq_result_table because we work directly with
-        # a list of values instead of periods.
+        # a _ValueDistribution instead of periods. The counts are always
+        # estimated from its histogram (see Command._get_freq_bins()).
 
         # The number of bins for the histogram
         resolution = self._args.freq_resolution
@@ -1560,13 +1634,17 @@ class PeriodAnalysisCommand(Command):
         if not self._args.freq_uniform:
             if self._args.min is not None:
                 min_duration = self._args.min
+            elif dist.stats.count:
+                min_duration = dist.stats.min / ratio
             else:
-                min_duration = min(values) / ratio
+                min_duration = None
 
             if self._args.max is not None:
                 max_duration = self._args.max
+            elif dist.stats.count:
+                max_duration = dist.stats.max / ratio
             else:
-                max_duration = max(values) / ratio
+                max_duration = None
 
             # ns to µs
             if min_duration is None:
@@ -1580,34 +1658,9 @@ class PeriodAnalysisCommand(Command):
         if step == 0:
             return
 
-        buckets = []
-        counts = []
-
-        for i in range(resolution):
-            buckets.append(i * step)
-            counts.append(0)
-
-        for v in values:
-            if not self._filter_duration(v):
-                continue
-            duration = v / ratio
-            index = int((duration - min_duration) / step)
-
-            if index < 0:
-                raise ValueError('Invalid range, duration=%s, min=%s, max=%s,'
-                                 ' step=%s, resolution=%s' % (
-                                     duration, min_duration, max_duration,
-                                     step, resolution))
-
-            if index >= resolution:
-                # special case for max value: put in last bucket (includes
-                # its upper bound)
-                if duration == max_duration:
-                    counts[index - 1] += 1
-
-                continue
-
-            counts[index] += 1
+        hist_ratio = ratio * dist.hist_scale
+        counts = dist.hist.rebin(min_duration * hist_ratio,
+                                 max_duration * hist_ratio, resolution)
 
         for index, count in enumerate(counts):
             lower_bound = index * step + min_duration
@@ -1621,31 +1674,27 @@ class PeriodAnalysisCommand(Command):
     def _get_total_freq_result_tables(self, begin_ns, end_ns):
         freq_tables = []
         period_lists, period_stats = self._get_total_period_lists_stats()
+        period_lists = [self._filter_durations(period_durations)
+                        for period_durations in period_lists]
+        duration_hists = [self._get_duration_hist(period_durations)
+                          for period_durations in period_lists]
         min_duration = None
         max_duration = None
         step = None
         subtitle = 'All periods'
 
         if self._args.freq_uniform:
-            durations = []
-
-            for period_list in period_lists:
-                for period_event in period_list:
-                    if not self._filter_event_duration(period_event):
-                        continue
-                    durations.append(period_event.duration)
-
             min_duration, max_duration, step = \
-                self._find_uniform_freq_values(durations)
+                self._find_uniform_freq_values_from_hists(duration_hists)
 
-        for period_list in period_lists:
+        for duration_hist, durations in zip(duration_hists, period_lists):
             freq_table = \
                 self._mi_create_result_table(
                     self._MI_TABLE_CLASS_FREQ_DURATION, begin_ns, end_ns,
                     subtitle)
-            self._fill_freq_result_table(period_list, period_stats,
-                                         min_duration, max_duration, step,
-                                         freq_table)
+            self._fill_freq_result_table(duration_hist, min_duration,
+                                         max_duration, step, freq_table,
+                                         durations)
             freq_tables.append(freq_table)
 
         return freq_tables
@@ -1690,44 +1739,16 @@ class PeriodAnalysisCommand(Command):
                 per_period_tables[period].append_row_tuple(tuple(row_tuple))
         return per_period_tables
 
-    def _get_period_lists_stats(self):
-        period_lists = {}
-        period_stats = {}
-
-        for period in self._analysis.all_period_stats.keys():
-            period_list = self._analysis.all_period_stats[period].period_list
-
-            if not period_list:
-                continue
-            if self._args.min_duration is None and \
-                    self._args.max_duration is None:
-                stdev = self._compute_period_duration_stdev(period_list)
-                count = len(period_list)
-                min = self._analysis.all_period_stats[period].min_duration
-                max = self._analysis.all_period_stats[period].max_duration
-                total = \
-                    self._analysis.all_period_stats[period].total_duration
-            else:
-                min, max, count, avg, total, period_list = \
-                    self._get_filtered_min_max_count_avg_total_flist(
-                        period_list)
-                stdev = self._compute_period_duration_stdev(period_list)
-
-            period_stats[period] = _PeriodStats(
-                count=count, min=min, max=max, stdev=stdev, total=total)
-            period_lists[period] = period_list
-
-        return period_lists, period_stats
-
     def _find_table_min_max_step(self, table, ratio, category):
         _min = None
         max = 0
         # Find the uniform freq values across all parent/child combinations
         for period in table.keys():
             for child in table[period].keys():
+                child_stats = table[period][child].stats
                 tmp_min, tmp_max, tmp_step = \
                     self._find_uniform_freq_values(
-                        table[period][child], ratio, category)
+                        [child_stats.min, child_stats.max], ratio, category)
                 if _min is None or tmp_min < _min:
                     _min = tmp_min
                 if tmp_max > max:
@@ -1774,11 +1795,11 @@ class PeriodAnalysisCommand(Command):
             global_pc_step
 
     def _get_one_freq_result_table(self, mi_class, begin_ns, end_ns,
-                                   min, max, step, values,
+                                   min, max, step, dist,
                                    subtitle, ratio=1):
         freq_table = \
             self._mi_create_result_table(mi_class, begin_ns, end_ns, subtitle)
-        self._fill_freq_result_table_values(values, min, max, step,
+        self._fill_freq_result_table_values(dist, min, max, step,
                                             freq_table, ratio)
         return freq_table
 
@@ -1876,70 +1897,61 @@ class PeriodAnalysisCommand(Command):
 
     def _get_per_period_freq_result_tables(self, begin_ns, end_ns):
         freq_tables = []
-        period_lists, period_stats = self._get_period_lists_stats()
+        duration_hists = {}
         min_duration = None
         max_duration = None
         step = None
 
-        if self._args.freq_uniform:
-            durations = []
+        for period, all_stats in self._analysis.all_period_stats.items():
+            if not all_stats.count:
+                continue
 
-            for period_list in period_lists.values():
-                for period_event in period_list:
-                    if not self._filter_event_duration(period_event):
-                        continue
-                    durations.append(period_event.duration)
+            if self._args.min_duration is None and \
+                    self._args.max_duration is None:
+                duration_hists[period] = all_stats.duration_hist
+            else:
+                duration_hists[period] = all_stats.filtered_duration_hist
 
+        if self._args.freq_uniform:
             min_duration, max_duration, step = \
-                self._find_uniform_freq_values(durations)
+                self._find_uniform_freq_values_from_hists(
+                    duration_hists.values())
 
-        for period in sorted(period_stats.keys()):
+        for period in sorted(duration_hists.keys()):
             if self._args.select is not None and \
                     period not in self._args.select:
                 continue
-            period_list = period_lists[period]
-            stats = period_stats[period]
             subtitle = 'Duration of period: {}'.format(period)
             freq_table = \
                 self._mi_create_result_table(
                     self._MI_TABLE_CLASS_FREQ_DURATION, begin_ns, end_ns,
                     subtitle)
-            self._fill_freq_result_table(period_list, stats,
+            durations = None
+
+            if self._analysis.retain_periods:
+                # exact counts (see Command._get_freq_bins())
+                durations = self._filter_durations(
+                    [period_event.duration for period_event in
+                     self._analysis.all_period_stats[period].period_list])
+
+            self._fill_freq_result_table(duration_hists[period],
                                          min_duration, max_duration, step,
-                                         freq_table)
+                                         freq_table, durations)
             freq_tables.append(freq_table)
 
         return freq_tables
 
     def _compute_period_duration_stdev_values(self, durations):
-        period_durations = []
-        for d in durations:
-            if not self._filter_duration(d):
-                continue
-            period_durations.append(d)
-        if len(period_durations) < 2:
-            return float('nan')
-        return statistics.stdev(period_durations)
+        return stats_utils.summarize(self._filter_durations(durations)).stdev
 
     def _compute_period_duration_stdev(self, period_events):
-        period_durations = []
-        for period_event in period_events:
-            if not self._filter_event_duration(period_event):
-                continue
-            period_durations.append(period_event.duration)
-        if len(period_durations) < 2:
-            return float('nan')
-        return statistics.stdev(period_durations)
+        return self._compute_period_duration_stdev_values(
+            [period_event.duration for period_event in period_events])
 
     def _compute_period_agg_duration_stdev(self, period_agg_events):
-        period_durations = []
-        for period_event in period_agg_events:
-            if not self._filter_event_duration(period_event.event):
-                continue
-            period_durations.append(period_event.event.duration)
-        if len(period_durations) < 2:
-            return float('nan')
-        return statistics.stdev(period_durations)
+        return self._compute_period_duration_stdev_values(
+            [period_event.event.duration
+             for period_event in period_agg_events])
 
     def _pop_next_capture_string(self, begin_captures, end_captures):
         if len(begin_captures.keys()) > 0:
@@ -2096,9 +2108,11 @@ class PeriodAnalysisCommand(Command):
                 self._print_period_tree(period_tree[parent], level + 1)
 
     def _print_per_period_stats(self, stats_table, period_tree):
-        row_format = '{:<25} {:>8}  {:>12}  {:>12}  {:>12}  {:>12} {:>12}'
+        row_format = '{:<25} {:>8}  {:>12}  {:>12}  {:>12}  {:>12} {:>12}' + \
+            ' {:>12}' * len(self._PERCENTILES)
         header = row_format.format(
-            'Period', 'Count', 'Min', 'Avg', 'Max', 'Stdev', 'Runtime'
+            'Period', 'Count', 'Min', 'Avg', 'Max', 'Stdev', 'Runtime',
+            *self._get_percentile_headers()
         )
 
         print("Period tree:")
@@ -2122,6 +2136,7 @@ class PeriodAnalysisCommand(Command):
                     '%0.03f' % row.max_duration.to_us(),
                     '%s' % stdev_str,
                     '%0.03f' % row.runtime.to_us(),
+                    *self._get_percentile_strs(row, 'duration')
                 )
 
                 print(row_str)
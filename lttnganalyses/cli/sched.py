@@ -23,24 +23,12 @@
 
 import sys
 import math
-import operator
-import statistics
-import collections
 from . import mi, termgraph
 from ..core import sched
 from .command import Command
 from ..common import format_utils
 
 
-_SchedStats = collections.namedtuple('_SchedStats', [
-    'count',
-    'min',
-    'max',
-    'stdev',
-    'total',
-])
-
-
 class SchedAnalysisCommand(Command):
     _DESC = """The sched command."""
     _ANALYSIS_CLASS = sched.SchedAnalysis
@@ -90,7 +78,7 @@ class SchedAnalysisCommand(Command):
                 ('max_latency', 'Maximum latency', mi.Duration),
                 ('stdev_latency', 'Scheduling latency standard deviation',
                  mi.Duration),
-            ]
+            ] + Command._get_percentile_column_infos('latency', 'latency')
         ),
         (
             _MI_TABLE_CLASS_PER_TID_STATS,
@@ -102,6 +90,7 @@ class SchedAnalysisCommand(Command):
                 ('max_latency', 'Maximum latency', mi.Duration),
                 ('stdev_latency', 'Scheduling latency standard deviation',
                  mi.Duration),
+            ] + Command._get_percentile_column_infos('latency', 'latency') + [
                 ('prio_list', 'Chronological priorities', mi.String),
             ]
         ),
@@ -115,7 +104,7 @@ class SchedAnalysisCommand(Command):
                 ('max_latency', 'Maximum latency', mi.Duration),
                 ('stdev_latency', 'Scheduling latency standard deviation',
                  mi.Duration),
-            ]
+            ] + Command._get_percentile_column_infos('latency', 'latency')
         ),
         (
             _MI_TABLE_CLASS_FREQ,
@@ -235,86 +224,6 @@ class SchedAnalysisCommand(Command):
             if top_table:
                 self._print_sched_events(top_table)
 
-    def _get_total_sched_lists_stats(self, period_data):
-        total_list = period_data.sched_list
-        stdev = self._compute_sched_latency_stdev(total_list)
-        total_stats = _SchedStats(
-            count=self._analysis.count(period_data),
-            min=period_data.min_latency,
-            max=period_data.max_latency,
-            stdev=stdev,
-            total=period_data.total_latency
-        )
-
-        return [total_list], total_stats
-
-    def _get_tid_sched_lists_stats(self, period_data):
-        tid_sched_lists = {}
-        tid_stats = {}
-
-        for sched_event in period_data.sched_list:
-            tid = sched_event.wakee_proc.tid
-            if tid not in tid_sched_lists:
-                tid_sched_lists[tid] = []
-
-            tid_sched_lists[tid].append(sched_event)
-
-        for tid in tid_sched_lists:
-            sched_list = tid_sched_lists[tid]
-
-            if not sched_list:
-                continue
-
-            stdev = self._compute_sched_latency_stdev(sched_list)
-            latencies = [sched.latency for sched in sched_list]
-            count = len(latencies)
-            min_latency = min(latencies)
-            max_latency = max(latencies)
-            total_latency = sum(latencies)
-
-            tid_stats[tid] = _SchedStats(
-                count=count,
-                min=min_latency,
-                max=max_latency,
-                stdev=stdev,
-                total=total_latency,
-            )
-
-        return tid_sched_lists, tid_stats
-
-    def _get_prio_sched_lists_stats(self, period_data):
-        prio_sched_lists = {}
-        prio_stats = {}
-
-        for sched_event in period_data.sched_list:
-            if sched_event.prio not in prio_sched_lists:
-                prio_sched_lists[sched_event.prio] = []
-
-            prio_sched_lists[sched_event.prio].append(sched_event)
-
-        for prio in prio_sched_lists:
-            sched_list = prio_sched_lists[prio]
-
-            if not sched_list:
-                continue
-
-            stdev = self._compute_sched_latency_stdev(sched_list)
-            latencies = [sched.latency for sched in sched_list]
-            count = len(latencies)
-            min_latency = min(latencies)
-            max_latency = max(latencies)
-            total_latency = sum(latencies)
-
-            prio_stats[prio] = _SchedStats(
-                count=count,
-                min=min_latency,
-                max=max_latency,
-                stdev=stdev,
-                total=total_latency,
-            )
-
-        return prio_sched_lists, prio_stats
-
     def _get_log_result_table(self, period_data, begin_ns, end_ns):
         result_table = self._mi_create_result_table(self._MI_TABLE_CLASS_LOG,
                                                     begin_ns, end_ns)
@@ -347,12 +256,7 @@ class SchedAnalysisCommand(Command):
         result_table = self._mi_create_result_table(
             self._MI_TABLE_CLASS_TOP, begin_ns, end_ns)
 
-        top_events = sorted(period_data.sched_list,
-                            key=operator.attrgetter('latency'),
-                            reverse=True)
-        top_events = top_events[:self._args.limit]
-
-        for sched_event in top_events:
+        for sched_event in period_data.top_sched.items:
             wakee_proc = mi.Process(sched_event.wakee_proc.comm,
                                     sched_event.wakee_proc.pid,
                                     sched_event.wakee_proc.tid)
@@ -381,7 +285,7 @@ class SchedAnalysisCommand(Command):
             self._mi_create_result_table(self._MI_TABLE_CLASS_TOTAL_STATS,
                                          begin_ns, end_ns)
 
-        stdev = self._compute_sched_latency_stdev(period_data.sched_list)
+        stdev = period_data.latency_stats.stdev
         if math.isnan(stdev):
             stdev = mi.Unknown()
         else:
@@ -409,6 +313,8 @@ class SchedAnalysisCommand(Command):
             avg_latency=avg,
             max_latency=max,
             stdev_latency=stdev,
+            **self._get_percentile_row_values(
+                self._analysis.latency_hist(period_data), 'latency')
         )
 
         return stats_table
@@ -422,10 +328,10 @@ class SchedAnalysisCommand(Command):
                                 key=lambda proc: proc.comm.lower())
 
         for tid_stats in tid_stats_list:
-            if not tid_stats.sched_list:
+            if not tid_stats.count:
                 continue
 
-            stdev = self._compute_sched_latency_stdev(tid_stats.sched_list)
+            stdev = tid_stats.latency_stats.stdev
             if math.isnan(stdev):
                 stdev = mi.Unknown()
             else:
@@ -442,6 +348,8 @@ class SchedAnalysisCommand(Command):
                 max_latency=mi.Duration(tid_stats.max_latency),
                 stdev_latency=stdev,
                 prio_list=mi.String(prio_list),
+                **self._get_percentile_row_values(tid_stats.latency_hist,
+                                                  'latency')
             )
 
         return stats_table
@@ -451,7 +359,7 @@ class SchedAnalysisCommand(Command):
             self._mi_create_result_table(self._MI_TABLE_CLASS_PER_PRIO_STATS,
                                          begin_ns, end_ns)
 
-        _, prio_stats = self._get_prio_sched_lists_stats(period_data)
+        prio_stats = period_data.prio_latency_stats
 
         for prio in sorted(prio_stats):
             stats = prio_stats[prio]
@@ -474,6 +382,8 @@ class SchedAnalysisCommand(Command):
                 avg_latency=mi.Duration(total_latency / count),
                 max_latency=mi.Duration(max_latency),
                 stdev_latency=stdev,
+                **self._get_percentile_row_values(
+                    period_data.prio_latency_hists[prio], 'latency')
             )
 
         return stats_table
@@ -552,162 +462,86 @@ class SchedAnalysisCommand(Command):
 
         return result_table
 
-    def _fill_freq_result_table(self, sched_list, stats, min_duration,
-                                max_duration, step, freq_table):
-        # The number of bins for the histogram
-        resolution = self._args.freq_resolution
-
-        if not self._args.freq_uniform:
-            if self._args.min is not None:
-                min_duration = self._args.min
-            else:
-                min_duration = stats.min
-
-            if self._args.max is not None:
-                max_duration = self._args.max
-            else:
-                max_duration = stats.max
-
-            # ns to µs
-            if min_duration is None:
-                min_duration = 0
-            else:
-                min_duration /= 1000
-
-            if max_duration is None:
-                max_duration = 0
-            else:
-                max_duration /= 1000
-
-            step = (max_duration - min_duration) / resolution
-
-        if step == 0:
-            return
-
-        buckets = []
-        counts = []
-
-        for i in range(resolution):
-            buckets.append(i * step)
-            counts.append(0)
-
-        for sched_event in sched_list:
-            duration = sched_event.latency / 1000
-            index = int((duration - min_duration) / step)
-
-            if index >= resolution:
-                # special case for max value: put in last bucket (includes
-                # its upper bound)
-                if duration == max_duration:
-                    counts[index - 1] += 1
-
-                continue
-
-            counts[index] += 1
-
-        for index, count in enumerate(counts):
-            lower_bound = index * step + min_duration
-            upper_bound = (index + 1) * step + min_duration
+    def _fill_freq_result_table(self, latency_hist, min_duration,
+                                max_duration, step, freq_table,
+                                latencies=None):
+        for lower_bound, upper_bound, count in self._get_freq_bins(
+                latency_hist, min_duration, max_duration, step, latencies):
             freq_table.append_row(
                 duration_lower=mi.Duration.from_us(lower_bound),
                 duration_upper=mi.Duration.from_us(upper_bound),
                 count=mi.Number(count),
             )
 
-    def _get_total_freq_result_tables(self, period_data, begin_ns, end_ns):
+    def _get_freq_result_tables(self, latency_hists, subtitles, begin_ns,
+                                end_ns, sched_lists):
+        # The scheduling events of the histograms give the exact counts
+        # when they are kept (see Command._get_freq_bins())
         freq_tables = []
-        sched_lists, sched_stats = self._get_total_sched_lists_stats(
-            period_data)
         min_duration = None
         max_duration = None
         step = None
 
         if self._args.freq_uniform:
-            latencies = []
-
-            for sched_list in sched_lists:
-                latencies += [sched.latency for sched in sched_list]
-
             min_duration, max_duration, step = \
-                self._find_uniform_freq_values(latencies)
+                self._find_uniform_freq_values_from_hists(latency_hists)
 
-        for sched_list in sched_lists:
-            freq_table = \
-                self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
-                                             begin_ns, end_ns)
-            self._fill_freq_result_table(sched_list, sched_stats, min_duration,
-                                         max_duration, step, freq_table)
-            freq_tables.append(freq_table)
-
-        return freq_tables
-
-    def _get_per_tid_freq_result_tables(self, period_data, begin_ns, end_ns):
-        freq_tables = []
-        tid_sched_lists, tid_stats = self._get_tid_sched_lists_stats(
-            period_data)
-        min_duration = None
-        max_duration = None
-        step = None
-
-        if self._args.freq_uniform:
-            latencies = []
+        if not self._analysis.keep_events:
+            sched_lists = [None] * len(latency_hists)
 
-            for sched_list in tid_sched_lists.values():
-                latencies += [sched.latency for sched in sched_list]
+        for latency_hist, subtitle, sched_list in zip(latency_hists,
+                                                      subtitles,
+                                                      sched_lists):
+            latencies = None
 
-            min_duration, max_duration, step = \
-                self._find_uniform_freq_values(latencies)
+            if sched_list is not None:
+                latencies = [sched.latency for sched in sched_list]
 
-        for tid in sorted(tid_sched_lists):
-            sched_list = tid_sched_lists[tid]
-            stats = tid_stats[tid]
-            subtitle = 'TID: {}'.format(tid)
             freq_table = \
                 self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
                                              begin_ns, end_ns, subtitle)
-            self._fill_freq_result_table(sched_list, stats, min_duration,
-                                         max_duration, step, freq_table)
+            self._fill_freq_result_table(latency_hist, min_duration,
+                                         max_duration, step, freq_table,
+                                         latencies)
             freq_tables.append(freq_table)
 
         return freq_tables
 
-    def _get_per_prio_freq_result_tables(self, period_data, begin_ns, end_ns):
-        freq_tables = []
-        prio_sched_lists, prio_stats = self._get_prio_sched_lists_stats(
-            period_data)
-        min_duration = None
-        max_duration = None
-        step = None
+    def _get_total_freq_result_tables(self, period_data, begin_ns, end_ns):
+        return self._get_freq_result_tables(
+            [self._analysis.latency_hist(period_data)], [None],
+            begin_ns, end_ns, [period_data.sched_list])
 
-        if self._args.freq_uniform:
-            latencies = []
+    def _get_per_tid_freq_result_tables(self, period_data, begin_ns, end_ns):
+        tids = sorted(tid for tid, tid_stats in period_data.tids.items()
+                      if tid_stats.count)
 
-            for sched_list in prio_sched_lists.values():
-                latencies += [sched.latency for sched in sched_list]
+        return self._get_freq_result_tables(
+            [period_data.tids[tid].latency_hist for tid in tids],
+            ['TID: {}'.format(tid) for tid in tids], begin_ns, end_ns,
+            [period_data.tids[tid].sched_list for tid in tids])
 
-            min_duration, max_duration, step = \
-                self._find_uniform_freq_values(latencies)
+    def _get_per_prio_freq_result_tables(self, period_data, begin_ns, end_ns):
+        prios = sorted(period_data.prio_latency_hists)
+        prio_sched_lists = {prio: [] for prio in prios}
 
-        for prio in sorted(prio_sched_lists):
-            sched_list = prio_sched_lists[prio]
-            stats = prio_stats[prio]
-            subtitle = 'Priority: {}'.format(prio)
-            freq_table = \
-                self._mi_create_result_table(self._MI_TABLE_CLASS_FREQ,
-                                             begin_ns, end_ns, subtitle)
-            self._fill_freq_result_table(sched_list, stats, min_duration,
-                                         max_duration, step, freq_table)
-            freq_tables.append(freq_table)
+        for sched_event in period_data.sched_list:
+            prio_sched_lists[sched_event.prio].append(sched_event)
 
-        return freq_tables
+        return self._get_freq_result_tables(
+            [period_data.prio_latency_hists[prio] for prio in prios],
+            ['Priority: {}'.format(prio) for prio in prios],
+            begin_ns, end_ns,
+            [prio_sched_lists[prio] for prio in prios])
+
+    def _needs_events(self):
+        return self._args.log
+
+    def _top_limit(self):
+        if not self._args.top:
+            return None
 
-    def _compute_sched_latency_stdev(self, sched_events):
-        sched_latencies = []
-        for sched_event in sched_events:
-            sched_latencies.append(sched_event.latency)
-        if len(sched_latencies) < 2:
-            return float('nan')
-        return statistics.stdev(sched_latencies)
+        return self._args.limit
 
     def _print_sched_events(self, result_table):
         fmt = '[{:<18}, {:<18}] {:>15} {:>10}  {:>3}   {:<25}  {:<25}'
@@ -737,9 +571,11 @@ class SchedAnalysisCommand(Command):
                              target_cpu, wakee_str, waker_str))
 
     def _print_total_stats(self, stats_table):
-        row_format = '{:<12} {:<12} {:<12} {:<12} {:<12}'
+        row_format = '{:<12} {:<12} {:<12} {:<12} {:<12}' + \
+            ' {:<12}' * len(self._PERCENTILES)
         header = row_format.format(
-            'Count', 'Min', 'Avg', 'Max', 'Stdev'
+            'Count', 'Min', 'Avg', 'Max', 'Stdev',
+            *self._get_percentile_headers()
         )
 
         if stats_table.rows:
@@ -758,14 +594,17 @@ class SchedAnalysisCommand(Command):
                     '%0.03f' % row.avg_latency.to_us(),
                     '%0.03f' % row.max_latency.to_us(),
                     '%s' % stdev_str,
+                    *self._get_percentile_strs(row, 'latency')
                 )
 
                 print(row_str)
 
     def _print_per_tid_stats(self, stats_table):
-        row_format = '{:<25} {:>8}  {:>12}  {:>12}  {:>12}  {:>12}   {}'
+        row_format = '{:<25} {:>8}  {:>12}  {:>12}  {:>12}  {:>12}' + \
+            '  {:>12}' * len(self._PERCENTILES) + '   {}'
         header = row_format.format(
-            'Process', 'Count', 'Min', 'Avg', 'Max', 'Stdev', 'Priorities'
+            'Process', 'Count', 'Min', 'Avg', 'Max', 'Stdev',
+            *(self._get_percentile_headers() + ['Priorities'])
         )
 
         if stats_table.rows:
@@ -788,15 +627,18 @@ class SchedAnalysisCommand(Command):
                     '%0.03f' % row.avg_latency.to_us(),
                     '%0.03f' % row.max_latency.to_us(),
                     '%s' % stdev_str,
-                    '%s' % row.prio_list.value,
+                    *(self._get_percentile_strs(row, 'latency') +
+                      [row.prio_list.value])
                 )
 
                 print(row_str)
 
     def _print_per_prio_stats(self, stats_table):
-        row_format = '{:>4} {:>8}  {:>12}  {:>12}  {:>12}  {:>12}'
+        row_format = '{:>4} {:>8}  {:>12}  {:>12}  {:>12}  {:>12}' + \
+            '  {:>12}' * len(self._PERCENTILES)
         header = row_format.format(
-            'Prio', 'Count', 'Min', 'Avg', 'Max', 'Stdev'
+            'Prio', 'Count', 'Min', 'Avg', 'Max', 'Stdev',
+            *self._get_percentile_headers()
         )
 
         if stats_table.rows:
@@ -816,6 +658,7 @@ class SchedAnalysisCommand(Command):
                     '%0.03f' % row.avg_latency.to_us(),
                     '%0.03f' % row.max_latency.to_us(),
                     '%s' % stdev_str,
+                    *self._get_percentile_strs(row, 'latency')
                 )
 
                 print(row_str)
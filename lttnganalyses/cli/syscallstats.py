@@ -24,7 +24,6 @@
 
 import errno
 import operator
-import statistics
 from . import mi
 from ..core import syscalls
 from .command import Command
@@ -140,27 +139,24 @@ class SyscallsAnalysis(Command):
             for syscall in sorted(proc_stats.syscalls.values(),
                                   key=operator.attrgetter('count'),
                                   reverse=True):
-                durations = []
                 return_count = {}
 
-                for syscall_event in syscall.syscalls_list:
-                    durations.append(syscall_event.duration)
-
-                    if syscall_event.ret >= 0:
+                for ret, count in syscall.return_count.items():
+                    if ret >= 0:
                         return_key = 'success'
                     else:
                         try:
-                            return_key = errno.errorcode[-syscall_event.ret]
+                            return_key = errno.errorcode[-ret]
                         except KeyError:
-                            return_key = str(syscall_event.ret)
+                            return_key = str(ret)
 
                     if return_key not in return_count:
                         return_count[return_key] = 1
 
-                    return_count[return_key] += 1
+                    return_count[return_key] += count
 
-                if len(durations) > 2:
-                    stdev = mi.Duration(statistics.stdev(durations))
+                if syscall.count > 2:
+                    stdev = mi.Duration(syscall.duration_stats.stdev)
                 else:
                     stdev = mi.Unknown()
 
@@ -219,6 +215,10 @@ class SyscallsAnalysis(Command):
 
         print('\nTotal syscalls: %d' % (total_calls))
 
+    def _needs_events(self):
+        # Only statistics are output
+        return False
+
     def _add_arguments(self, ap):
         Command._add_proc_filter_args(ap)
 
@@ -0,0 +1,725 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import bisect
+import collections
+import json
+import os
+import re
+
+# Minimal reader of the CTF packet headers and contexts. Only the
+# metadata needed to locate and decode those structures is parsed, the
+# event payloads are never read.
+
+METADATA_FILENAME = 'metadata'
+# Packet index sidecar, hidden so that it is not taken for a stream
+INDEX_FILENAME = '.lttng-analyses-index'
+_INDEX_VERSION = 1
+
+_CTF_MAGIC = 0xc1fc1fc1
+_METADATA_PACKET_MAGIC = 0x75d11d57
+_METADATA_PACKET_HEADER_SIZE = 37
+# Packet headers and contexts are always much smaller than this
+_PACKET_READ_SIZE = 4096
+
+PacketInfo = collections.namedtuple('PacketInfo', [
+    'offset',
+    'size',
+    'stream_id',
+    'cpu_id',
+    'timestamp_begin',
+    'timestamp_end',
+    'seq_num',
+    'events_discarded',
+])
+
+StreamIndex = collections.namedtuple('StreamIndex', [
+    'path',
+    'discarded_size',
+    'packets',
+])
+
+StreamLostEvents = collections.namedtuple('StreamLostEvents', [
+    'path',
+    'stream_id',
+    'cpu_id',
+    'discarded',
+    'missing_packets',
+])
+
+
+class UnsupportedTraceError(Exception):
+    pass
+
+
+class _IntegerType():
+    def __init__(self, size, align, signed, byte_order):
+        self.size = size
+        self.align = align
+        self.signed = signed
+        self.byte_order = byte_order
+
+
+class PacketLayout():
+    def __init__(self, header, contexts, clock_freq=None, clock_offset=0):
+        # List of (name, _IntegerType, array length) tuples
+        self.header = header
+        # Stream id -> list of (name, _IntegerType, array length) tuples
+        self.contexts = contexts
+        self.clock_freq = clock_freq
+        self.clock_offset = clock_offset
+
+    def cycles_to_ns(self, cycles):
+        if cycles is None or self.clock_freq is None:
+            return cycles
+
+        return (cycles + self.clock_offset) * 1000000000 // self.clock_freq
+
+    def field_size(self, stream_id, name):
+        for field_name, int_type, _ in self.contexts.get(stream_id, []):
+            if field_name == name:
+                return int_type.size
+
+        return None
+
+
+def _strip_comments(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+
+    return re.sub(r'//[^\n]*', '', text)
+
+
+def _block_end(text, open_pos):
+    # Return the position right after the brace closing the one at
+    # `open_pos`.
+    depth = 0
+
+    for pos in range(open_pos, len(text)):
+        if text[pos] == '{':
+            depth += 1
+        elif text[pos] == '}':
+            depth -= 1
+
+            if depth == 0:
+                return pos + 1
+
+    raise UnsupportedTraceError('Unbalanced braces in metadata')
+
+
+def _find_blocks(text, pattern):
+    blocks = []
+
+    for match in re.finditer(pattern, text):
+        open_pos = match.end() - 1
+        end = _block_end(text, open_pos)
+        blocks.append((match, text[open_pos + 1:end - 1]))
+
+    return blocks
+
+
+def _top_level(body):
+    # Drop the contents of nested blocks
+    out = []
+    depth = 0
+
+    for char in body:
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif depth == 0:
+            out.append(char)
+
+    return ''.join(out)
+
+
+def _get_attr(body, name):
+    match = re.search(r'(?:^|[;\s])' + re.escape(name) + r'\s*=\s*([^;]+);',
+                      _top_level(body))
+
+    if match is None:
+        return None
+
+    return match.group(1).strip().strip('"')
+
+
+def _split_decls(body):
+    decls = []
+    depth = 0
+    start = 0
+
+    for pos, char in enumerate(body):
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+        elif char == ';' and depth == 0:
+            decl = body[start:pos].strip()
+
+            if decl:
+                decls.append(decl)
+
+            start = pos + 1
+
+    return decls
+
+
+def _parse_integer(body, default_byte_order):
+    attrs = dict(re.findall(r'(\w+)\s*=\s*([^;]+);', body))
+
+    try:
+        size = int(attrs['size'].strip(), 0)
+    except (KeyError, ValueError):
+        raise UnsupportedTraceError('Integer without a valid size')
+
+    if 'align' in attrs:
+        align = int(attrs['align'].strip(), 0)
+    elif size % 8 == 0:
+        align = 8
+    else:
+        align = 1
+
+    signed = attrs.get('signed', 'false').strip() in ('true', 'TRUE', '1')
+    byte_order = attrs.get('byte_order', 'native').strip()
+
+    if byte_order in ('be', 'network'):
+        byte_order = 'big'
+    elif byte_order == 'le':
+        byte_order = 'little'
+    else:
+        byte_order = default_byte_order
+
+    return _IntegerType(size, align, signed, byte_order)
+
+
+def _parse_struct(body, aliases, byte_order):
+    fields = []
+
+    for decl in _split_decls(body):
+        decl = ' '.join(decl.split())
+        match = re.match(r'integer\s*\{(.*)\}\s*(\w+)\s*(?:\[\s*(\d+)\s*\])?$',
+                         decl)
+
+        if match is not None:
+            int_type = _parse_integer(match.group(1), byte_order)
+        else:
+            match = re.match(r'(.+?)\s+(\w+)\s*(?:\[\s*(\d+)\s*\])?$', decl)
+
+            if match is None or match.group(1) not in aliases:
+                raise UnsupportedTraceError(
+                    'Unsupported packet field: {}'.format(decl))
+
+            int_type = aliases[match.group(1)]
+
+        length = match.group(3)
+
+        if length is not None:
+            length = int(length)
+
+        fields.append((match.group(2), int_type, length))
+
+    return fields
+
+
+def _get_struct_decl(body, name, structs, aliases, byte_order):
+    # Resolve either `name := struct foo;` or `name := struct { ... };`
+    match = re.search(re.escape(name) + r'\s*:=\s*struct\s*(\w+)?\s*(\{)?',
+                      body)
+
+    if match is None:
+        return []
+
+    if match.group(2) is not None:
+        end = _block_end(body, match.end() - 1)
+
+        return _parse_struct(body[match.end():end - 1], aliases, byte_order)
+
+    if match.group(1) not in structs:
+        raise UnsupportedTraceError(
+            'Unknown structure: {}'.format(match.group(1)))
+
+    return _parse_struct(structs[match.group(1)], aliases, byte_order)
+
+
+def read_metadata(trace_dir):
+    """Read the TSDL metadata text of a CTF trace.
+
+    Both the plain text and the packetized metadata formats are
+    supported.
+
+    Args:
+        trace_dir (str): path of the directory containing the trace's
+        metadata file.
+
+    Returns:
+        The metadata text.
+
+    Raises:
+        UnsupportedTraceError: if the metadata cannot be read.
+    """
+    with open(os.path.join(trace_dir, METADATA_FILENAME), 'rb') as f:
+        data = f.read()
+
+    if len(data) < 4:
+        raise UnsupportedTraceError('Empty metadata')
+
+    for byte_order in ('little', 'big'):
+        if int.from_bytes(data[:4], byte_order) == _METADATA_PACKET_MAGIC:
+            break
+    else:
+        return data.decode('utf-8', errors='replace')
+
+    text = []
+    offset = 0
+
+    while offset + _METADATA_PACKET_HEADER_SIZE <= len(data):
+        content_size = int.from_bytes(data[offset + 24:offset + 28],
+                                      byte_order) // 8
+        packet_size = int.from_bytes(data[offset + 28:offset + 32],
+                                     byte_order) // 8
+
+        if packet_size <= 0:
+            raise UnsupportedTraceError('Invalid metadata packet size')
+
+        text.append(data[offset + _METADATA_PACKET_HEADER_SIZE:
+                         offset + content_size])
+        offset += packet_size
+
+    return b''.join(text).decode('utf-8', errors='replace')
+
+
+def parse_packet_layout(metadata):
+    """Parse the packet header and context layouts of a CTF trace.
+
+    Args:
+        metadata (str): TSDL metadata text.
+
+    Returns:
+        A PacketLayout instance.
+
+    Raises:
+        UnsupportedTraceError: if the layout uses types which cannot be
+        decoded by this reader.
+    """
+    metadata = _strip_comments(metadata)
+    trace_blocks = _find_blocks(metadata, r'\btrace\s*\{')
+
+    if not trace_blocks:
+        raise UnsupportedTraceError('No trace block in metadata')
+
+    trace_body = trace_blocks[0][1]
+
+    if _get_attr(trace_body, 'byte_order') in ('be', 'network'):
+        byte_order = 'big'
+    else:
+        byte_order = 'little'
+
+    aliases = {}
+
+    for match in re.finditer(r'typealias\s+integer\s*\{([^}]*)\}\s*:=\s*'
+                             r'([^;]+);', metadata):
+        name = ' '.join(match.group(2).split())
+        aliases[name] = _parse_integer(match.group(1), byte_order)
+
+    structs = {}
+
+    for match, body in _find_blocks(metadata, r'\bstruct\s+(\w+)\s*\{'):
+        structs[match.group(1)] = body
+
+    header = _get_struct_decl(trace_body, 'packet.header', structs, aliases,
+                              byte_order)
+    contexts = {}
+
+    for _, body in _find_blocks(metadata, r'\bstream\s*\{'):
+        stream_id = _get_attr(body, 'id')
+
+        if stream_id is None:
+            stream_id = 0
+        else:
+            stream_id = int(stream_id, 0)
+
+        contexts[stream_id] = _get_struct_decl(body, 'packet.context',
+                                               structs, aliases, byte_order)
+
+    clock_freq = None
+    clock_offset = 0
+    clock_blocks = _find_blocks(metadata, r'\bclock\s*\{')
+
+    if clock_blocks:
+        clock_body = clock_blocks[0][1]
+        clock_freq = int(_get_attr(clock_body, 'freq') or 1000000000)
+        offset_s = int(_get_attr(clock_body, 'offset_s') or 0)
+        offset = int(_get_attr(clock_body, 'offset') or 0)
+        clock_offset = offset_s * clock_freq + offset
+
+    return PacketLayout(header, contexts, clock_freq, clock_offset)
+
+
+def read_packet_layout(trace_dir):
+    return parse_packet_layout(read_metadata(trace_dir))
+
+
+def _decode_struct(fields, buf, bit_offset, values):
+    if fields:
+        bit_offset = _align(bit_offset, max(f[1].align for f in fields))
+
+    for name, int_type, length in fields:
+        count = 1 if length is None else length
+
+        for _ in range(count):
+            bit_offset = _align(bit_offset, int_type.align)
+
+            if int_type.size % 8 or bit_offset % 8:
+                raise UnsupportedTraceError(
+                    'Unsupported non byte-aligned field: {}'.format(name))
+
+            start = bit_offset // 8
+            end = start + int_type.size // 8
+
+            if end > len(buf):
+                raise UnsupportedTraceError('Truncated packet')
+
+            value = int.from_bytes(buf[start:end], int_type.byte_order,
+                                   signed=int_type.signed)
+            bit_offset += int_type.size
+
+        if length is None:
+            values[name] = value
+
+    return bit_offset
+
+
+def _align(bit_offset, align):
+    return (bit_offset + align - 1) // align * align
+
+
+def iter_packets(stream_path, layout):
+    """Iterate over the packets of a CTF stream file.
+
+    Only the packet header and context of each packet are read.
+
+    Args:
+        stream_path (str): path of the stream file.
+        layout (PacketLayout): packet layout of the trace.
+
+    Yields:
+        A PacketInfo instance for each packet of the stream.
+
+    Raises:
+        UnsupportedTraceError: if a packet cannot be decoded.
+    """
+    file_size = os.path.getsize(stream_path)
+
+    with open(stream_path, 'rb') as f:
+        offset = 0
+
+        while offset < file_size:
+            f.seek(offset)
+            buf = f.read(_PACKET_READ_SIZE)
+            values = {}
+            bit_offset = _decode_struct(layout.header, buf, 0, values)
+
+            if values.get('magic', _CTF_MAGIC) != _CTF_MAGIC:
+                raise UnsupportedTraceError(
+                    'Invalid packet magic in {}'.format(stream_path))
+
+            stream_id = values.get('stream_id', 0)
+
+            if stream_id not in layout.contexts:
+                raise UnsupportedTraceError(
+                    'Unknown stream id {} in {}'.format(stream_id,
+                                                        stream_path))
+
+            _decode_struct(layout.contexts[stream_id], buf, bit_offset,
+                           values)
+
+            if 'packet_size' in values:
+                size = values['packet_size'] // 8
+            else:
+                size = file_size - offset
+
+            if size <= 0:
+                raise UnsupportedTraceError(
+                    'Invalid packet size in {}'.format(stream_path))
+
+            yield PacketInfo(
+                offset=offset,
+                size=size,
+                stream_id=stream_id,
+                cpu_id=values.get('cpu_id'),
+                timestamp_begin=values.get('timestamp_begin'),
+                timestamp_end=values.get('timestamp_end'),
+                seq_num=values.get('packet_seq_num'),
+                events_discarded=values.get('events_discarded'),
+            )
+
+            offset += size
+
+
+def find_trace_dirs(path):
+    """Find the CTF traces under a path.
+
+    Args:
+        path (str): root path of a trace or of a set of traces.
+
+    Returns:
+        The sorted list of directories containing a CTF trace.
+    """
+    trace_dirs = []
+
+    for root, _, files in os.walk(path):
+        if METADATA_FILENAME in files:
+            trace_dirs.append(root)
+
+    return sorted(trace_dirs)
+
+
+def get_stream_paths(trace_dir):
+    """Get the paths of the stream files of a CTF trace.
+
+    Args:
+        trace_dir (str): path of the directory containing the trace.
+
+    Returns:
+        The sorted list of stream file paths.
+    """
+    paths = []
+
+    for name in sorted(os.listdir(trace_dir)):
+        path = os.path.join(trace_dir, name)
+
+        if name == METADATA_FILENAME or name.startswith('.') or \
+                not os.path.isfile(path):
+            continue
+
+        paths.append(path)
+
+    return paths
+
+
+def _build_stream_index(stream_path, layout):
+    packets = []
+    discarded_size = None
+
+    for packet in iter_packets(stream_path, layout):
+        if discarded_size is None:
+            discarded_size = layout.field_size(packet.stream_id,
+                                               'events_discarded')
+
+        packets.append(packet._replace(
+            timestamp_begin=layout.cycles_to_ns(packet.timestamp_begin),
+            timestamp_end=layout.cycles_to_ns(packet.timestamp_end)))
+
+    return StreamIndex(stream_path, discarded_size, packets)
+
+
+def _load_index(index_path):
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(index, dict) or index.get('version') != _INDEX_VERSION:
+        return {}
+
+    return index.get('streams', {})
+
+
+def _save_index(index_path, streams):
+    index = {
+        'version': _INDEX_VERSION,
+        'streams': streams,
+    }
+    tmp_path = index_path + '.tmp'
+
+    # The trace directory may be read-only, the index is then simply
+    # rebuilt on each run.
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+
+
+def get_packet_index(trace_dir):
+    """Get the packet index of a CTF trace.
+
+    The index is saved in a sidecar file of the trace directory and
+    reused as long as the stream files are left untouched, so that
+    only the streams which changed since the last run are scanned.
+
+    Args:
+        trace_dir (str): path of the directory containing the trace.
+
+    Returns:
+        A list of StreamIndex instances, one per stream file, in which
+        the packet timestamps are converted to nanoseconds.
+
+    Raises:
+        UnsupportedTraceError: if a stream cannot be decoded by this
+        reader.
+    """
+    index_path = os.path.join(trace_dir, INDEX_FILENAME)
+    cached = _load_index(index_path)
+    streams = {}
+    stream_indexes = []
+    layout = None
+    dirty = False
+
+    for stream_path in get_stream_paths(trace_dir):
+        name = os.path.basename(stream_path)
+        stat = os.stat(stream_path)
+        entry = cached.get(name)
+
+        if entry is not None and entry['size'] == stat.st_size and \
+                entry['mtime_ns'] == stat.st_mtime_ns:
+            stream_index = StreamIndex(
+                stream_path, entry['discarded_size'],
+                [PacketInfo(*packet) for packet in entry['packets']])
+        else:
+            if layout is None:
+                layout = read_packet_layout(trace_dir)
+
+            stream_index = _build_stream_index(stream_path, layout)
+            dirty = True
+
+        streams[name] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'discarded_size': stream_index.discarded_size,
+            'packets': [list(packet) for packet in stream_index.packets],
+        }
+        stream_indexes.append(stream_index)
+
+    if dirty or len(streams) != len(cached):
+        _save_index(index_path, streams)
+
+    return stream_indexes
+
+
+def get_stream_lost_events(stream_index):
+    """Count the events and packets lost in an indexed CTF stream.
+
+    The `events_discarded` packet context field is a per-stream
+    counter, so the deltas between consecutive packets are summed to
+    handle its wrap-around. Gaps in `packet_seq_num` denote packets
+    which were never written to the stream.
+
+    Args:
+        stream_index (StreamIndex): packet index of the stream.
+
+    Returns:
+        A StreamLostEvents instance.
+    """
+    stream_id = None
+    cpu_id = None
+    discarded = 0
+    missing_packets = 0
+    last_discarded = 0
+    last_seq_num = None
+
+    for packet in stream_index.packets:
+        if stream_id is None:
+            stream_id = packet.stream_id
+            cpu_id = packet.cpu_id
+
+        if packet.events_discarded is not None:
+            delta = packet.events_discarded - last_discarded
+
+            if delta < 0:
+                delta += 1 << stream_index.discarded_size
+
+            discarded += delta
+            last_discarded = packet.events_discarded
+
+        if packet.seq_num is not None:
+            if last_seq_num is not None and packet.seq_num > last_seq_num + 1:
+                missing_packets += packet.seq_num - last_seq_num - 1
+
+            last_seq_num = packet.seq_num
+
+    return StreamLostEvents(stream_index.path, stream_id, cpu_id, discarded,
+                            missing_packets)
+
+
+def get_lost_events(path):
+    """Count the events and packets lost in all the CTF traces of a path.
+
+    Args:
+        path (str): root path of a trace or of a set of traces.
+
+    Returns:
+        A list of StreamLostEvents instances, one per stream file.
+
+    Raises:
+        UnsupportedTraceError: if a trace cannot be decoded by this
+        reader.
+    """
+    lost_events = []
+
+    for trace_dir in find_trace_dirs(path):
+        for stream_index in get_packet_index(trace_dir):
+            lost_events.append(get_stream_lost_events(stream_index))
+
+    return lost_events
+
+
+def get_first_packet_timestamp(path, begin_ts, end_ts=None):
+    """Find where the packets overlapping a time range begin.
+
+    Args:
+        path (str): root path of a trace or of a set of traces.
+        begin_ts (int): beginning of the time range (ns).
+        end_ts (int): end of the time range (ns), None for the end of
+        the traces.
+
+    Returns:
+        The earliest beginning timestamp (ns) of the packets
+        overlapping the time range, or None if no packet overlaps it.
+
+    Raises:
+        UnsupportedTraceError: if a trace cannot be decoded by this
+        reader.
+    """
+    first_ts = None
+
+    for trace_dir in find_trace_dirs(path):
+        for stream_index in get_packet_index(trace_dir):
+            packets = stream_index.packets
+            end_timestamps = [packet.timestamp_end for packet in packets]
+            pos = bisect.bisect_left(end_timestamps, begin_ts)
+
+            if pos == len(packets):
+                continue
+
+            packet_ts = packets[pos].timestamp_begin
+
+            if end_ts is not None and packet_ts > end_ts:
+                continue
+
+            if first_ts is None or packet_ts < first_ts:
+                first_ts = packet_ts
+
+    return first_ts
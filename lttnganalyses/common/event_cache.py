@@ -0,0 +1,529 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import array
+import bisect
+import collections
+import json
+import mmap
+import os
+import shutil
+from ..core import event as core_event
+
+# Columnar cache of trace events.
+#
+# The cache is a directory holding:
+#
+#   * manifest.json: the event types, their fields and the signature
+#     of the trace files the cache was built from;
+#   * types.bin and timestamps.bin: the type id and timestamp of each
+#     event, in timestamp order;
+#   * blocks.bin: the row of each event type at the beginning of each
+#     block of _BLOCK_SIZE events, used to start iterating anywhere;
+#   * t<type>_c<column>.bin: one array per field of each event type.
+#     The string and JSON columns hold the end offsets of their values
+#     in the matching .str file.
+#
+# The events whose fields are not cached are still recorded, without
+# any column: the analysis needs the timestamp of every event for its
+# time range and its refresh periods.
+
+CACHE_DIRNAME = '.lttng-analyses-cache'
+_CACHE_VERSION = 2
+_MANIFEST_FILENAME = 'manifest.json'
+_BLOCK_SIZE = 65536
+_FLUSH_SIZE = 65536
+
+_KIND_INT = 'i'
+_KIND_UINT = 'u'
+_KIND_FLOAT = 'f'
+_KIND_STR = 's'
+_KIND_JSON = 'j'
+
+_KIND_TYPECODES = {
+    _KIND_INT: 'q',
+    _KIND_UINT: 'Q',
+    _KIND_FLOAT: 'd',
+    _KIND_STR: 'Q',
+    _KIND_JSON: 'Q',
+}
+
+
+class EventCacheError(Exception):
+    pass
+
+
+def _column_base_path(cache_dir, type_id, col_id):
+    return os.path.join(cache_dir, 't{}_c{}'.format(type_id, col_id))
+
+
+class _ColumnWriter():
+    def __init__(self, base_path):
+        self._path = base_path
+        self._kind = None
+        self._values = None
+        self._blob = None
+        self._blob_offset = 0
+        self._has_negative = False
+        self._has_big = False
+
+    @property
+    def kind(self):
+        if self._kind == _KIND_INT and self._has_big:
+            return _KIND_UINT
+
+        return self._kind
+
+    def _set_kind(self, value):
+        if isinstance(value, int):
+            self._kind = _KIND_INT
+        elif isinstance(value, float):
+            self._kind = _KIND_FLOAT
+        elif isinstance(value, str):
+            self._kind = _KIND_STR
+        else:
+            self._kind = _KIND_JSON
+
+        self._values = array.array(_KIND_TYPECODES[self._kind])
+
+        if self._kind in (_KIND_STR, _KIND_JSON):
+            self._blob = bytearray()
+
+    def append(self, value):
+        if self._kind is None:
+            self._set_kind(value)
+
+        if self._kind == _KIND_INT:
+            if type(value) not in (int, bool):
+                raise EventCacheError('Mixed types in an integer column')
+
+            # Both signed and unsigned 64-bit integers are stored in a
+            # signed array, a column cannot hold both.
+            if value < 0:
+                self._has_negative = True
+            elif value >= 1 << 63:
+                self._has_big = True
+                value -= 1 << 64
+
+            if self._has_negative and self._has_big:
+                raise EventCacheError('Integer column out of range')
+        elif self._kind == _KIND_FLOAT:
+            if not isinstance(value, float):
+                raise EventCacheError('Mixed types in a float column')
+        else:
+            if self._kind == _KIND_STR:
+                if not isinstance(value, str):
+                    raise EventCacheError('Mixed types in a string column')
+
+                data = value.encode()
+            else:
+                data = json.dumps(value).encode()
+
+            self._blob += data
+            self._blob_offset += len(data)
+            value = self._blob_offset
+
+        self._values.append(value)
+
+        if len(self._values) >= _FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._kind is None:
+            return
+
+        with open(self._path + '.bin', 'ab') as f:
+            self._values.tofile(f)
+
+        del self._values[:]
+
+        if self._blob is not None:
+            with open(self._path + '.str', 'ab') as f:
+                f.write(self._blob)
+
+            del self._blob[:]
+
+
+class _EventTypeWriter():
+    def __init__(self, cache_dir, type_id, name, fields):
+        self.name = name
+        # List of (scope, field name) tuples
+        self.fields = fields
+        self.count = 0
+        self.columns = []
+
+        for col_id in range(len(fields)):
+            self.columns.append(_ColumnWriter(
+                _column_base_path(cache_dir, type_id, col_id)))
+
+
+class EventCacheWriter():
+    def __init__(self, cache_dir, signature, scopes, event_filter=None):
+        """Create an event cache writer.
+
+        Args:
+            cache_dir (str): path of the cache directory, replaced
+            when the cache is finalized.
+            signature (list): signature of the cached trace files.
+            scopes (list): (scope, field names) tuples, the fields to
+            cache from each event scope, in field lookup order. A
+            field names value of None means all the fields of the
+            scope.
+            event_filter (callable): called with an event name,
+            returns whether the fields of the events with this name
+            are cached, or None to cache the fields of all the
+            events. The other events only keep their name and
+            timestamp.
+        """
+        self._cache_dir = cache_dir
+        self._tmp_dir = cache_dir + '.tmp'
+        self._signature = signature
+        self._scopes = scopes
+        self._event_filter = event_filter
+        self._type_ids = {}
+        self._types = []
+        self._type_col = array.array('H')
+        self._ts_col = array.array('q')
+        self._blocks = []
+        self._count = 0
+
+        if os.path.exists(self._tmp_dir):
+            shutil.rmtree(self._tmp_dir)
+
+        os.makedirs(self._tmp_dir)
+
+    def _get_fields(self, ev):
+        # (scope, field name) tuples and values of the cached fields
+        # of an event which are set, in scope order
+        fields = []
+        values = []
+
+        if self._event_filter is not None and \
+                not self._event_filter(ev.name):
+            return fields, values
+
+        for scope, names in self._scopes:
+            for name in ev.field_list_with_scope(scope):
+                if names is None or name in names:
+                    value = ev.field_with_scope(name, scope)
+
+                    if value is not None:
+                        fields.append((scope, name))
+                        values.append(value)
+
+        return fields, values
+
+    def _get_type(self, name, fields):
+        # Events with the same name may have different fields (e.g.
+        # a context only enabled in some channels): key the types by
+        # name and field layout
+        key = (name, tuple(fields))
+        type_id = self._type_ids.get(key)
+
+        if type_id is None:
+            type_id = len(self._types)
+
+            if type_id > 0xffff:
+                raise EventCacheError('Too many event types')
+
+            self._types.append(_EventTypeWriter(
+                self._tmp_dir, type_id, name, fields))
+            self._type_ids[key] = type_id
+
+        return type_id
+
+    def add_event(self, ev):
+        if self._count % _BLOCK_SIZE == 0:
+            self._blocks.append([event_type.count
+                                 for event_type in self._types])
+
+        fields, values = self._get_fields(ev)
+        type_id = self._get_type(ev.name, fields)
+        event_type = self._types[type_id]
+
+        for value, column in zip(values, event_type.columns):
+            column.append(value)
+
+        event_type.count += 1
+        self._type_col.append(type_id)
+        self._ts_col.append(ev.timestamp)
+        self._count += 1
+
+        if len(self._type_col) >= _FLUSH_SIZE:
+            self._flush_events()
+
+    def _flush_events(self):
+        with open(os.path.join(self._tmp_dir, 'types.bin'), 'ab') as f:
+            self._type_col.tofile(f)
+
+        with open(os.path.join(self._tmp_dir, 'timestamps.bin'), 'ab') as f:
+            self._ts_col.tofile(f)
+
+        del self._type_col[:]
+        del self._ts_col[:]
+
+    def abort(self):
+        # Remove the partial cache; the existing cache directory, if
+        # any, is left untouched
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def finalize(self):
+        self._flush_events()
+        blocks = array.array('Q')
+
+        for block in self._blocks:
+            blocks.extend(block + [0] * (len(self._types) - len(block)))
+
+        with open(os.path.join(self._tmp_dir, 'blocks.bin'), 'wb') as f:
+            blocks.tofile(f)
+
+        types = []
+
+        for event_type in self._types:
+            fields = []
+
+            for (scope, name), column in zip(event_type.fields,
+                                             event_type.columns):
+                column.flush()
+                fields.append([scope, name, column.kind])
+
+            types.append({
+                'name': event_type.name,
+                'count': event_type.count,
+                'fields': fields,
+            })
+
+        manifest = {
+            'version': _CACHE_VERSION,
+            'signature': self._signature,
+            'count': self._count,
+            'types': types,
+        }
+
+        with open(os.path.join(self._tmp_dir, _MANIFEST_FILENAME), 'w') as f:
+            json.dump(manifest, f)
+
+        if os.path.exists(self._cache_dir):
+            shutil.rmtree(self._cache_dir)
+
+        os.rename(self._tmp_dir, self._cache_dir)
+
+
+def _map_file(path, typecode):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return array.array(typecode)
+
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return memoryview(mapping).cast(typecode)
+
+
+def _map_blob(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _EventType():
+    def __init__(self, cache_dir, type_id, desc):
+        self.name = desc['name']
+        self.scopes = collections.OrderedDict()
+        self._columns = []
+        self._blobs = []
+        self._kinds = []
+        # Field name -> column index of the first scope holding it
+        self._field_cols = {}
+
+        for col_id, (scope, name, kind) in enumerate(desc['fields']):
+            self.scopes.setdefault(scope, {})[name] = col_id
+            self._field_cols.setdefault(name, col_id)
+            self._kinds.append(kind)
+
+            if desc['count'] == 0:
+                self._columns.append(None)
+                self._blobs.append(None)
+                continue
+
+            path = _column_base_path(cache_dir, type_id, col_id)
+            self._columns.append(_map_file(path + '.bin',
+                                           _KIND_TYPECODES[kind]))
+
+            if kind in (_KIND_STR, _KIND_JSON):
+                self._blobs.append(_map_blob(path + '.str'))
+            else:
+                self._blobs.append(None)
+
+    def field_names(self):
+        return list(self._field_cols.keys())
+
+    def field_col(self, name):
+        return self._field_cols.get(name)
+
+    def value(self, col_id, row):
+        column = self._columns[col_id]
+        kind = self._kinds[col_id]
+
+        if kind in (_KIND_STR, _KIND_JSON):
+            begin = column[row - 1] if row > 0 else 0
+            data = bytes(self._blobs[col_id][begin:column[row]])
+
+            if kind == _KIND_STR:
+                return data.decode()
+
+            return json.loads(data.decode())
+
+        return column[row]
+
+
+class CachedEvent(core_event.BaseEvent):
+    # Event of the cached fields of a row of an event type's columns
+    __slots__ = ('_type', '_row', '_timestamp')
+
+    def __init__(self, event_type, row, timestamp):
+        self._type = event_type
+        self._row = row
+        self._timestamp = timestamp
+
+    @property
+    def name(self):
+        return self._type.name
+
+    @property
+    def timestamp(self):
+        return self._timestamp
+
+    def field_with_scope(self, field_name, scope):
+        col_id = self._type.scopes.get(scope, {}).get(field_name)
+
+        if col_id is None:
+            return None
+
+        return self._type.value(col_id, self._row)
+
+    def field_list_with_scope(self, scope):
+        return list(self._type.scopes.get(scope, {}).keys())
+
+    def keys(self):
+        return self._type.field_names()
+
+    def _get_field(self, field_name, default):
+        col_id = self._type.field_col(field_name)
+
+        if col_id is None:
+            return default
+
+        return self._type.value(col_id, self._row)
+
+
+class EventCache():
+    def __init__(self, cache_dir, manifest):
+        self._count = manifest['count']
+        self._types = [_EventType(cache_dir, type_id, desc)
+                       for type_id, desc in enumerate(manifest['types'])]
+        self._type_col = _map_file(os.path.join(cache_dir, 'types.bin'), 'H')
+        self._ts_col = _map_file(os.path.join(cache_dir, 'timestamps.bin'),
+                                 'q')
+        self._blocks = _map_file(os.path.join(cache_dir, 'blocks.bin'), 'Q')
+
+    @classmethod
+    def open(cls, cache_dir, signature):
+        """Open an event cache.
+
+        Args:
+            cache_dir (str): path of the cache directory.
+            signature (list): signature of the current trace files.
+
+        Returns:
+            An EventCache instance, or None if there is no cache or if
+            it was built from other trace files.
+        """
+        try:
+            with open(os.path.join(cache_dir, _MANIFEST_FILENAME)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(manifest, dict) or \
+                manifest.get('version') != _CACHE_VERSION or \
+                manifest.get('signature') != signature:
+            return None
+
+        try:
+            return cls(cache_dir, manifest)
+        except (OSError, KeyError, ValueError, TypeError):
+            return None
+
+    @property
+    def count(self):
+        return self._count
+
+    def _rows_at(self, pos):
+        # Row of each event type at the event at position `pos`
+        ntypes = len(self._types)
+        block = pos // _BLOCK_SIZE
+        rows = list(self._blocks[block * ntypes:(block + 1) * ntypes])
+        type_col = self._type_col
+
+        for i in range(block * _BLOCK_SIZE, pos):
+            rows[type_col[i]] += 1
+
+        return rows
+
+    def events(self, begin_ts=None, end_ts=None):
+        """Iterate over the cached events in timestamp order.
+
+        Args:
+            begin_ts (int): only yield the events from this timestamp
+            (ns), None for the first event.
+            end_ts (int): only yield the events up to this timestamp
+            (ns), None for the last event.
+
+        Yields:
+            A CachedEvent instance for each event.
+        """
+        type_col = self._type_col
+        ts_col = self._ts_col
+        types = self._types
+        pos = 0
+
+        if begin_ts is not None:
+            pos = bisect.bisect_left(ts_col, begin_ts)
+
+        if pos >= self._count:
+            return
+
+        rows = self._rows_at(pos)
+
+        for i in range(pos, self._count):
+            timestamp = ts_col[i]
+
+            if end_ts is not None and timestamp > end_ts:
+                break
+
+            type_id = type_col[i]
+            row = rows[type_id]
+            rows[type_id] = row + 1
+
+            yield CachedEvent(types[type_id], row, timestamp)
@@ -0,0 +1,280 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import multiprocessing
+import queue
+from ..core import event as core_event
+
+# Pipeline splitting the decoding of the events and their analysis
+# across two processes.
+#
+# The decoder process reads the events and sends them to the analysis
+# process in batches of compact rows: the layout id (event name and
+# field names), the timestamp and the field values of each event. The
+# layouts are only sent with the first batch in which they appear.
+#
+# The events which are not decoded are still sent without their
+# fields: the analysis needs the timestamp of every event for its time
+# range and its refresh periods.
+_BATCH_SIZE = 4096
+# Batches in flight between the two processes
+_QUEUE_SIZE = 8
+# Seconds to wait for a batch before checking the decoder process
+_POLL_TIMEOUT = 1
+
+
+class EventPipelineError(Exception):
+    pass
+
+
+class _EventLayout():
+    __slots__ = ('name', 'scopes', 'fields', 'field_names')
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.scopes = {}
+        self.fields = {}
+
+        for index, (scope, field_name) in enumerate(columns):
+            self.scopes.setdefault(scope, {})[field_name] = index
+            # Fields are looked up by name in scope order
+            self.fields.setdefault(field_name, index)
+
+        self.field_names = list(self.fields)
+
+
+class PipelineEvent(core_event.BaseEvent):
+    # Event of the decoded fields of a batch (see BatchDecoder)
+    __slots__ = ('_layout', '_timestamp', '_values')
+
+    def __init__(self, layout, timestamp, values):
+        self._layout = layout
+        self._timestamp = timestamp
+        self._values = values
+
+    @property
+    def name(self):
+        return self._layout.name
+
+    @property
+    def timestamp(self):
+        return self._timestamp
+
+    def field_with_scope(self, field_name, scope):
+        index = self._layout.scopes.get(scope, {}).get(field_name)
+
+        if index is None:
+            return None
+
+        return self._values[index]
+
+    def field_list_with_scope(self, scope):
+        return list(self._layout.scopes.get(scope, {}).keys())
+
+    def keys(self):
+        return self._layout.field_names
+
+    def _get_field(self, field_name, default):
+        index = self._layout.fields.get(field_name)
+
+        if index is None:
+            return default
+
+        return self._values[index]
+
+
+class BatchEncoder():
+    """Encode events into batches of compact rows.
+
+    Args:
+        scopes (list): (scope, field names) tuples, in field lookup
+        order; all the fields of a scope are kept if its field names
+        are None.
+        event_filter (callable): called with an event name, returns
+        whether the fields of the events with this name are decoded,
+        or None to decode the fields of all the events. The other
+        events only keep their name and timestamp.
+    """
+    def __init__(self, scopes, event_filter=None):
+        self._scopes = scopes
+        self._event_filter = event_filter
+        self._wanted = {}
+        self._layouts = {}
+        self._new_layouts = []
+        self._rows = []
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _is_wanted(self, name):
+        if self._event_filter is None:
+            return True
+
+        wanted = self._wanted.get(name)
+
+        if wanted is None:
+            wanted = bool(self._event_filter(name))
+            self._wanted[name] = wanted
+
+        return wanted
+
+    def add_event(self, ev):
+        name = ev.name
+        columns = []
+        values = []
+        scopes = self._scopes
+
+        # Only the name and the timestamp of the other events are sent
+        if not self._is_wanted(name):
+            scopes = ()
+
+        for scope, field_names in scopes:
+            if field_names is None:
+                field_names = ev.field_list_with_scope(scope)
+
+            for field_name in field_names:
+                value = ev.field_with_scope(field_name, scope)
+
+                if value is None:
+                    continue
+
+                columns.append((scope, field_name))
+                values.append(value)
+
+        key = (name, tuple(columns))
+        layout_id = self._layouts.get(key)
+
+        if layout_id is None:
+            layout_id = len(self._layouts)
+            self._layouts[key] = layout_id
+            self._new_layouts.append(key)
+
+        self._rows.append((layout_id, ev.timestamp, tuple(values)))
+
+    def flush(self):
+        batch = (self._new_layouts, self._rows)
+        self._new_layouts = []
+        self._rows = []
+
+        return batch
+
+
+class BatchDecoder():
+    def __init__(self):
+        self._layouts = []
+
+    def decode(self, batch):
+        new_layouts, rows = batch
+
+        for name, columns in new_layouts:
+            self._layouts.append(_EventLayout(name, columns))
+
+        layouts = self._layouts
+
+        for layout_id, timestamp, values in rows:
+            yield PipelineEvent(layouts[layout_id], timestamp, values)
+
+
+def _run_decoder(read_events, args, scopes, event_filter, batch_queue,
+                 batch_size):
+    try:
+        encoder = BatchEncoder(scopes, event_filter)
+
+        for ev in read_events(*args):
+            encoder.add_event(ev)
+
+            if len(encoder) >= batch_size:
+                batch_queue.put(('batch', encoder.flush()))
+
+        batch_queue.put(('batch', encoder.flush()))
+        batch_queue.put(('end', None))
+    except Exception as e:
+        batch_queue.put(('error', '{}: {}'.format(type(e).__name__, e)))
+
+
+class EventPipeline():
+    """Events decoded by a separate process.
+
+    Args:
+        read_events (callable): module-level function returning an
+        iterable of babeltrace events, called in the decoder process.
+        args (tuple): arguments of read_events.
+        scopes (list): fields of the events to decode, see
+        BatchEncoder.
+        event_filter (callable): picklable filter of the event names
+        whose fields are decoded, see BatchEncoder.
+        batch_size (int): number of events per batch.
+    """
+    def __init__(self, read_events, args, scopes, event_filter=None,
+                 batch_size=_BATCH_SIZE):
+        self._read_events = read_events
+        self._args = args
+        self._scopes = scopes
+        self._event_filter = event_filter
+        self._batch_size = batch_size
+
+    @staticmethod
+    def _get_message(batch_queue, process):
+        while True:
+            try:
+                return batch_queue.get(timeout=_POLL_TIMEOUT)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+
+            # The decoder process may have exited right after sending
+            # its last message.
+            try:
+                return batch_queue.get(timeout=_POLL_TIMEOUT)
+            except queue.Empty:
+                raise EventPipelineError(
+                    'Decoder process exited with code {}'.format(
+                        process.exitcode))
+
+    def events(self):
+        batch_queue = multiprocessing.Queue(_QUEUE_SIZE)
+        process = multiprocessing.Process(
+            target=_run_decoder,
+            args=(self._read_events, self._args, self._scopes,
+                  self._event_filter, batch_queue, self._batch_size))
+        process.daemon = True
+        process.start()
+        decoder = BatchDecoder()
+
+        try:
+            while True:
+                kind, payload = self._get_message(batch_queue, process)
+
+                if kind == 'end':
+                    break
+
+                if kind == 'error':
+                    raise EventPipelineError(payload)
+
+                yield from decoder.decode(payload)
+        finally:
+            # The analysis can stop before the end of the trace
+            if process.is_alive():
+                process.terminate()
+
+            process.join()
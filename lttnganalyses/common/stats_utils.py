@@ -0,0 +1,284 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import array
+import collections
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+Summary = collections.namedtuple('Summary',
+                                 ['count', 'min', 'max', 'total', 'stdev'])
+
+_NUMPY_DTYPES = {
+    'b': 'int8', 'h': 'int16', 'i': 'int32', 'l': 'int64', 'q': 'int64',
+    'f': 'float32', 'd': 'float64',
+}
+
+
+def _to_numpy(values):
+    if isinstance(values, numpy.ndarray):
+        return values
+
+    if isinstance(values, array.array) and \
+            values.typecode in _NUMPY_DTYPES and \
+            numpy.dtype(_NUMPY_DTYPES[values.typecode]).itemsize == \
+            values.itemsize:
+        # no copy
+        return numpy.frombuffer(values, dtype=_NUMPY_DTYPES[values.typecode])
+
+    return numpy.asarray(list(values))
+
+
+def _numpy_sum(values, max_abs):
+    if values.dtype.kind in 'iu' and max_abs * len(values) >= 1 << 63:
+        # the sum could overflow a 64-bit integer
+        return sum(values.tolist())
+
+    return values.sum().item()
+
+
+def summarize(values):
+    """Compute the statistics of a sequence of numbers.
+
+    The statistics are computed at once with NumPy if available,
+    otherwise in a single pass.
+
+    Args:
+        values: a list, array.array or NumPy array of numbers.
+
+    Returns:
+        A Summary of the count, minimum, maximum, total and sample
+        standard deviation (like statistics.stdev()) of the values.
+        The minimum and maximum are None if there are no values, and
+        the standard deviation is NaN if there are less than two.
+    """
+    if numpy is not None:
+        values = _to_numpy(values)
+        count = len(values)
+
+        if count == 0:
+            return Summary(0, None, None, 0, float('nan'))
+
+        min_value = values.min().item()
+        max_value = values.max().item()
+        total = _numpy_sum(values, max(abs(min_value), abs(max_value)))
+
+        if count < 2:
+            stdev = float('nan')
+        else:
+            stdev = float(values.std(ddof=1))
+
+        return Summary(count, min_value, max_value, total, stdev)
+
+    count = 0
+    min_value = None
+    max_value = None
+    total = 0
+    mean = 0
+    m2 = 0
+
+    # Welford's online algorithm for the variance
+    for value in values:
+        if min_value is None or value < min_value:
+            min_value = value
+
+        if max_value is None or value > max_value:
+            max_value = value
+
+        count += 1
+        total += value
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+
+    if count < 2:
+        stdev = float('nan')
+    else:
+        stdev = math.sqrt(m2 / (count - 1))
+
+    return Summary(count, min_value, max_value, total, stdev)
+
+
+def filter_range(values, lower=None, upper=None):
+    """Select the values of a sequence within an inclusive range.
+
+    Args:
+        values: a list, array.array or NumPy array of numbers.
+
+        lower (optional): the lowest value to keep, if not None.
+
+        upper (optional): the highest value to keep, if not None.
+
+    Returns:
+        The values within the range, in order, as a NumPy array if
+        available, otherwise as a list.
+    """
+    if numpy is not None:
+        values = _to_numpy(values)
+
+        if lower is None and upper is None:
+            return values
+
+        mask = numpy.ones(len(values), dtype=bool)
+
+        if lower is not None:
+            mask &= values >= lower
+
+        if upper is not None:
+            mask &= values <= upper
+
+        return values[mask]
+
+    return [
+        value for value in values
+        if (lower is None or value >= lower) and
+        (upper is None or value <= upper)
+    ]
+
+
+def uniform_counts(values, lower, upper, resolution, divisor=1):
+    """Count the values of a sequence in uniform bins.
+
+    The range between lower and upper is split in resolution bins of
+    the same width. Each bin includes its lower bound, and the last
+    one also includes the upper bound. The values above the range are
+    ignored, as well as the ones below it by less than a bin width,
+    which are counted in the first bin.
+
+    Args:
+        values: a list, array.array or NumPy array of numbers.
+
+        lower: the lower bound of the first bin.
+
+        upper: the upper bound of the last bin.
+
+        resolution (int): the number of bins.
+
+        divisor (optional): number by which the values are divided
+        before being binned, e.g. 1000 to bin durations in ns within a
+        range in µs (default: 1).
+
+    Returns:
+        The list of the counts of the bins.
+
+    Raises:
+        ValueError: if a value is below the range by more than a bin
+        width.
+    """
+    step = (upper - lower) / resolution
+
+    if numpy is not None:
+        values = _to_numpy(values) / divisor
+        # truncated towards zero, like int()
+        indexes = numpy.trunc((values - lower) / step).astype(numpy.int64)
+
+        if len(indexes) and indexes.min() < 0:
+            raise ValueError('Invalid range, value={}, min={}, max={}, '
+                             'step={}, resolution={}'.format(
+                                 values[indexes.argmin()], lower, upper,
+                                 step, resolution))
+
+        # the upper bound belongs to the last bin
+        indexes[(indexes >= resolution) & (values == upper)] = \
+            resolution - 1
+        counts = numpy.bincount(indexes[indexes < resolution],
+                                minlength=resolution)
+
+        return counts.tolist()
+
+    counts = [0] * resolution
+
+    for value in values:
+        value /= divisor
+        index = int((value - lower) / step)
+
+        if index < 0:
+            raise ValueError('Invalid range, value={}, min={}, max={}, '
+                             'step={}, resolution={}'.format(
+                                 value, lower, upper, step, resolution))
+
+        if index >= resolution:
+            if value == upper:
+                counts[resolution - 1] += 1
+
+            continue
+
+        counts[index] += 1
+
+    return counts
+
+
+def log_linear_bucket_counts(values, sub_bucket_bits):
+    """Count the values of a sequence in log-linear buckets.
+
+    The values below 2^sub_bucket_bits each have their own bucket,
+    the index of which is the value. Each power of two above is split
+    in 2^(sub_bucket_bits - 1) linear buckets: the index of the bucket
+    of a value v of n bits is (n - sub_bucket_bits) *
+    2^(sub_bucket_bits - 1) + (v >> (n - sub_bucket_bits)).
+
+    Args:
+        values: a list, array.array or NumPy array of non-negative
+        integers.
+
+        sub_bucket_bits (int): the precision of the buckets.
+
+    Returns:
+        A dictionary of the counts of the non-empty buckets, indexed
+        by bucket index.
+    """
+    half_sub_bucket_count = 1 << (sub_bucket_bits - 1)
+
+    if numpy is not None:
+        values = _to_numpy(values).astype(numpy.int64, copy=False)
+
+        if not len(values):
+            return {}
+
+        # bit lengths of the values, like int.bit_length()
+        powers_of_two = numpy.left_shift(1, numpy.arange(63,
+                                                         dtype=numpy.int64))
+        bit_lengths = numpy.searchsorted(powers_of_two, values, side='right')
+        shifts = numpy.maximum(bit_lengths - sub_bucket_bits, 0)
+        indexes = numpy.where(
+            shifts == 0, values,
+            shifts * half_sub_bucket_count + numpy.right_shift(values, shifts))
+        indexes, counts = numpy.unique(indexes, return_counts=True)
+
+        return dict(zip(indexes.tolist(), counts.tolist()))
+
+    counts = {}
+
+    for value in values:
+        shift = value.bit_length() - sub_bucket_bits
+
+        if shift > 0:
+            value = shift * half_sub_bucket_count + (value >> shift)
+
+        counts[value] = counts.get(value, 0) + 1
+
+    return counts
@@ -20,6 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
 import time
 import datetime
 import subprocess
@@ -201,3 +202,34 @@ def check_event_exists(handles, name):
             if event.name == name:
                 return True
     return False
+
+
+def get_trace_signature(path):
+    """Get a signature of the files of a trace.
+
+    Data derived from a trace and saved alongside it is only valid for
+    the exact trace files it was computed from, this signature is used
+    to detect that they changed. Hidden files and directories, where
+    such data is saved, are not part of the signature.
+
+    Args:
+        path (str): root path of the trace.
+
+    Returns:
+        A list of (relative path, size, modification time) tuples.
+    """
+    signature = []
+
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+
+            file_path = os.path.join(root, name)
+            stat = os.stat(file_path)
+            signature.append([os.path.relpath(file_path, path),
+                              stat.st_size, stat.st_mtime_ns])
+
+    return signature
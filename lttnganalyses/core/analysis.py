@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 from . import period as core_period
+from ..linuxautomaton.sp import EventRouter
 import enum
 
 
@@ -53,6 +54,11 @@ class AnalysisCallbackType(enum.Enum):
 
 
 class Analysis:
+    # Names of the state notifications the analysis subscribes to, from
+    # which the automaton feeding it runs only the state providers
+    # sending them. Must cover the names of `state_cbs`.
+    STATE_NOTIFICATIONS = []
+
     def __init__(self, state, conf, state_cbs):
         self._state = state
         self._conf = conf
@@ -62,6 +68,7 @@ class Analysis:
         self._last_event_ts = None
         self._notification_cli_cbs = {}
         self._cbs = {}
+        self._router = EventRouter()
         period_cbs = {
             core_period.PeriodEngineCallbackType.PERIOD_BEGIN:
                 self._on_period_begin,
@@ -81,6 +88,13 @@ class Analysis:
 
         self.started = False
         self.ended = False
+        # Whether or not the specific analysis keeps the individual
+        # events (for logs, tops, frequency distributions) on top of
+        # the statistics it computes as they are processed.
+        self.keep_events = True
+        # Number of top events the specific analysis keeps as they are
+        # processed, if any (see stats.TopList).
+        self.top_limit = None
 
     @property
     def first_event_ts(self):
@@ -274,19 +288,10 @@ class Analysis:
 
     def _register_cbs(self, cbs):
         self._cbs = cbs
+        self._router = EventRouter([cbs])
 
     def _process_event_cb(self, ev):
-        name = ev.name
-
-        if name in self._cbs:
-            self._cbs[name](ev)
-        elif 'syscall_entry' in self._cbs and \
-             (name.startswith('sys_') or name.startswith('syscall_entry_')):
-            self._cbs['syscall_entry'](ev)
-        elif 'syscall_exit' in self._cbs and \
-                (name.startswith('exit_syscall') or
-                 name.startswith('syscall_exit_')):
-            self._cbs['syscall_exit'](ev)
+        self._router.process_event(ev)
 
     def _check_analysis_begin(self, ev):
         if self._conf.begin_ts and ev.timestamp >= self._conf.begin_ts:
@@ -33,6 +33,11 @@ class _PeriodData(PeriodData):
 
 
 class Cputop(Analysis):
+    STATE_NOTIFICATIONS = [
+        'sched_migrate_task', 'sched_switch_per_cpu', 'sched_switch_per_tid',
+        'prio_changed',
+    ]
+
     def __init__(self, state, conf):
         notification_cbs = {
             'sched_migrate_task': self._process_sched_migrate_task,
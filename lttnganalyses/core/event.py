@@ -34,14 +34,65 @@ _CTF_SCOPES = (
 )
 
 
-# This class has an interface which is compatible with the
-# babeltrace.reader.Event class. This is the result of a deep copy
-# performed by LTTng analyses.
-class Event(collections.abc.Mapping):
-    def __init__(self, bt_ev):
-        self._copy_bt_event(bt_ev)
+# Base of the classes which have an interface compatible with the
+# babeltrace.reader.Event class, as a mapping of field names to their
+# values.
+#
+# Subclasses implement the `name` and `timestamp` properties,
+# field_with_scope(), field_list_with_scope(), keys() and
+# _get_field(), which returns `default` when the event has no such
+# field.
+class BaseEvent(collections.abc.Mapping):
+    __slots__ = ()
+
+    # Value of a missing field for _get_field()
+    _NO_FIELD = object()
+
+    @property
+    def cycles(self):
+        return None
+
+    @property
+    def handle(self):
+        raise NotImplementedError()
+
+    @property
+    def trace_collection(self):
+        raise NotImplementedError()
+
+    def __getitem__(self, field_name):
+        field = self._get_field(field_name, self._NO_FIELD)
+
+        if field is self._NO_FIELD:
+            raise KeyError(field_name)
 
-    def _copy_bt_event(self, bt_ev):
+        return field
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, field_name):
+        return self._get_field(field_name, self._NO_FIELD) is not \
+            self._NO_FIELD
+
+    def get(self, field_name, default=None):
+        return self._get_field(field_name, default)
+
+
+# This is the result of a deep copy of a babeltrace.reader.Event
+# performed by LTTng analyses.
+#
+# Only the fields listed in `fields`, as (CTF scope, field name)
+# tuples, are copied if it's set. A None CTF scope stands for the
+# first scope which has the field.
+class Event(BaseEvent):
+    def __init__(self, bt_ev, fields=None):
+        self._copy_bt_event(bt_ev, fields)
+
+    def _copy_bt_event(self, bt_ev, fields):
         self._name = bt_ev.name
         self._cycles = bt_ev.cycles
         self._timestamp = bt_ev.timestamp
@@ -50,9 +101,39 @@ class Event(collections.abc.Mapping):
         for scope in _CTF_SCOPES:
             self._fields[scope] = {}
 
-            for field_name in bt_ev.field_list_with_scope(scope):
-                field_value = bt_ev.field_with_scope(field_name, scope)
-                self._fields[scope][field_name] = field_value
+        if fields is None:
+            for scope in _CTF_SCOPES:
+                for field_name in bt_ev.field_list_with_scope(scope):
+                    field_value = bt_ev.field_with_scope(field_name, scope)
+                    self._fields[scope][field_name] = field_value
+
+            return
+
+        for scope, field_name in fields:
+            if scope is None:
+                self._copy_first_field(bt_ev, field_name)
+            else:
+                self._copy_field(bt_ev, field_name, scope)
+
+    def _copy_field(self, bt_ev, field_name, scope):
+        # a None value may stand for a field which the scope has:
+        # copy it, as the copy of all the fields does
+        field_value = bt_ev.field_with_scope(field_name, scope)
+
+        if field_value is None and \
+                field_name not in bt_ev.field_list_with_scope(scope):
+            return False
+
+        self._fields[scope][field_name] = field_value
+
+        return True
+
+    def _copy_first_field(self, bt_ev, field_name):
+        # stop at the first scope which has the field, even if its
+        # value is None (see _get_field())
+        for scope in _CTF_SCOPES:
+            if self._copy_field(bt_ev, field_name, scope):
+                return
 
     @property
     def name(self):
@@ -66,19 +147,18 @@ class Event(collections.abc.Mapping):
     def timestamp(self):
         return self._timestamp
 
-    @property
-    def handle(self):
-        raise NotImplementedError()
-
-    @property
-    def trace_collection(self):
-        raise NotImplementedError()
-
-    def _get_first_field(self, field_name):
+    def _get_field(self, field_name, default):
+        # a None value of the first scope which has the field stands
+        # for a missing field
         for scope_fields in self._fields.values():
             if field_name in scope_fields:
+                if scope_fields[field_name] is None:
+                    break
+
                 return scope_fields[field_name]
 
+        return default
+
     def field_with_scope(self, field_name, scope):
         if scope not in self._fields:
             raise ValueError('Invalid scope provided')
@@ -92,29 +172,6 @@ class Event(collections.abc.Mapping):
 
         return list(self._fields[scope].keys())
 
-    def __getitem__(self, field_name):
-        field = self._get_first_field(field_name)
-
-        if field is None:
-            raise KeyError(field_name)
-
-        return field
-
-    def __iter__(self):
-        for key in self.keys():
-            yield key
-
-    def __len__(self):
-        count = 0
-
-        for scope_fields in self._fields.values():
-            count += len(scope_fields)
-
-        return count
-
-    def __contains__(self, field_name):
-        return self._get_first_field(field_name) is not None
-
     def keys(self):
         keys = []
 
@@ -123,13 +180,5 @@ class Event(collections.abc.Mapping):
 
         return keys
 
-    def get(self, field_name, default=None):
-        field = self._get_first_field(field_name)
-
-        if field is None:
-            return default
-
-        return field
-
     def items(self):
         raise NotImplementedError()
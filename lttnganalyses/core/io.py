@@ -20,19 +20,50 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from . import stats
+import collections
+import operator
+from . import records, stats
 from .analysis import Analysis, PeriodData
 from ..linuxautomaton import sv
 
 
 class _PeriodData(PeriodData):
-    def __init__(self):
+    def __init__(self, top_limit=None):
         self.disks = {}
         self.ifaces = {}
         self.tids = {}
+        # Latency statistics and histograms of the syscall I/O
+        # requests, indexed by operation (see
+        # IoAnalysis.syscall_latency_stats())
+        operations = [
+            sv.IORequest.OP_OPEN, sv.IORequest.OP_READ,
+            sv.IORequest.OP_WRITE, sv.IORequest.OP_CLOSE,
+            sv.IORequest.OP_SYNC, sv.IORequest.OP_READ_WRITE,
+        ]
+        self.syscall_latency_stats = {
+            operation: stats.RunningStats() for operation in operations
+        }
+        self.syscall_latency_hists = {
+            operation: stats.LogLinearHistogram() for operation in operations
+        }
+        # Longest syscall I/O requests by operation, if requested
+        if top_limit is None:
+            self.syscall_top_requests = None
+        else:
+            self.syscall_top_requests = {
+                operation: stats.TopList(top_limit,
+                                         operator.attrgetter('duration'))
+                for operation in operations
+            }
 
 
 class IoAnalysis(Analysis):
+    STATE_NOTIFICATIONS = [
+        'net_dev_xmit', 'netif_receive_skb', 'block_rq_complete', 'io_rq_exit',
+        'create_fd', 'close_fd', 'update_fd', 'create_parent_proc',
+        'lttng_statedump_block_device',
+    ]
+
     def __init__(self, state, conf):
         notification_cbs = {
             'net_dev_xmit': self._process_net_dev_xmit,
@@ -55,7 +86,7 @@ class IoAnalysis(Analysis):
         self._process_event_cb(ev)
 
     def _create_period_data(self):
-        return _PeriodData()
+        return _PeriodData(self.top_limit)
 
     @property
     def disk_io_requests(self, period_data):
@@ -66,6 +97,11 @@ class IoAnalysis(Analysis):
     def io_requests(self, period_data):
         return self._get_io_requests(period_data)
 
+    def io_request_stores(self, period_data):
+        # IORequestStore of the syscall and block requests of each
+        # process, for the column-wise processing of the requests
+        return [proc.rq_list for proc in period_data.tids.values()]
+
     def open_io_requests(self, period_data):
         return self._get_io_requests(period_data, sv.IORequest.OP_OPEN)
 
@@ -84,6 +120,47 @@ class IoAnalysis(Analysis):
     def read_write_io_requests(self, period_data):
         return self._get_io_requests(period_data, sv.IORequest.OP_READ_WRITE)
 
+    def syscall_latency_stats(self, period_data, io_operation):
+        """Get the latency statistics of syscall io requests by operation.
+
+        Unlike the io requests, those are available even if the
+        analysis does not keep the individual events.
+
+        Args:
+            io_operation (IORequest.OP_*): The operation of the io
+            requests, equivalent operations included.
+
+        Returns:
+            A stats.RunningStats object.
+        """
+        return period_data.syscall_latency_stats[io_operation]
+
+    def syscall_latency_hist(self, period_data, io_operation):
+        """Get the latency histogram of syscall io requests by operation.
+
+        Args:
+            io_operation (IORequest.OP_*): The operation of the io
+            requests, equivalent operations included.
+
+        Returns:
+            A stats.LogLinearHistogram object.
+        """
+        return period_data.syscall_latency_hists[io_operation]
+
+    def syscall_top_requests(self, period_data, io_operation):
+        """Get the longest syscall io requests by operation.
+
+        The analysis only keeps them if its top_limit is set.
+
+        Args:
+            io_operation (IORequest.OP_*): The operation of the io
+            requests, equivalent operations included.
+
+        Returns:
+            A list of at most top_limit io requests, longest first.
+        """
+        return period_data.syscall_top_requests[io_operation].items
+
     def _get_io_requests(self, period_data, io_operation=None):
         """Create a generator of syscall io requests by operation.
 
@@ -93,7 +170,7 @@ class IoAnalysis(Analysis):
         """
         for proc in period_data.tids.values():
             for io_rq in proc.rq_list:
-                if isinstance(io_rq, sv.BlockIORequest):
+                if io_rq.is_block:
                     continue
 
                 if io_operation is None or \
@@ -163,14 +240,15 @@ class IoAnalysis(Analysis):
         if disk.dev not in period_data.disks:
             period_data.disks[disk.dev] = DiskStats.new_from_disk(disk)
 
-        period_data.disks[disk.dev].update_stats(req)
+        period_data.disks[disk.dev].update_stats(req, self.keep_events)
 
         if proc is not None:
             if proc.tid not in period_data.tids:
                 period_data.tids[proc.tid] = ProcessIOStats.new_from_process(
                     proc)
 
-            period_data.tids[proc.tid].update_block_stats(req)
+            period_data.tids[proc.tid].update_block_stats(req,
+                                                          self.keep_events)
 
     def _process_io_rq_exit(self, period_data, **kwargs):
         proc = kwargs['proc']
@@ -202,8 +280,20 @@ class IoAnalysis(Analysis):
                 fd_types['fd_in'] = parent_stats.get_fd(io_rq.fd_in).fd_type
                 fd_types['fd_out'] = parent_stats.get_fd(io_rq.fd_out).fd_type
 
-        proc_stats.update_io_stats(io_rq, fd_types)
-        parent_stats.update_fd_stats(io_rq)
+        for operation, latency_stats in \
+                period_data.syscall_latency_stats.items():
+            if sv.IORequest.is_equivalent_operation(operation,
+                                                    io_rq.operation):
+                latency_stats.update(io_rq.duration)
+                period_data.syscall_latency_hists[operation].update(
+                    io_rq.duration)
+
+                if period_data.syscall_top_requests is not None:
+                    period_data.syscall_top_requests[operation].update(
+                        io_rq)
+
+        proc_stats.update_io_stats(io_rq, fd_types, self.keep_events)
+        parent_stats.update_fd_stats(io_rq, self.keep_events)
 
         # Check if the proc stats comm corresponds to the actual
         # process comm. It might be that it was missing so far.
@@ -297,11 +387,10 @@ class DiskStats():
         else:
             self.diskname = DiskStats._get_name_from_dev(dev)
 
-        self.min_rq_duration = None
-        self.max_rq_duration = None
         self.total_rq_sectors = 0
-        self.total_rq_duration = 0
-        self.rq_list = []
+        self.rq_latency_stats = stats.RunningStats()
+        self.rq_latency_hist = stats.LogLinearHistogram()
+        self.rq_list = IORequestStore()
 
     @classmethod
     def new_from_disk(cls, disk):
@@ -309,24 +398,33 @@ class DiskStats():
 
     @property
     def rq_count(self):
-        return len(self.rq_list)
+        return self.rq_latency_stats.count
 
-    def update_stats(self, req):
-        if self.min_rq_duration is None or req.duration < self.min_rq_duration:
-            self.min_rq_duration = req.duration
-        if self.max_rq_duration is None or req.duration > self.max_rq_duration:
-            self.max_rq_duration = req.duration
+    @property
+    def min_rq_duration(self):
+        return self.rq_latency_stats.min
+
+    @property
+    def max_rq_duration(self):
+        return self.rq_latency_stats.max
 
+    @property
+    def total_rq_duration(self):
+        return self.rq_latency_stats.total
+
+    def update_stats(self, req, keep_event=True):
         self.total_rq_sectors += req.nr_sector
-        self.total_rq_duration += req.duration
-        self.rq_list.append(req)
+        self.rq_latency_stats.update(req.duration)
+        self.rq_latency_hist.update(req.duration)
+
+        if keep_event:
+            self.rq_list.append(req)
 
     def reset(self):
-        self.min_rq_duration = None
-        self.max_rq_duration = None
         self.total_rq_sectors = 0
-        self.total_rq_duration = 0
-        self.rq_list = []
+        self.rq_latency_stats.reset()
+        self.rq_latency_hist.reset()
+        self.rq_list.reset()
 
     @staticmethod
     def _get_name_from_dev(dev):
@@ -361,7 +459,7 @@ class ProcessIOStats(stats.Process):
         self.block_io = stats.IO()
         # FDStats objects, indexed by fd (fileno)
         self.fds = {}
-        self.rq_list = []
+        self.rq_list = IORequestStore()
 
     @classmethod
     def new_from_process(cls, proc):
@@ -376,31 +474,33 @@ class ProcessIOStats(stats.Process):
     def total_write(self):
         return self.disk_io.write + self.net_io.write + self.unk_io.write
 
-    def update_fd_stats(self, req):
+    def update_fd_stats(self, req, keep_event=True):
         if req.errno is not None:
             return
 
         if req.fd is None or self.get_fd(req.fd) is None:
             return
 
-        self.get_fd(req.fd).update_stats(req)
+        self.get_fd(req.fd).update_stats(req, keep_event)
         if isinstance(req, sv.ReadWriteIORequest):
             if req.fd_in is not None:
-                self.get_fd(req.fd_in).update_stats(req)
+                self.get_fd(req.fd_in).update_stats(req, keep_event)
 
             if req.fd_out is not None:
-                self.get_fd(req.fd_out).update_stats(req)
+                self.get_fd(req.fd_out).update_stats(req, keep_event)
 
-    def update_block_stats(self, req):
-        self.rq_list.append(req)
+    def update_block_stats(self, req, keep_event=True):
+        if keep_event:
+            self.rq_list.append(req)
 
         if req.operation is sv.IORequest.OP_READ:
             self.block_io.read += req.size
         elif req.operation is sv.IORequest.OP_WRITE:
             self.block_io.write += req.size
 
-    def update_io_stats(self, req, fd_types):
-        self.rq_list.append(req)
+    def update_io_stats(self, req, fd_types, keep_event=True):
+        if keep_event:
+            self.rq_list.append(req)
 
         if req.size is None or req.errno is not None:
             return
@@ -495,7 +595,7 @@ class ProcessIOStats(stats.Process):
         self.net_io.reset()
         self.unk_io.reset()
         self.block_io.reset()
-        self.rq_list = []
+        self.rq_list.reset()
 
         for fd in self.fds:
             fd_stats = self.get_fd(fd)
@@ -514,14 +614,14 @@ class FDStats():
         self.close_ts = None
         self.io = stats.IO()
         # IO Requests that acted upon the FD
-        self.rq_list = []
+        self.rq_list = IORequestStore()
 
     @classmethod
     def new_from_fd(cls, fd, open_ts):
         return cls(fd.fd, fd.filename, fd.fd_type, fd.cloexec, fd.family,
                    open_ts)
 
-    def update_stats(self, req):
+    def update_stats(self, req, keep_event=True):
         if req.operation is sv.IORequest.OP_READ:
             self.io.read += req.returned_size
         elif req.operation is sv.IORequest.OP_WRITE:
@@ -532,11 +632,12 @@ class FDStats():
             elif self.fd == req.fd_out:
                 self.io.write += req.returned_size
 
-        self.rq_list.append(req)
+        if keep_event:
+            self.rq_list.append(req)
 
     def reset(self):
         self.io.reset()
-        self.rq_list = []
+        self.rq_list.reset()
 
 
 class FileStats():
@@ -571,3 +672,23 @@ class FileStats():
                 return True
 
         return False
+
+
+class IORequestRecord(collections.namedtuple('IORequestRecord', [
+        'begin_ts', 'end_ts', 'duration', 'size', 'tid', 'operation',
+        'errno', 'syscall_name', 'fd', 'fd_in', 'fd_out', 'returned_size',
+        'dev', 'sector', 'nr_sector'])):
+    # I/O request of an IORequestStore, with the attributes of both the
+    # sv.SyscallIORequest and sv.BlockIORequest objects, None if unset
+    __slots__ = ()
+
+    @property
+    def is_block(self):
+        return self.dev is not None
+
+
+class IORequestStore(records.RecordStore):
+    # Columnar log of sv.SyscallIORequest and sv.BlockIORequest objects
+    _FIELDS = list(IORequestRecord._fields)
+    _STRING_FIELDS = frozenset(['syscall_name'])
+    _RECORD_TYPE = IORequestRecord
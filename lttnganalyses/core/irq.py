@@ -20,7 +20,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from . import records, stats
 from .analysis import Analysis, PeriodData
+from ..linuxautomaton import sv
 
 
 class _PeriodData(PeriodData):
@@ -29,10 +31,14 @@ class _PeriodData(PeriodData):
         self.hard_irq_stats = {}
         self.softirq_stats = {}
         # Log of individual interrupts
-        self.irq_list = []
+        self.irq_list = IrqStore()
 
 
 class IrqAnalysis(Analysis):
+    STATE_NOTIFICATIONS = [
+        'irq_handler_entry', 'irq_handler_exit', 'softirq_exit',
+    ]
+
     def __init__(self, state, conf):
         notification_cbs = {
             'irq_handler_entry': self._process_irq_handler_entry,
@@ -65,11 +71,13 @@ class IrqAnalysis(Analysis):
            irq.duration > self._conf.max_duration:
             return
 
-        period_data.irq_list.append(irq)
+        if self.keep_events:
+            period_data.irq_list.append(irq)
         if irq.id not in period_data.hard_irq_stats:
             period_data.hard_irq_stats[irq.id] = HardIrqStats()
 
-        period_data.hard_irq_stats[irq.id].update_stats(irq)
+        period_data.hard_irq_stats[irq.id].update_stats(irq,
+                                                        self.keep_events)
 
     def _process_softirq_exit(self, period_data, **kwargs):
         irq = kwargs['softirq']
@@ -84,21 +92,21 @@ class IrqAnalysis(Analysis):
            irq.duration > self._conf.max_duration:
             return
 
-        period_data.irq_list.append(irq)
+        if self.keep_events:
+            period_data.irq_list.append(irq)
         if irq.id not in period_data.softirq_stats:
             name = SoftIrqStats.names[irq.id]
             period_data.softirq_stats[irq.id] = SoftIrqStats(name)
 
-        period_data.softirq_stats[irq.id].update_stats(irq)
+        period_data.softirq_stats[irq.id].update_stats(irq, self.keep_events)
 
 
 class IrqStats():
     def __init__(self, name):
         self._name = name
-        self.min_duration = None
-        self.max_duration = None
-        self.total_duration = 0
-        self.irq_list = []
+        self.duration_stats = stats.RunningStats()
+        self.duration_hist = stats.LogLinearHistogram()
+        self.irq_list = IrqStore()
 
     @property
     def name(self):
@@ -106,23 +114,31 @@ class IrqStats():
 
     @property
     def count(self):
-        return len(self.irq_list)
+        return self.duration_stats.count
 
-    def update_stats(self, irq):
-        if self.min_duration is None or irq.duration < self.min_duration:
-            self.min_duration = irq.duration
+    @property
+    def min_duration(self):
+        return self.duration_stats.min
 
-        if self.max_duration is None or irq.duration > self.max_duration:
-            self.max_duration = irq.duration
+    @property
+    def max_duration(self):
+        return self.duration_stats.max
 
-        self.total_duration += irq.duration
-        self.irq_list.append(irq)
+    @property
+    def total_duration(self):
+        return self.duration_stats.total
+
+    def update_stats(self, irq, keep_event=True):
+        self.duration_stats.update(irq.duration)
+        self.duration_hist.update(irq.duration)
+
+        if keep_event:
+            self.irq_list.append(irq)
 
     def reset(self):
-        self.min_duration = None
-        self.max_duration = None
-        self.total_duration = 0
-        self.irq_list = []
+        self.duration_stats.reset()
+        self.duration_hist.reset()
+        self.irq_list.reset()
 
 
 class HardIrqStats(IrqStats):
@@ -152,32 +168,64 @@ class SoftIrqStats(IrqStats):
 
     def __init__(self, name):
         super().__init__(name)
-        self.min_raise_latency = None
-        self.max_raise_latency = None
-        self.total_raise_latency = 0
-        self.raise_count = 0
+        self.raise_latency_stats = stats.RunningStats()
 
-    def update_stats(self, irq):
-        super().update_stats(irq)
+    @property
+    def raise_count(self):
+        return self.raise_latency_stats.count
 
-        if irq.raise_ts is None:
-            return
+    @property
+    def min_raise_latency(self):
+        return self.raise_latency_stats.min
 
-        raise_latency = irq.begin_ts - irq.raise_ts
-        if self.min_raise_latency is None or \
-           raise_latency < self.min_raise_latency:
-            self.min_raise_latency = raise_latency
+    @property
+    def max_raise_latency(self):
+        return self.raise_latency_stats.max
 
-        if self.max_raise_latency is None or \
-           raise_latency > self.max_raise_latency:
-            self.max_raise_latency = raise_latency
+    @property
+    def total_raise_latency(self):
+        return self.raise_latency_stats.total
 
-        self.total_raise_latency += raise_latency
-        self.raise_count += 1
+    def update_stats(self, irq, keep_event=True):
+        super().update_stats(irq, keep_event)
+
+        if irq.raise_ts is None:
+            return
+
+        self.raise_latency_stats.update(irq.begin_ts - irq.raise_ts)
 
     def reset(self):
         super().reset()
-        self.min_raise_latency = None
-        self.max_raise_latency = None
-        self.total_raise_latency = 0
-        self.raise_count = 0
+        self.raise_latency_stats.reset()
+
+
+class IrqStore(records.RecordStore):
+    # Columnar log of sv.HardIRQ and sv.SoftIRQ objects
+    _FIELDS = ['is_hard', 'id', 'cpu_id', 'raise_ts', 'begin_ts', 'end_ts',
+               'ret']
+
+    def _get_values(self, irq):
+        is_hard = isinstance(irq, sv.HardIRQ)
+
+        if is_hard:
+            raise_ts = None
+            ret = irq.ret
+        else:
+            raise_ts = irq.raise_ts
+            ret = None
+
+        return [is_hard, irq.id, irq.cpu_id, raise_ts, irq.begin_ts,
+                irq.end_ts, ret]
+
+    def _make_record(self, values):
+        is_hard, id, cpu_id, raise_ts, begin_ts, end_ts, ret = values
+
+        if is_hard:
+            irq = sv.HardIRQ(id, cpu_id, begin_ts)
+            irq.ret = ret
+        else:
+            irq = sv.SoftIRQ(id, cpu_id, raise_ts, begin_ts)
+
+        irq.end_ts = end_ts
+
+        return irq
@@ -30,6 +30,8 @@ class _PeriodData(PeriodData):
 
 
 class Memtop(Analysis):
+    STATE_NOTIFICATIONS = ['tid_page_alloc', 'tid_page_free']
+
     def __init__(self, state, conf):
         notification_cbs = {
             'tid_page_alloc': self._process_tid_page_alloc,
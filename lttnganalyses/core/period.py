@@ -21,9 +21,10 @@
 # SOFTWARE.
 
 from . import event as core_event
-from functools import partial
 import babeltrace as bt
+import collections
 import enum
+import operator
 
 
 class InvalidPeriodDefinition(Exception):
@@ -37,6 +38,7 @@ class PeriodDefinitionRegistry:
         self._named_period_defs = {}
         # name to hierarchy
         self._full_period_path = {}
+        self._compiled = False
 
     def period_full_path(self, name):
         return self._full_period_path[name]
@@ -92,6 +94,7 @@ class PeriodDefinitionRegistry:
 
         # validate new period definition
         PeriodDefinitionValidator(period_def)
+        self._compiled = False
 
         if period_def.parent is None:
             self._root_period_defs.add(period_def)
@@ -104,6 +107,26 @@ class PeriodDefinitionRegistry:
     def get_period_def(self, name):
         return self._named_period_defs.get(name)
 
+    def _iter_period_defs(self, period_defs):
+        for period_def in period_defs:
+            yield period_def
+            yield from self._iter_period_defs(period_def.children)
+
+    # Compiles the expressions of all the period definitions, sharing
+    # their common subexpressions. This must be called once all the
+    # period definitions are added.
+    def compile(self):
+        if self._compiled:
+            return
+
+        period_defs = list(self._iter_period_defs(self._root_period_defs))
+        compiler = _ExpressionCompiler(period_defs)
+
+        for period_def in period_defs:
+            period_def.compile(compiler)
+
+        self._compiled = True
+
     @property
     def root_period_defs(self):
         for period_def in self._root_period_defs:
@@ -130,6 +153,55 @@ class PeriodDefinition:
         self._end_expr = end_expr
         self._begin_captures_exprs = begin_captures_exprs
         self._end_captures_exprs = end_captures_exprs
+        self._begin_evt_fields = None
+        self._begin_evt_names = _get_expr_event_names(begin_expr)
+        self._begin_matcher = None
+        self._end_matcher = None
+        self._begin_captures_getter = None
+        self._end_captures_getter = None
+        self._end_key_getters = None
+
+    # Compiles the expressions of this definition with the compiler of
+    # its registry.
+    def compile(self, compiler):
+        self._begin_matcher = compiler.compile_expr(self._begin_expr)
+        self._end_matcher = compiler.compile_expr(self._end_expr)
+        self._begin_captures_getter = compiler.compile_captures_exprs(
+            self._begin_captures_exprs)
+        self._end_captures_getter = compiler.compile_captures_exprs(
+            self._end_captures_exprs)
+        self._end_key_getters = compiler.compile_end_key_getters(
+            self._end_expr)
+
+    # The following compiled functions take the current event, the
+    # begin event of the period and the begin event of its parent.
+    # (names, glob regexes) tuple of the names of the events which can
+    # begin a period of this definition, or None if any event can.
+    @property
+    def begin_evt_names(self):
+        return self._begin_evt_names
+
+    @property
+    def begin_matcher(self):
+        return self._begin_matcher
+
+    @property
+    def end_matcher(self):
+        return self._end_matcher
+
+    @property
+    def begin_captures_getter(self):
+        return self._begin_captures_getter
+
+    @property
+    def end_captures_getter(self):
+        return self._end_captures_getter
+
+    # (event key getter, begin key getter) tuple of the correlation
+    # fields of the end expression, or None if it has none.
+    @property
+    def end_key_getters(self):
+        return self._end_key_getters
 
     @property
     def name(self):
@@ -159,6 +231,42 @@ class PeriodDefinition:
     def children(self):
         return self._children
 
+    # Fields of the begin event of a period of this definition which
+    # are referred to after its creation: by its end expression and
+    # captures, and by the expressions of its children. This is only
+    # computed once all the period definitions are registered.
+    @property
+    def begin_evt_fields(self):
+        if self._begin_evt_fields is None:
+            self._begin_evt_fields = self._get_begin_evt_fields()
+
+        return self._begin_evt_fields
+
+    def _get_begin_evt_fields(self):
+        event_scopes = []
+        exprs = [self._end_expr] + list(self._end_captures_exprs.values())
+
+        for expr in exprs:
+            event_scopes += _iter_begin_event_scopes(expr, False)
+
+        for child in self._children:
+            exprs = [child.begin_expr, child.end_expr]
+            exprs += child.begin_captures_exprs.values()
+            exprs += child.end_captures_exprs.values()
+
+            for expr in exprs:
+                event_scopes += _iter_begin_event_scopes(expr, True)
+
+        fields = set()
+
+        for event_scope in event_scopes:
+            field = _get_event_scope_field(event_scope)
+
+            if field is not None:
+                fields.add(field)
+
+        return fields
+
 
 class _Expression:
     pass
@@ -389,25 +497,6 @@ class PeriodDefinitionValidator:
             self._validate_expr_cbs[type(expr)](expr)
 
 
-class _MatchContext:
-    def __init__(self, evt, begin_evt, parent_begin_evt):
-        self._evt = evt
-        self._begin_evt = begin_evt
-        self._parent_begin_evt = parent_begin_evt
-
-    @property
-    def evt(self):
-        return self._evt
-
-    @property
-    def begin_evt(self):
-        return self._begin_evt
-
-    @property
-    def parent_begin_evt(self):
-        return self._parent_begin_evt
-
-
 _DYN_SCOPE_TO_BT_CTF_SCOPE = {
     DynScope.TPH: bt.CTFScope.TRACE_PACKET_HEADER,
     DynScope.SPC: bt.CTFScope.STREAM_PACKET_CONTEXT,
@@ -418,133 +507,439 @@ _DYN_SCOPE_TO_BT_CTF_SCOPE = {
 }
 
 
-def _resolve_event_expr(event, expr):
-    # event not found
-    if event is None:
+# Yields the event scopes of an expression which refer to the begin
+# event of the current period, or of its parent period if `parent` is
+# True.
+def _iter_begin_event_scopes(expr, parent):
+    if isinstance(expr, _BinaryExpression):
+        yield from _iter_begin_event_scopes(expr.lh_expr, parent)
+        yield from _iter_begin_event_scopes(expr.rh_expr, parent)
+    elif isinstance(expr, _UnaryExpression):
+        yield from _iter_begin_event_scopes(expr.expr, parent)
+    elif type(expr) is ParentScope:
+        if parent:
+            yield expr.child.child
+    elif type(expr) is BeginScope:
+        if not parent:
+            yield expr.child
+
+
+# Returns the (CTF scope, field name) tuple of the field an event scope
+# refers to, with a None CTF scope for the automatic dynamic scope, or
+# None if it refers to the event name.
+def _get_event_scope_field(event_scope):
+    expr = event_scope.child
+    dyn_scope = DynScope.AUTO
+
+    if type(expr) is DynamicScope:
+        dyn_scope = expr.dyn_scope
+        expr = expr.child
+
+    if type(expr) is not EventFieldName:
         return
 
-    # event name
-    if type(expr.child) is EventName:
-        return event.name
+    return _DYN_SCOPE_TO_BT_CTF_SCOPE.get(dyn_scope), expr.name
 
-    # default, automatic dynamic scope
-    dyn_scope = DynScope.AUTO
 
-    if type(expr.child) is DynamicScope:
-        # select specific dynamic scope
-        expr = expr.child
-        dyn_scope = expr.dyn_scope
+def _is_event_name_expr(expr):
+    return type(expr) is EventScope and _get_event_scope_field(expr) is None
 
-    if type(expr.child) is EventFieldName:
-        expr = expr.child
 
-        if dyn_scope == DynScope.AUTO:
-            # automatic dynamic scope
-            if expr.name in event:
-                return event[expr.name]
+# Returns the (names, glob regexes) tuple of the names of the events
+# which can satisfy an expression, or None if any event can.
+def _get_expr_event_names(expr):
+    if type(expr) is LogicalAnd:
+        lh_names = _get_expr_event_names(expr.lh_expr)
+        rh_names = _get_expr_event_names(expr.rh_expr)
+
+        if lh_names is None:
+            return rh_names
 
-            # event field not found
+        if rh_names is None:
+            return lh_names
+
+        if not lh_names[1] and not rh_names[1]:
+            return lh_names[0] & rh_names[0], ()
+
+        # either side matches a superset of the conjunction
+        if not lh_names[1]:
+            return lh_names
+
+        return rh_names
+
+    if type(expr) is LogicalOr:
+        lh_names = _get_expr_event_names(expr.lh_expr)
+        rh_names = _get_expr_event_names(expr.rh_expr)
+
+        if lh_names is None or rh_names is None:
             return
 
-        # specific dynamic scope
-        bt_ctf_scope = _DYN_SCOPE_TO_BT_CTF_SCOPE[dyn_scope]
+        return lh_names[0] | rh_names[0], lh_names[1] + rh_names[1]
 
-        return event.field_with_scope(expr.name, bt_ctf_scope)
+    if type(expr) is Eq:
+        for name_expr, value_expr in ((expr.lh_expr, expr.rh_expr),
+                                      (expr.rh_expr, expr.lh_expr)):
+            if _is_event_name_expr(name_expr) and \
+                    type(value_expr) is String:
+                return frozenset([value_expr.value]), ()
 
-    assert False
+    if type(expr) is GlobEq and _is_event_name_expr(expr.lh_expr):
+        return frozenset(), (expr.regex,)
 
 
-# This exquisite function takes an expression and resolves it to
-# an actual value (Python's number/string) considering the current
-# matching context.
-def _resolve_expr(expr, match_context):
-    if type(expr) is ParentScope:
-        begin_scope = expr.child
-        event_scope = begin_scope.child
+def _iter_conjuncts(expr):
+    if type(expr) is LogicalAnd:
+        yield from _iter_conjuncts(expr.lh_expr)
+        yield from _iter_conjuncts(expr.rh_expr)
+    else:
+        yield expr
 
-        return _resolve_event_expr(match_context.parent_begin_evt, event_scope)
 
-    if type(expr) is BeginScope:
-        # event in the begin context
-        event_scope = expr.child
+def _make_key(values):
+    # Only integers and strings are equal to a value under the period
+    # expression comparison rules if and only if they are equal as
+    # dictionary keys.
+    for value in values:
+        if type(value) is not int and type(value) is not str:
+            return
 
-        return _resolve_event_expr(match_context.begin_evt, event_scope)
+    return tuple(values)
 
-    if type(expr) is EventScope:
-        # current event
-        return _resolve_event_expr(match_context.evt, expr)
 
-    if type(expr) is Number:
-        return expr.value
+# Yields the (current event scope, begin scope) tuples of the equality
+# conjuncts of an end expression between a field of the current event
+# and a field of the begin event of the period or of its parent.
+def _iter_end_correlations(end_expr):
+    for expr in _iter_conjuncts(end_expr):
+        if type(expr) is not Eq:
+            continue
 
-    if type(expr) is String:
-        return expr.value
+        for evt_expr, begin_expr in ((expr.lh_expr, expr.rh_expr),
+                                     (expr.rh_expr, expr.lh_expr)):
+            if type(evt_expr) is EventScope and \
+                    type(begin_expr) in (BeginScope, ParentScope):
+                yield evt_expr, begin_expr
+                break
 
-    assert False
 
+# Index of period definitions by the names of the events which can
+# begin their periods.
+class _BeginEventNameIndex:
+    def __init__(self, period_defs):
+        self._any_defs = []
+        self._name_defs = {}
+        self._glob_defs = []
+        # event name to candidate period definitions
+        self._period_defs = {}
 
-class _Matcher:
-    def __init__(self, expr, match_context):
-        self._match_context = match_context
-        self._expr_matchers = {
-            LogicalAnd: self._and_expr_matches,
-            LogicalOr: self._or_expr_matches,
-            LogicalNot: self._not_expr_matches,
-            GlobEq: self._glob_eq_expr_matches,
-            Eq: partial(self._comp_expr_matches, lambda lh, rh: lh == rh),
-            Lt: partial(self._comp_expr_matches, lambda lh, rh: lh < rh),
-            LtEq: partial(self._comp_expr_matches, lambda lh, rh: lh <= rh),
-            Gt: partial(self._comp_expr_matches, lambda lh, rh: lh > rh),
-            GtEq: partial(self._comp_expr_matches, lambda lh, rh: lh >= rh),
-        }
-        self._matches = self._expr_matches(expr)
+        for period_def in period_defs:
+            names = period_def.begin_evt_names
 
-    def _and_expr_matches(self, expr):
-        return (self._expr_matches(expr.lh_expr) and
-                self._expr_matches(expr.rh_expr))
+            if names is None:
+                self._any_defs.append(period_def)
+                continue
 
-    def _or_expr_matches(self, expr):
-        return (self._expr_matches(expr.lh_expr) or
-                self._expr_matches(expr.rh_expr))
+            for name in names[0]:
+                self._name_defs.setdefault(name, []).append(period_def)
 
-    def _not_expr_matches(self, expr):
-        return not self._expr_matches(expr.expr)
+            for regex in names[1]:
+                self._glob_defs.append((regex, period_def))
 
-    def _glob_eq_expr_matches(self, expr):
-        def compfn(lh, rh):
-            return bool(expr.regex.match(lh))
+    def get_period_defs(self, name):
+        period_defs = self._period_defs.get(name)
 
-        return self._comp_expr_matches(compfn, expr)
+        if period_defs is None:
+            period_defs = set(self._any_defs)
+            period_defs.update(self._name_defs.get(name, []))
 
-    def _comp_expr_matches(self, compfn, expr):
-        lh_value = _resolve_expr(expr.lh_expr, self._match_context)
-        rh_value = _resolve_expr(expr.rh_expr, self._match_context)
+            for regex, period_def in self._glob_defs:
+                if regex.match(name) is not None:
+                    period_defs.add(period_def)
 
-        # make sure both sides are found
-        if lh_value is None or rh_value is None:
-            return False
+            period_defs = tuple(period_defs)
+            self._period_defs[name] = period_defs
 
-        # cast RHS to int if LHS is an int
-        if type(lh_value) is int and type(rh_value) is float:
-            rh_value = int(rh_value)
+        return period_defs
 
-        # compare types first
-        if type(lh_value) is not type(rh_value):
-            return False
 
-        # compare field to a literal value
-        return compfn(lh_value, rh_value)
+# Period expressions are compiled once into closures which take the
+# current event, the begin event of the period and the begin event of
+# its parent period, any of them possibly None.
+def _compile_event_scope(event_scope):
+    # returns a function resolving an event scope within a given event
+    field = _get_event_scope_field(event_scope)
 
-    def _expr_matches(self, expr):
-        return self._expr_matchers[type(expr)](expr)
+    if field is None:
+        # event name
+        def resolve(event):
+            if event is not None:
+                return event.name
 
-    @property
-    def matches(self):
-        return self._matches
+        return resolve
+
+    ctf_scope, field_name = field
+
+    if ctf_scope is None:
+        # automatic dynamic scope
+        def resolve(event):
+            if event is not None:
+                return event.get(field_name)
+
+        return resolve
+
+    def resolve(event):
+        if event is not None:
+            return event.field_with_scope(field_name, ctf_scope)
+
+    return resolve
+
+
+_COMP_FNS = {
+    Eq: operator.eq,
+    Lt: operator.lt,
+    LtEq: operator.le,
+    Gt: operator.gt,
+    GtEq: operator.ge,
+}
+
+
+def _depends_on_evt_only(expr):
+    if isinstance(expr, _BinaryExpression):
+        return _depends_on_evt_only(expr.lh_expr) and \
+            _depends_on_evt_only(expr.rh_expr)
+
+    if isinstance(expr, _UnaryExpression):
+        return _depends_on_evt_only(expr.expr)
+
+    return type(expr) in (EventScope, Number, String)
+
+
+def _memoize_last_evt(fn):
+    # `fn` only depends on the current event: its last result is
+    # reused as long as the current event is the same object.
+    last = [None, None]
+
+    def memoized(evt, begin_evt, parent_begin_evt):
+        if last[0] is not evt:
+            last[1] = fn(evt, None, None)
+            last[0] = evt
+
+        return last[1]
+
+    return memoized
+
+
+# Compiler of the expressions of a set of period definitions.
+#
+# The identical subexpressions which only depend on the current event
+# and which are used more than once across the definitions are
+# compiled once, and evaluated at most once per event.
+class _ExpressionCompiler:
+    def __init__(self, period_defs):
+        self._counts = collections.Counter()
+        self._shared = {}
+
+        for period_def in period_defs:
+            exprs = [period_def.begin_expr, period_def.end_expr]
+            exprs += period_def.begin_captures_exprs.values()
+            exprs += period_def.end_captures_exprs.values()
+
+            for expr in exprs:
+                self._count_subexprs(expr)
+
+            # also resolved to find the periods which can end
+            for evt_expr, begin_expr in \
+                    _iter_end_correlations(period_def.end_expr):
+                self._count_subexprs(evt_expr)
+
+    @staticmethod
+    def _get_shared_key(expr):
+        if type(expr) is EventScope:
+            # resolving the event name is as cheap as sharing it
+            if _get_event_scope_field(expr) is None:
+                return
+
+            return type(expr), repr(expr)
+
+        if isinstance(expr, (_BinaryExpression, _UnaryExpression)) and \
+                _depends_on_evt_only(expr):
+            return type(expr), repr(expr)
+
+    def _count_subexprs(self, expr):
+        key = self._get_shared_key(expr)
+
+        if key is not None:
+            self._counts[key] += 1
+
+        if isinstance(expr, _BinaryExpression):
+            self._count_subexprs(expr.lh_expr)
+            self._count_subexprs(expr.rh_expr)
+        elif isinstance(expr, _UnaryExpression):
+            self._count_subexprs(expr.expr)
+
+    def _compile_shared(self, expr, compile_fn):
+        key = self._get_shared_key(expr)
+
+        if key is None or self._counts[key] < 2:
+            return compile_fn(expr)
+
+        fn = self._shared.get(key)
+
+        if fn is None:
+            fn = _memoize_last_evt(compile_fn(expr))
+            self._shared[key] = fn
+
+        return fn
+
+    def compile_value_expr(self, expr):
+        return self._compile_shared(expr, self._compile_value_expr)
+
+    def _compile_value_expr(self, expr):
+        if type(expr) is ParentScope:
+            resolve = _compile_event_scope(expr.child.child)
+
+            return lambda evt, begin_evt, parent_begin_evt: \
+                resolve(parent_begin_evt)
+
+        if type(expr) is BeginScope:
+            resolve = _compile_event_scope(expr.child)
+
+            return lambda evt, begin_evt, parent_begin_evt: \
+                resolve(begin_evt)
+
+        if type(expr) is EventScope:
+            resolve = _compile_event_scope(expr)
+
+            return lambda evt, begin_evt, parent_begin_evt: resolve(evt)
 
+        if type(expr) in (Number, String):
+            value = expr.value
 
-def _expr_matches(expr, match_context):
-    return _Matcher(expr, match_context).matches
+            return lambda evt, begin_evt, parent_begin_evt: value
+
+        assert False
+
+    def _compile_comp_expr(self, expr, compfn):
+        lh_resolve = self.compile_value_expr(expr.lh_expr)
+
+        if type(expr.rh_expr) in (Number, String):
+            # literal RHS: its type and its integer cast are known
+            rh_value = expr.rh_expr.value
+            rh_type = type(rh_value)
+            rh_int_value = None
+
+            if rh_type is float:
+                rh_int_value = int(rh_value)
+
+            def matches(evt, begin_evt, parent_begin_evt):
+                lh_value = lh_resolve(evt, begin_evt, parent_begin_evt)
+                lh_type = type(lh_value)
+
+                if lh_type is rh_type:
+                    return compfn(lh_value, rh_value)
+
+                # cast RHS to int if LHS is an int
+                if lh_type is int and rh_int_value is not None:
+                    return compfn(lh_value, rh_int_value)
+
+                return False
+
+            return matches
+
+        rh_resolve = self.compile_value_expr(expr.rh_expr)
+
+        def matches(evt, begin_evt, parent_begin_evt):
+            lh_value = lh_resolve(evt, begin_evt, parent_begin_evt)
+            rh_value = rh_resolve(evt, begin_evt, parent_begin_evt)
+
+            # make sure both sides are found
+            if lh_value is None or rh_value is None:
+                return False
+
+            # cast RHS to int if LHS is an int
+            if type(lh_value) is int and type(rh_value) is float:
+                rh_value = int(rh_value)
+
+            # compare types first
+            if type(lh_value) is not type(rh_value):
+                return False
+
+            # compare field to a literal value
+            return compfn(lh_value, rh_value)
+
+        return matches
+
+    def compile_expr(self, expr):
+        return self._compile_shared(expr, self._compile_expr)
+
+    def _compile_expr(self, expr):
+        if type(expr) is LogicalAnd:
+            lh_matches = self.compile_expr(expr.lh_expr)
+            rh_matches = self.compile_expr(expr.rh_expr)
+
+            return lambda evt, begin_evt, parent_begin_evt: \
+                lh_matches(evt, begin_evt, parent_begin_evt) and \
+                rh_matches(evt, begin_evt, parent_begin_evt)
+
+        if type(expr) is LogicalOr:
+            lh_matches = self.compile_expr(expr.lh_expr)
+            rh_matches = self.compile_expr(expr.rh_expr)
+
+            return lambda evt, begin_evt, parent_begin_evt: \
+                lh_matches(evt, begin_evt, parent_begin_evt) or \
+                rh_matches(evt, begin_evt, parent_begin_evt)
+
+        if type(expr) is LogicalNot:
+            sub_matches = self.compile_expr(expr.expr)
+
+            return lambda evt, begin_evt, parent_begin_evt: \
+                not sub_matches(evt, begin_evt, parent_begin_evt)
+
+        if type(expr) is GlobEq:
+            regex = expr.regex
+
+            return self._compile_comp_expr(
+                expr, lambda lh, rh: regex.match(lh) is not None)
+
+        return self._compile_comp_expr(expr, _COMP_FNS[type(expr)])
+
+    def compile_captures_exprs(self, captures_exprs):
+        resolvers = [(name, self.compile_value_expr(capture_expr))
+                     for name, capture_expr in captures_exprs.items()]
+
+        def get_captures(evt, begin_evt, parent_begin_evt):
+            return {name: resolve(evt, begin_evt, parent_begin_evt)
+                    for name, resolve in resolvers}
+
+        return get_captures
+
+    # Returns the (event key getter, begin key getter) tuple of the
+    # correlation fields of an end expression (see
+    # _iter_end_correlations()), or None if there's none.
+    #
+    # The event key getter takes the current event and the begin key
+    # getter takes the begin event and the parent begin event. A key
+    # is None if it cannot be used to find the periods which can end.
+    def compile_end_key_getters(self, end_expr):
+        evt_resolvers = []
+        begin_resolvers = []
+
+        for evt_expr, begin_expr in _iter_end_correlations(end_expr):
+            evt_resolvers.append(self.compile_value_expr(evt_expr))
+            begin_resolvers.append(self.compile_value_expr(begin_expr))
+
+        if not evt_resolvers:
+            return
+
+        def get_evt_key(evt):
+            return _make_key([resolve(evt, None, None)
+                              for resolve in evt_resolvers])
+
+        def get_begin_key(begin_evt, parent_begin_evt):
+            return _make_key([resolve(None, begin_evt, parent_begin_evt)
+                              for resolve in begin_resolvers])
+
+        return get_evt_key, get_begin_key
 
 
 def create_conjunction_from_exprs(exprs):
@@ -579,13 +974,20 @@ class PeriodEngineCallbackType(enum.Enum):
 
 class Period:
     def __init__(self, definition, parent, begin_evt, begin_captures):
-        begin_evt_copy = core_event.Event(begin_evt)
+        # Only the name and the timestamp of the begin event are kept
+        # for the definition-less period.
+        fields = ()
+
+        if definition is not None:
+            fields = definition.begin_evt_fields
+
+        begin_evt_copy = core_event.Event(begin_evt, fields)
         self._begin_evt = begin_evt_copy
         self._end_evt = None
         self._completed = False
         self._definition = definition
         self._parent = parent
-        self._children = set()
+        self._children = _OpenPeriods()
         self._begin_captures = begin_captures
         self._end_captures = {}
 
@@ -630,11 +1032,126 @@ class Period:
         return self._end_captures
 
 
+# Open periods of a given definition, indexed by the key of their
+# begin event (see _ExpressionCompiler.compile_end_key_getters()).
+class _DefinitionPeriods:
+    def __init__(self, definition):
+        self._key_getters = definition.end_key_getters
+        self._periods = set()
+        self._buckets = {}
+        self._unindexed_periods = set()
+        self._keys = {}
+
+    @property
+    def periods(self):
+        return self._periods
+
+    def add(self, period):
+        self._periods.add(period)
+        key = None
+
+        if self._key_getters is not None:
+            parent_begin_evt = None
+
+            if period.parent is not None:
+                parent_begin_evt = period.parent.begin_evt
+
+            key = self._key_getters[1](period.begin_evt, parent_begin_evt)
+
+        if key is None:
+            self._unindexed_periods.add(period)
+            return
+
+        self._keys[period] = key
+        self._buckets.setdefault(key, set()).add(period)
+
+    def remove(self, period):
+        self._periods.remove(period)
+        key = self._keys.pop(period, None)
+
+        if key is None:
+            self._unindexed_periods.remove(period)
+            return
+
+        bucket = self._buckets[key]
+        bucket.remove(period)
+
+        if not bucket:
+            del self._buckets[key]
+
+    # Returns the periods which can end with a given event.
+    def get_end_candidates(self, evt):
+        if self._key_getters is None:
+            return self._periods
+
+        key = self._key_getters[0](evt)
+
+        if key is None:
+            return self._periods
+
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            return self._unindexed_periods
+
+        if not self._unindexed_periods:
+            return bucket
+
+        return bucket | self._unindexed_periods
+
+
+# Set of open periods sharing the same parent, grouped by definition.
+class _OpenPeriods:
+    def __init__(self):
+        self._groups = {}
+
+    def __iter__(self):
+        for group in self._groups.values():
+            yield from group.periods
+
+    def __len__(self):
+        return sum(len(group.periods) for group in self._groups.values())
+
+    def add(self, period):
+        group = self._groups.get(period.definition)
+
+        if group is None:
+            group = _DefinitionPeriods(period.definition)
+            self._groups[period.definition] = group
+
+        group.add(period)
+
+    def remove(self, period):
+        group = self._groups[period.definition]
+        group.remove(period)
+
+        if not group.periods:
+            del self._groups[period.definition]
+
+    def clear(self):
+        self._groups.clear()
+
+    # Yields the (definition, periods) tuples of the open periods.
+    def iter_groups(self):
+        for definition, group in self._groups.items():
+            yield definition, group.periods
+
+    # Yields the (definition, periods) tuples of the open periods which
+    # can end with a given event.
+    def iter_end_candidates(self, evt):
+        for definition, group in self._groups.items():
+            yield definition, group.get_end_candidates(evt)
+
+
 class PeriodEngine:
     def __init__(self, registry, cbs):
         self._registry = registry
+        self._registry.compile()
         self._cbs = cbs
-        self._root_periods = set()
+        self._root_periods = _OpenPeriods()
+        # parent period definition (None for the root) to the index of
+        # its children
+        self._begin_indexes = {}
 
     def _cb_period_end(self, period):
         self._cbs[PeriodEngineCallbackType.PERIOD_END](period)
@@ -645,27 +1162,36 @@ class PeriodEngine:
     def _create_period(self, definition, parent, begin_evt, begin_captures):
         return Period(definition, parent, begin_evt, begin_captures)
 
-    def _get_captures(self, captures_exprs, match_context):
-        captures = {}
+    def _get_begin_candidates(self, parent_period_def, evt):
+        index = self._begin_indexes.get(parent_period_def)
+
+        if index is None:
+            if parent_period_def is None:
+                period_defs = self._registry.root_period_defs
+            else:
+                period_defs = parent_period_def.children
 
-        for name, capture_expr in captures_exprs.items():
-            captures[name] = _resolve_expr(capture_expr, match_context)
+            index = _BeginEventNameIndex(period_defs)
+            self._begin_indexes[parent_period_def] = index
 
-        return captures
+        return index.get_period_defs(evt.name)
 
-    def _process_event_add_periods(self, parent_period,
-                                   child_periods, child_period_defs, evt):
+    def _process_event_add_periods(self, parent_period, child_periods, evt):
         periods_to_add = set()
+        parent_period_def = None
+        parent_begin_evt = None
 
-        for child_period_def in child_period_defs:
-            match_context = self._create_begin_match_context(parent_period,
-                                                             evt)
+        if parent_period is not None:
+            parent_period_def = parent_period.definition
+            parent_begin_evt = parent_period.begin_evt
+
+        child_period_defs = self._get_begin_candidates(parent_period_def, evt)
 
-            if _expr_matches(child_period_def.begin_expr, match_context):
+        for child_period_def in child_period_defs:
+            if child_period_def.begin_matcher(evt, evt, parent_begin_evt):
                 # match! add period
-                captures = self._get_captures(
-                    child_period_def.begin_captures_exprs,
-                    match_context)
+                captures = child_period_def.begin_captures_getter(
+                    evt, evt, parent_begin_evt)
                 period = self._create_period(child_period_def,
                                              parent_period, evt, captures)
                 periods_to_add.add(period)
@@ -675,51 +1201,46 @@ class PeriodEngine:
             self._cb_period_begin(period_to_add)
             child_periods.add(period_to_add)
 
-        for child_period in child_periods:
-            self._process_event_add_periods(child_period,
-                                            child_period.children,
-                                            child_period.definition.children,
-                                            evt)
-
-    def _process_event_begin(self, evt):
-        defs = self._registry.root_period_defs
-        self._process_event_add_periods(None, self._root_periods, defs, evt)
+        for child_period_def, periods in child_periods.iter_groups():
+            # no child periods to add
+            if not child_period_def.children:
+                continue
 
-    def _create_begin_match_context(self, parent_period, evt):
-        parent_begin_evt = None
+            for child_period in periods:
+                self._process_event_add_periods(child_period,
+                                                child_period.children, evt)
 
-        if parent_period is not None:
-            parent_begin_evt = parent_period.begin_evt
+    def _process_event_begin(self, evt):
+        self._process_event_add_periods(None, self._root_periods, evt)
 
-        return _MatchContext(evt, evt, parent_begin_evt)
+    def _process_event_remove_period(self, child_periods, evt):
+        for child_period_def, periods in child_periods.iter_groups():
+            # no child periods to remove
+            if not child_period_def.children:
+                continue
 
-    def _create_end_match_context(self, period, evt):
-        parent_begin_evt = None
+            for child_period in periods:
+                self._process_event_remove_period(child_period.children,
+                                                  evt)
 
-        if period.parent is not None:
-            parent_begin_evt = period.parent.begin_evt
+        child_periods_to_remove = set()
 
-        return _MatchContext(evt, period.begin_evt, parent_begin_evt)
+        for definition, periods in child_periods.iter_end_candidates(evt):
+            for child_period in periods:
+                begin_evt = child_period.begin_evt
+                parent_begin_evt = None
 
-    def _process_event_remove_period(self, child_periods, evt):
-        for child_period in child_periods:
-            self._process_event_remove_period(child_period.children, evt)
+                if child_period.parent is not None:
+                    parent_begin_evt = child_period.parent.begin_evt
 
-        child_periods_to_remove = set()
+                if definition.end_matcher(evt, begin_evt, parent_begin_evt):
+                    # set period's end captures
+                    captures = definition.end_captures_getter(
+                        evt, begin_evt, parent_begin_evt)
+                    child_period._end_captures = captures
 
-        for child_period in child_periods:
-            match_context = self._create_end_match_context(child_period, evt)
-
-            if _expr_matches(child_period.definition.end_expr, match_context):
-                # set period's end captures
-                end_captures_exprs = \
-                    child_period.definition.end_captures_exprs
-                captures = self._get_captures(end_captures_exprs,
-                                              match_context)
-                child_period._end_captures = captures
-
-                # mark as to be removed
-                child_periods_to_remove.add(child_period)
+                    # mark as to be removed
+                    child_periods_to_remove.add(child_period)
 
         # safe to remove child periods now, outside the iteration
         for child_period_to_remove in child_periods_to_remove:
@@ -20,6 +20,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import collections
+from . import stats
 from .analysis import Analysis, PeriodData
 
 
@@ -39,20 +41,67 @@ class PeriodAnalysis(Analysis):
         # per-period state, since we are accumulating statistics about
         # all the periods.
         self._all_period_stats = {}
-        self._all_period_list = []
+        # Periods in beginning order (keys only), for O(1) removal of
+        # the incomplete ones.
+        self._all_periods = collections.OrderedDict()
+        self._all_count = 0
         self._all_total_duration = 0
         self._all_min_duration = None
         self._all_max_duration = None
         # Internal map between currently active periods and their
         # corresponding PeriodEvent object.
         self._current_periods = {}
+        # Streaming mode (see stream_periods())
+        self._retain_periods = True
+        self._period_tree_cb = None
+        self._top_limit = None
+        self._top_filter = None
+        self._top_periods = None
+        self._duration_filter = None
+        # Root periods in beginning order, mapped to whether or not they
+        # are completed, so that the trees are passed to
+        # period_tree_cb in the same order as in all_period_list.
+        self._pending_roots = collections.OrderedDict()
 
     def _create_period_data(self):
         return _PeriodData()
 
+    # Stops keeping all the individual periods until the end of the
+    # analysis: the statistics are folded as the periods end.
+    #
+    # `period_tree_cb` is called with each completed root PeriodEvent,
+    # its completed descendants being its children, in beginning
+    # order, after which the tree is dropped. If `top_limit` is set,
+    # only the `top_limit` longest completed periods accepted by
+    # `top_filter` are kept (see `top_periods`).
+    def stream_periods(self, period_tree_cb=None, top_limit=None,
+                       top_filter=None):
+        self._retain_periods = False
+        self._period_tree_cb = period_tree_cb
+        self._top_limit = top_limit
+        self._top_filter = top_filter
+
+        if top_limit is not None:
+            # the earliest period first for equal durations
+            self._top_periods = stats.TopList(
+                top_limit, key=lambda period_event: (period_event.duration,
+                                                     -period_event.start_ts))
+
+    # Also folds the durations accepted by `duration_filter` into
+    # separate statistics of each period name (see PeriodStats), so
+    # that they are available without the individual periods.
+    def filter_durations(self, duration_filter):
+        self._duration_filter = duration_filter
+
+    # Whether or not the individual periods are kept (see
+    # stream_periods())
+    @property
+    def retain_periods(self):
+        return self._retain_periods
+
     @property
     def all_count(self):
-        return len(self._all_period_list)
+        return self._all_count
 
     @property
     def all_period_stats(self):
@@ -60,7 +109,15 @@ class PeriodAnalysis(Analysis):
 
     @property
     def all_period_list(self):
-        return self._all_period_list
+        return self._all_periods.keys()
+
+    @property
+    def top_periods(self):
+        # longest first
+        if self._top_periods is None:
+            return []
+
+        return self._top_periods.items
 
     @property
     def all_min_duration(self):
@@ -83,6 +140,7 @@ class PeriodAnalysis(Analysis):
                 self._all_max_duration:
             self._all_max_duration = period_event.duration
         self._all_total_duration += period_event.duration
+        self._all_count += 1
 
     # beginning of a new period
     def _begin_period_cb(self, period_data):
@@ -94,13 +152,15 @@ class PeriodAnalysis(Analysis):
         period = period_data.period
         definition = period.definition
 
-        if definition.name not in self._all_period_stats:
-            if definition.name is None:
-                name = ""
-            else:
-                name = definition.name
-            self._all_period_stats[name] = \
-                PeriodStats.new_from_period(period_data.period)
+        if definition.name is None:
+            name = ""
+        else:
+            name = definition.name
+
+        if name not in self._all_period_stats:
+            self._all_period_stats[name] = PeriodStats.new_from_period(
+                period_data.period, self._retain_periods,
+                self._duration_filter)
 
         if period.parent is not None:
             parent = self._current_periods[period.parent]
@@ -110,7 +170,11 @@ class PeriodAnalysis(Analysis):
         period_data._period_event = PeriodEvent(
             period.begin_evt.timestamp, definition.name, parent)
 
-        self._all_period_list.append(period_data._period_event)
+        if self._retain_periods:
+            self._all_periods[period_data._period_event] = None
+        elif parent is None and self._period_tree_cb is not None:
+            self._pending_roots[period_data._period_event] = False
+
         self._current_periods[period] = period_data._period_event
 
     def _end_period_cb(self, period_data, completed,
@@ -120,10 +184,17 @@ class PeriodAnalysis(Analysis):
         if period.definition is None:
             return
 
+        del self._current_periods[period]
+
         if completed is False:
             # We should eventually warn the user here or keep
             # the event as uncomplete or in a separate table.
-            self._all_period_list.remove(period_data._period_event)
+            if self._retain_periods:
+                del self._all_periods[period_data._period_event]
+            elif period_data._period_event in self._pending_roots:
+                del self._pending_roots[period_data._period_event]
+                self._flush_pending_roots()
+
             return
 
         if period.definition.name is None:
@@ -131,47 +202,89 @@ class PeriodAnalysis(Analysis):
         else:
             name = period.definition.name
 
-        period_data._period_event.finish(
-            self.last_event_ts, begin_captures, end_captures)
-        self._all_period_stats[name].update_stats(
-            period_data._period_event)
-        self.update_global_stats(period_data._period_event)
+        period_event = period_data._period_event
+        period_event.finish(self.last_event_ts, begin_captures, end_captures)
+        self._all_period_stats[name].update_stats(period_event)
+        self.update_global_stats(period_event)
 
-        if period.parent is not None:
-            parent = self._current_periods[period.parent]
-            parent.add_child(period_data._period_event)
+        if self._top_periods is not None and \
+                (self._top_filter is None or self._top_filter(period_event)):
+            self._top_periods.update(period_event)
 
-        del self._current_periods[period]
+        if self._retain_periods or self._period_tree_cb is not None:
+            if period.parent is not None:
+                parent = self._current_periods[period.parent]
+                parent.add_child(period_event)
+            elif self._period_tree_cb is not None:
+                self._pending_roots[period_event] = True
+                self._flush_pending_roots()
+
+    def _flush_pending_roots(self):
+        while self._pending_roots:
+            period_event, completed = next(iter(self._pending_roots.items()))
+
+            if not completed:
+                break
+
+            del self._pending_roots[period_event]
+            self._period_tree_cb(period_event)
 
 
 class PeriodStats():
-    def __init__(self, name):
+    def __init__(self, name, retain_periods=True, duration_filter=None):
         self.name = name
         self.period_list = []
-        self.min_duration = None
-        self.max_duration = None
-        self.total_duration = 0
+        self.duration_hist = stats.LogLinearHistogram()
+        self.duration_stats = stats.RunningStats()
+        self._retain_periods = retain_periods
+        self._duration_filter = duration_filter
+        # Statistics of the durations accepted by duration_filter
+        self.filtered_stats = None
+        self.filtered_duration_hist = None
+
+        if duration_filter is not None:
+            self.filtered_stats = stats.RunningStats()
+            self.filtered_duration_hist = stats.LogLinearHistogram()
 
     @classmethod
-    def new_from_period(cls, period):
+    def new_from_period(cls, period, retain_periods=True,
+                        duration_filter=None):
         if period.definition.name is None:
-            return cls("")
-        return cls(period.definition.name)
+            return cls("", retain_periods, duration_filter)
+        return cls(period.definition.name, retain_periods, duration_filter)
 
     @property
     def count(self):
-        return len(self.period_list)
+        return self.duration_stats.count
+
+    @property
+    def min_duration(self):
+        return self.duration_stats.min
+
+    @property
+    def max_duration(self):
+        return self.duration_stats.max
+
+    @property
+    def total_duration(self):
+        return self.duration_stats.total
+
+    @property
+    def stdev(self):
+        return self.duration_stats.stdev
 
     def update_stats(self, period_event):
-        if self.min_duration is None or period_event.duration < \
-                self.min_duration:
-            self.min_duration = period_event.duration
-
-        if self.max_duration is None or period_event.duration > \
-                self.max_duration:
-            self.max_duration = period_event.duration
-        self.total_duration += period_event.duration
-        self.period_list.append(period_event)
+        duration = period_event.duration
+        self.duration_stats.update(duration)
+        self.duration_hist.update(duration)
+
+        if self._duration_filter is not None and \
+                self._duration_filter(duration):
+            self.filtered_stats.update(duration)
+            self.filtered_duration_hist.update(duration)
+
+        if self._retain_periods:
+            self.period_list.append(period_event)
 
 
 class PeriodEvent():
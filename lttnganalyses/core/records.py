@@ -0,0 +1,157 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Value of the fields set to None in the columns
+NONE = -1 << 63
+
+_CHUNK_SIZE = 65536
+
+
+class RecordStore():
+    # Log of records kept in columns of 64-bit integers rather than as
+    # one Python object per record. Each column is a list of arrays of
+    # at most _CHUNK_SIZE values, so that growing a store never copies
+    # the values already stored. The string fields are interned: their
+    # columns hold indexes in the string table of the store.
+    #
+    # Subclasses define the names of the columns in _FIELDS and of the
+    # string ones in _STRING_FIELDS. By default, the values of a record
+    # are the attributes of the appended object of the same names (None
+    # if missing), and the iterated records are instances of
+    # _RECORD_TYPE, a namedtuple of these fields: _get_values() and
+    # _make_record() can be overridden to convert other objects.
+    _FIELDS = []
+    _STRING_FIELDS = frozenset()
+    _RECORD_TYPE = None
+
+    def __init__(self):
+        self._field_indexes = {
+            name: index for index, name in enumerate(self._FIELDS)
+        }
+        self._is_string = [name in self._STRING_FIELDS
+                           for name in self._FIELDS]
+        self.reset()
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for chunk_columns in zip(*self._columns):
+            for values in zip(*chunk_columns):
+                yield self._make_record(self._decode(values))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+
+        if not 0 <= index < self._count:
+            raise IndexError('Record index out of range: {}'.format(index))
+
+        chunk_index, offset = divmod(index, _CHUNK_SIZE)
+        values = [chunks[chunk_index][offset] for chunks in self._columns]
+
+        return self._make_record(self._decode(values))
+
+    def append(self, obj):
+        if self._count % _CHUNK_SIZE == 0:
+            for chunks in self._columns:
+                chunks.append(array.array('q'))
+
+        for chunks, is_string, value in zip(self._columns, self._is_string,
+                                            self._get_values(obj)):
+            if value is None:
+                value = NONE
+            elif is_string:
+                value = self._intern(value)
+
+            chunks[-1].append(value)
+
+        self._count += 1
+
+    def column(self, name):
+        # All the values of a column, as a NumPy array if available,
+        # otherwise as an array.array. The None values are NONE, and
+        # the values of a string column are string table indexes.
+        chunks = self._columns[self._field_indexes[name]]
+
+        if numpy is None:
+            column = array.array('q')
+
+            for chunk in chunks:
+                column.extend(chunk)
+
+            return column
+
+        if not chunks:
+            return numpy.empty(0, dtype=numpy.int64)
+
+        return numpy.concatenate([numpy.frombuffer(chunk, dtype=numpy.int64)
+                                  for chunk in chunks])
+
+    def string(self, index):
+        # String of an index of a string column
+        if index == NONE:
+            return None
+
+        return self._strings[index]
+
+    def take(self, indexes):
+        # Generates the records at the given indexes, in this order
+        for index in indexes:
+            yield self[int(index)]
+
+    def reset(self):
+        self._columns = [[] for name in self._FIELDS]
+        self._strings = []
+        self._string_indexes = {}
+        self._count = 0
+
+    def _intern(self, string):
+        index = self._string_indexes.get(string)
+
+        if index is None:
+            index = len(self._strings)
+            self._strings.append(string)
+            self._string_indexes[string] = index
+
+        return index
+
+    def _decode(self, values):
+        return [
+            None if value == NONE else
+            self._strings[value] if is_string else value
+            for value, is_string in zip(values, self._is_string)
+        ]
+
+    def _get_values(self, obj):
+        return [getattr(obj, name, None) for name in self._FIELDS]
+
+    def _make_record(self, values):
+        return self._RECORD_TYPE._make(values)
@@ -21,21 +21,45 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from . import stats
+import collections
+import operator
+from . import records, stats
 from .analysis import Analysis, PeriodData
 
 
 class _PeriodData(PeriodData):
-    def __init__(self):
+    def __init__(self, top_limit=None):
         # Log of individual wake scheduling events
-        self.sched_list = []
-        self.min_latency = None
-        self.max_latency = None
-        self.total_latency = 0
+        self.sched_list = SchedEventStore()
+        # Highest latency wake scheduling events, if requested
+        if top_limit is None:
+            self.top_sched = None
+        else:
+            self.top_sched = stats.TopList(top_limit,
+                                           operator.attrgetter('latency'))
+        self.latency_stats = stats.RunningStats()
+        # Latency statistics and histograms indexed by the priority of
+        # the wakee
+        self.prio_latency_stats = {}
+        self.prio_latency_hists = {}
         self.tids = {}
 
+    @property
+    def min_latency(self):
+        return self.latency_stats.min
+
+    @property
+    def max_latency(self):
+        return self.latency_stats.max
+
+    @property
+    def total_latency(self):
+        return self.latency_stats.total
+
 
 class SchedAnalysis(Analysis):
+    STATE_NOTIFICATIONS = ['sched_switch_per_tid', 'prio_changed']
+
     def __init__(self, state, conf):
         notification_cbs = {
             'sched_switch_per_tid': self._process_sched_switch,
@@ -44,10 +68,20 @@ class SchedAnalysis(Analysis):
         super().__init__(state, conf, notification_cbs)
 
     def count(self, period_data):
-        return len(period_data.sched_list)
+        return period_data.latency_stats.count
+
+    def latency_hist(self, period_data):
+        # Histogram of all the latencies, merged from the per-priority
+        # ones
+        hist = stats.LogLinearHistogram()
+
+        for prio_hist in period_data.prio_latency_hists.values():
+            hist += prio_hist
+
+        return hist
 
     def _create_period_data(self):
-        return _PeriodData()
+        return _PeriodData(self.top_limit)
 
     def _process_sched_switch(self, period_data, **kwargs):
         cpu_id = kwargs['cpu_id']
@@ -87,7 +121,8 @@ class SchedAnalysis(Analysis):
 
         sched_event = SchedEvent(
             wakeup_ts, switch_ts, wakee_proc, waker_proc, cpu_id)
-        period_data.tids[next_tid].update_stats(sched_event)
+        period_data.tids[next_tid].update_stats(sched_event,
+                                                self.keep_events)
         self._update_stats(period_data, sched_event)
 
     def _process_prio_changed(self, period_data, **kwargs):
@@ -101,47 +136,62 @@ class SchedAnalysis(Analysis):
         period_data.tids[tid].update_prio(timestamp, prio)
 
     def _update_stats(self, period_data, sched_event):
-        if period_data.min_latency is None or \
-                sched_event.latency < period_data.min_latency:
-            period_data.min_latency = sched_event.latency
+        period_data.latency_stats.update(sched_event.latency)
 
-        if period_data.max_latency is None or \
-                sched_event.latency > period_data.max_latency:
-            period_data.max_latency = sched_event.latency
+        if sched_event.prio not in period_data.prio_latency_stats:
+            period_data.prio_latency_stats[sched_event.prio] = \
+                stats.RunningStats()
+            period_data.prio_latency_hists[sched_event.prio] = \
+                stats.LogLinearHistogram()
 
-        period_data.total_latency += sched_event.latency
-        period_data.sched_list.append(sched_event)
+        period_data.prio_latency_stats[sched_event.prio].update(
+            sched_event.latency)
+        period_data.prio_latency_hists[sched_event.prio].update(
+            sched_event.latency)
+
+        if period_data.top_sched is not None:
+            period_data.top_sched.update(sched_event)
+
+        if self.keep_events:
+            period_data.sched_list.append(sched_event)
 
 
 class ProcessSchedStats(stats.Process):
     def __init__(self, pid, tid, comm):
         super().__init__(pid, tid, comm)
 
-        self.min_latency = None
-        self.max_latency = None
-        self.total_latency = 0
-        self.sched_list = []
+        self.latency_stats = stats.RunningStats()
+        self.latency_hist = stats.LogLinearHistogram()
+        self.sched_list = SchedEventStore()
 
     @property
     def count(self):
-        return len(self.sched_list)
+        return self.latency_stats.count
 
-    def update_stats(self, sched_event):
-        if self.min_latency is None or sched_event.latency < self.min_latency:
-            self.min_latency = sched_event.latency
+    @property
+    def min_latency(self):
+        return self.latency_stats.min
 
-        if self.max_latency is None or sched_event.latency > self.max_latency:
-            self.max_latency = sched_event.latency
+    @property
+    def max_latency(self):
+        return self.latency_stats.max
 
-        self.total_latency += sched_event.latency
-        self.sched_list.append(sched_event)
+    @property
+    def total_latency(self):
+        return self.latency_stats.total
+
+    def update_stats(self, sched_event, keep_event=True):
+        self.latency_stats.update(sched_event.latency)
+        self.latency_hist.update(sched_event.latency)
+
+        if keep_event:
+            self.sched_list.append(sched_event)
 
     def reset(self):
         super().reset()
-        self.min_latency = None
-        self.max_latency = None
-        self.total_latency = 0
-        self.sched_list = []
+        self.latency_stats.reset()
+        self.latency_hist.reset()
+        self.sched_list.reset()
 
 
 class SchedEvent():
@@ -154,3 +204,48 @@ class SchedEvent():
         self.prio = wakee_proc.prio
         self.target_cpu = target_cpu
         self.latency = switch_ts - wakeup_ts
+
+
+# Snapshot of the wakee or waker process of a stored SchedEvent
+SchedEventProcess = collections.namedtuple('SchedEventProcess',
+                                           ['pid', 'tid', 'comm', 'prio'])
+
+
+class SchedEventStore(records.RecordStore):
+    # Columnar log of SchedEvent objects. The wakee and waker processes
+    # are stored as their state at the time of the event.
+    _FIELDS = [
+        'wakeup_ts', 'switch_ts', 'target_cpu',
+        'wakee_pid', 'wakee_tid', 'wakee_comm', 'wakee_prio',
+        'waker_pid', 'waker_tid', 'waker_comm', 'waker_prio',
+    ]
+    _STRING_FIELDS = frozenset(['wakee_comm', 'waker_comm'])
+
+    def _get_values(self, sched_event):
+        wakee_proc = sched_event.wakee_proc
+        waker_proc = sched_event.waker_proc
+        values = [
+            sched_event.wakeup_ts, sched_event.switch_ts,
+            sched_event.target_cpu,
+            wakee_proc.pid, wakee_proc.tid, wakee_proc.comm,
+            sched_event.prio,
+        ]
+
+        if waker_proc is None:
+            values += [None] * 4
+        else:
+            values += [waker_proc.pid, waker_proc.tid, waker_proc.comm,
+                       waker_proc.prio]
+
+        return values
+
+    def _make_record(self, values):
+        wakee_proc = SchedEventProcess(*values[3:7])
+
+        if values[8] is None:
+            waker_proc = None
+        else:
+            waker_proc = SchedEventProcess(*values[7:11])
+
+        return SchedEvent(values[0], values[1], wakee_proc, waker_proc,
+                          values[2])
@@ -20,7 +20,15 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import heapq
+import math
 from collections import namedtuple
+from ..common import stats_utils
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 PrioEvent = namedtuple('PrioEvent', ['timestamp', 'prio'])
@@ -31,6 +39,292 @@ class Stats():
         raise NotImplementedError()
 
 
+class RunningStats(Stats):
+    # Count, minimum, maximum, total, mean and standard deviation of a
+    # series of values, updated as the values are added in constant
+    # memory (Welford's online algorithm for the variance).
+    def __init__(self):
+        self.reset()
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return 0
+
+        return self.total / self.count
+
+    @property
+    def variance(self):
+        # sample variance, like statistics.variance()
+        if self.count < 2:
+            return float('nan')
+
+        return self._m2 / (self.count - 1)
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    def update(self, value, count=1):
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+        # `count` occurrences of the value are merged at once, as in
+        # Chan et al.'s parallel algorithm
+        self.count += count
+        self.total += value * count
+        delta = value - self._mean
+        self._mean += delta * count / self.count
+        self._m2 += delta * (value - self._mean) * count
+
+    def reset(self):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.total = 0
+        self._mean = 0
+        self._m2 = 0
+
+
+class LogLinearHistogram(Stats):
+    # Frequency distribution of non-negative integer values (durations
+    # in ns) in constant memory per order of magnitude, in the manner
+    # of HDR histograms: the values below 2^sub_bucket_bits have their
+    # own bucket, and each power of two above is split in
+    # 2^(sub_bucket_bits - 1) linear buckets, so that the width of a
+    # bucket is at most 2^(1 - sub_bucket_bits) times its lower bound.
+    #
+    # Histograms with the same precision can be merged with +=, and
+    # re-binned into uniform buckets with rebin(). As a quantile sketch,
+    # the relative error of quantile() is at most 2^-sub_bucket_bits
+    # (0.4% by default).
+    def __init__(self, sub_bucket_bits=8):
+        if sub_bucket_bits < 1:
+            raise ValueError('Invalid number of sub-bucket bits: {}'.format(
+                sub_bucket_bits))
+
+        self._sub_bucket_bits = sub_bucket_bits
+        self._half_sub_bucket_count = 1 << (sub_bucket_bits - 1)
+        self.reset()
+
+    @property
+    def sub_bucket_bits(self):
+        return self._sub_bucket_bits
+
+    def _bucket_index(self, value):
+        shift = value.bit_length() - self._sub_bucket_bits
+
+        if shift <= 0:
+            return value
+
+        return shift * self._half_sub_bucket_count + (value >> shift)
+
+    def _bucket_bounds(self, index):
+        # [lower, upper) bounds of the values of a bucket
+        if index < 2 * self._half_sub_bucket_count:
+            return index, index + 1
+
+        shift = index // self._half_sub_bucket_count - 1
+        sub_bucket = index - shift * self._half_sub_bucket_count
+
+        return sub_bucket << shift, (sub_bucket + 1) << shift
+
+    def update(self, value, count=1):
+        value = int(value)
+
+        if value < 0:
+            raise ValueError('Negative histogram value: {}'.format(value))
+
+        index = self._bucket_index(value)
+        self._counts[index] = self._counts.get(index, 0) + count
+
+        if self.min is None or value < self.min:
+            self.min = value
+
+        if self.max is None or value > self.max:
+            self.max = value
+
+        self.count += count
+        self.total += value * count
+
+    def update_values(self, values):
+        # Adds all the values of a sequence. The values of a NumPy array
+        # are bucketed at once (see stats_utils).
+        if numpy is None or not isinstance(values, numpy.ndarray):
+            for value in values:
+                self.update(value)
+
+            return
+
+        values = values.astype(numpy.int64, copy=False)
+        summary = stats_utils.summarize(values)
+
+        if not summary.count:
+            return
+
+        if summary.min < 0:
+            raise ValueError('Negative histogram value: {}'.format(
+                summary.min))
+
+        bucket_counts = stats_utils.log_linear_bucket_counts(
+            values, self._sub_bucket_bits)
+
+        for index, count in bucket_counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+
+        if self.min is None or summary.min < self.min:
+            self.min = summary.min
+
+        if self.max is None or summary.max > self.max:
+            self.max = summary.max
+
+        self.count += summary.count
+        self.total += summary.total
+
+    def buckets(self):
+        # Generates the (lower, upper, count) tuples of the non-empty
+        # buckets, in ascending order of values.
+        for index in sorted(self._counts):
+            lower, upper = self._bucket_bounds(index)
+
+            yield lower, upper, self._counts[index]
+
+    def quantile(self, q):
+        # Estimated value of the q-quantile (0 <= q <= 1), using the
+        # nearest rank method: the midpoint of the bucket containing
+        # the value of this rank. The lowest and highest ranks are
+        # the exact minimum and maximum values.
+        if self.count == 0:
+            return None
+
+        rank = max(math.ceil(q * self.count), 1)
+
+        if rank == 1:
+            return self.min
+
+        if rank >= self.count:
+            return self.max
+
+        cumulative_count = 0
+
+        for lower, upper, count in self.buckets():
+            cumulative_count += count
+
+            if cumulative_count >= rank:
+                break
+
+        if upper - lower == 1:
+            return lower
+
+        return min(max((lower + upper - 1) / 2, self.min), self.max)
+
+    def rebin(self, lower, upper, resolution):
+        # Counts of the values in `resolution` uniform bins between
+        # `lower` and `upper`, the last bin including its upper bound.
+        # The values of a bucket are assumed to be evenly spread over
+        # it, between the exact minimum and maximum values.
+        counts = [0] * resolution
+        step = (upper - lower) / resolution
+
+        if step <= 0:
+            return counts
+
+        # integer thresholds t_i, so that bin i contains the values v
+        # such that t_i <= v < t_(i + 1)
+        thresholds = [math.ceil(lower + (upper - lower) * i / resolution)
+                      for i in range(resolution)]
+        thresholds.append(math.floor(upper) + 1)
+        cumulative_counts = []
+        buckets = list(self.buckets())
+        below_count = 0
+        index = 0
+
+        for threshold in thresholds:
+            while index < len(buckets) and \
+                    min(buckets[index][1], self.max + 1) <= threshold:
+                below_count += buckets[index][2]
+                index += 1
+
+            cumulative_count = below_count
+
+            if index < len(buckets):
+                bucket_lower, bucket_upper, count = buckets[index]
+                bucket_lower = max(bucket_lower, self.min)
+                bucket_upper = min(bucket_upper, self.max + 1)
+
+                if bucket_lower < threshold:
+                    cumulative_count += count * (
+                        (threshold - bucket_lower) /
+                        (bucket_upper - bucket_lower))
+
+            cumulative_counts.append(round(cumulative_count))
+
+        for i in range(resolution):
+            counts[i] = cumulative_counts[i + 1] - cumulative_counts[i]
+
+        return counts
+
+    def reset(self):
+        self._counts = {}
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.total = 0
+
+    def __iadd__(self, other):
+        if other.sub_bucket_bits != self._sub_bucket_bits:
+            raise ValueError('Cannot merge histograms of different '
+                             'precisions')
+
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+
+        if other.count:
+            if self.min is None or other.min < self.min:
+                self.min = other.min
+
+            if self.max is None or other.max > self.max:
+                self.max = other.max
+
+        self.count += other.count
+        self.total += other.total
+
+        return self
+
+
+class TopList(Stats):
+    # The `limit` greatest items according to `key`, kept in a
+    # fixed-size min-heap as the items are added. Items with equal keys
+    # are ordered by insertion, like a stable sort would.
+    def __init__(self, limit, key):
+        self._limit = limit
+        self._key = key
+        self.reset()
+
+    @property
+    def items(self):
+        # greatest first
+        return [entry[2] for entry in sorted(self._heap, reverse=True)]
+
+    def update(self, item):
+        # the negated sequence number breaks the ties, so that the
+        # items themselves are never compared
+        entry = (self._key(item), -self._seq, item)
+        self._seq += 1
+
+        if len(self._heap) < self._limit:
+            heapq.heappush(self._heap, entry)
+        elif self._heap and entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def reset(self):
+        self._heap = []
+        self._seq = 0
+
+
 class Process(Stats):
     def __init__(self, pid, tid, comm):
         self.pid = pid
@@ -31,6 +31,8 @@ class _PeriodData(PeriodData):
 
 
 class SyscallsAnalysis(Analysis):
+    STATE_NOTIFICATIONS = ['syscall_exit']
+
     def __init__(self, state, conf):
         notification_cbs = {
             'syscall_exit': self._process_syscall_exit
@@ -59,7 +61,8 @@ class SyscallsAnalysis(Analysis):
         if name not in proc_stats.syscalls:
             proc_stats.syscalls[name] = SyscallStats(name)
 
-        proc_stats.syscalls[name].update_stats(current_syscall)
+        proc_stats.syscalls[name].update_stats(current_syscall,
+                                               self.keep_events)
         proc_stats.total_syscalls += 1
         period_data.total_syscalls += 1
 
@@ -79,22 +82,35 @@ class ProcessSyscallStats(stats.Process):
 class SyscallStats():
     def __init__(self, name):
         self.name = name
-        self.min_duration = None
-        self.max_duration = None
-        self.total_duration = 0
+        self.duration_stats = stats.RunningStats()
+        # Number of syscalls per return value, in order of first
+        # occurrence: all the successful (non-negative) return values
+        # are counted as 0, and the unknown ones are ignored.
+        self.return_count = {}
         self.syscalls_list = []
 
     @property
     def count(self):
-        return len(self.syscalls_list)
+        return self.duration_stats.count
+
+    @property
+    def min_duration(self):
+        return self.duration_stats.min
+
+    @property
+    def max_duration(self):
+        return self.duration_stats.max
+
+    @property
+    def total_duration(self):
+        return self.duration_stats.total
 
-    def update_stats(self, syscall):
-        duration = syscall.duration
+    def update_stats(self, syscall, keep_event=True):
+        self.duration_stats.update(syscall.duration)
 
-        if self.min_duration is None or self.min_duration > duration:
-            self.min_duration = duration
-        if self.max_duration is None or self.max_duration < duration:
-            self.max_duration = duration
+        if syscall.ret is not None:
+            ret = min(syscall.ret, 0)
+            self.return_count[ret] = self.return_count.get(ret, 0) + 1
 
-        self.total_duration += duration
-        self.syscalls_list.append(syscall)
+        if keep_event:
+            self.syscalls_list.append(syscall)
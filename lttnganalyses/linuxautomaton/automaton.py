@@ -21,6 +21,8 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import collections
+import functools
 from .sched import SchedStateProvider
 from .mem import MemStateProvider
 from .irq import IrqStateProvider
@@ -29,56 +31,192 @@ from .io import IoStateProvider
 from .statedump import StatedumpStateProvider
 from .block import BlockStateProvider
 from .net import NetStateProvider
+from .sp import EventRouter, resolve_cb
 from .sv import MemoryManagement
 
 
 class State:
     def __init__(self):
         self.cpus = {}
+        # CPU on which each process is running, indexed by TID: reverse
+        # index of the current_tid of the CPUs, kept by the sched state
+        # provider
+        self.running_tids = {}
         self.tids = {}
+        # In-flight I/O requests of the current syscalls, indexed by
+        # TID, kept by the I/O state provider
+        self.syscall_io_rqs = {}
         self.disks = {}
+        # Number of stale block remaps and pending block I/O requests
+        # evicted by the block state provider
+        self.evicted_block_remaps = 0
+        self.evicted_block_rqs = 0
         self.mm = MemoryManagement()
+        # Notification subscribers: (function, period_data) tuples of
+        # each notification name, indexed by period data, and the names
+        # subscribed to by each period data, so that the callbacks of a
+        # period are removed without scanning the others
+        self._notification_subscribers = {}
+        self._period_notification_names = {}
+        # Resolved tuples of the subscribers of each notification name,
+        # rebuilt when first sent after a change of its subscribers
         self._notification_cbs = {}
         # State changes can be handled differently depending on
         # version of tracer used, so keep track of it.
         self._tracer_version = None
+        # Offset to add to the priority of the sched_wak* events,
+        # resolved when the version of the tracer is set
+        self.wakeup_prio_offset = 0
+
+    def __getstate__(self):
+        # The notification callbacks belong to the analyses, they are
+        # not part of a checkpoint of the state.
+        state = self.__dict__.copy()
+        state['_notification_subscribers'] = {}
+        state['_period_notification_names'] = {}
+        state['_notification_cbs'] = {}
+
+        return state
+
+    @property
+    def tracer_version(self):
+        return self._tracer_version
+
+    @tracer_version.setter
+    def tracer_version(self, version):
+        self._tracer_version = version
+
+        if version is not None and \
+                version < SchedStateProvider.PRIO_OFFSET_FIX_VERSION:
+            self.wakeup_prio_offset = -100
+        else:
+            self.wakeup_prio_offset = 0
 
     def register_notification_cbs(self, period_data, cbs):
+        names = self._period_notification_names.setdefault(period_data, [])
+
         for name in cbs:
-            if name not in self._notification_cbs:
-                self._notification_cbs[name] = []
-            # Store the callback in the form of (period_data, function)
-            self._notification_cbs[name].append((period_data, cbs[name]))
+            if name not in self._notification_subscribers:
+                self._notification_subscribers[name] = \
+                    collections.OrderedDict()
+
+            self._notification_subscribers[name][period_data] = \
+                (cbs[name], period_data)
+            self._notification_cbs.pop(name, None)
+            names.append(name)
+
+    def _get_notification_cbs(self, name):
+        try:
+            return self._notification_cbs[name]
+        except KeyError:
+            subscribers = self._notification_subscribers.get(name, {})
+            cbs = tuple(subscribers.values())
+            self._notification_cbs[name] = cbs
+
+            return cbs
+
+    def has_notification_cbs(self, name):
+        # Lets the state providers skip building the arguments of a
+        # notification nobody subscribed to.
+        return bool(self._get_notification_cbs(name))
 
     def send_notification_cb(self, name, **kwargs):
-        if name in self._notification_cbs:
-            for cb_tuple in self._notification_cbs[name]:
-                cb_tuple[1](cb_tuple[0], **kwargs)
+        for cb, period_data in self._get_notification_cbs(name):
+            cb(period_data, **kwargs)
 
     def clear_period_notification_cbs(self, period_data):
-        for name in self._notification_cbs:
-            for cb in self._notification_cbs[name]:
-                if cb[0] == period_data:
-                    self._notification_cbs[name].remove(cb)
+        names = self._period_notification_names.pop(period_data, [])
+
+        for name in names:
+            subscribers = self._notification_subscribers[name]
+            subscribers.pop(period_data, None)
+
+            if not subscribers:
+                del self._notification_subscribers[name]
+
+            self._notification_cbs.pop(name, None)
+
+
+# All the state providers, in the order in which they process each
+# event
+_STATE_PROVIDER_CLASSES = [
+    SchedStateProvider,
+    MemStateProvider,
+    IrqStateProvider,
+    SyscallsStateProvider,
+    IoStateProvider,
+    StatedumpStateProvider,
+    BlockStateProvider,
+    NetStateProvider,
+]
+
+
+def get_state_provider_classes(notifications=None):
+    """Get the state providers needed to send notifications.
+
+    Args:
+        notifications (optional): names of the notifications to send,
+        or None for all of them (default: None).
+
+    Returns:
+        The list of the state provider classes sending the
+        notifications and of the ones they depend on, transitively, in
+        the order in which they process each event.
+    """
+    if notifications is None:
+        return list(_STATE_PROVIDER_CLASSES)
+
+    notifications = set(notifications)
+    needed = set()
+    pending = [sp_cls for sp_cls in _STATE_PROVIDER_CLASSES
+               if notifications.intersection(sp_cls.NOTIFICATIONS)]
+
+    while pending:
+        sp_cls = pending.pop()
+
+        if sp_cls not in needed:
+            needed.add(sp_cls)
+            pending.extend(sp_cls.DEPENDENCIES)
+
+    return [sp_cls for sp_cls in _STATE_PROVIDER_CLASSES if sp_cls in needed]
 
 
 class Automaton:
-    def __init__(self):
+    # Only the state providers needed to send `notifications` are run,
+    # the events they do not handle being ignored, or all of them if
+    # `notifications` is None.
+    def __init__(self, notifications=None):
         self._state = State()
         self._state_providers = [
-            SchedStateProvider(self._state),
-            MemStateProvider(self._state),
-            IrqStateProvider(self._state),
-            SyscallsStateProvider(self._state),
-            IoStateProvider(self._state),
-            StatedumpStateProvider(self._state),
-            BlockStateProvider(self._state),
-            NetStateProvider(self._state)
+            sp_cls(self._state)
+            for sp_cls in get_state_provider_classes(notifications)
         ]
+        self._router = EventRouter(
+            [sp.cbs for sp in self._state_providers])
+
+    def sends_notifications(self, notifications):
+        # Whether or not all the state providers needed to send
+        # `notifications` are run.
+        sp_classes = {type(sp) for sp in self._state_providers}
+
+        return sp_classes.issuperset(
+            get_state_provider_classes(notifications))
 
     def process_event(self, ev):
+        self._router.process_event(ev)
+
+    def handles_event(self, name):
+        return len(self._router.route(name)) > 0
+
+    def get_event_filter(self):
+        # Picklable equivalent of handles_event(), for the event names
+        # handled by the state providers.
+        keys = {}
+
         for sp in self._state_providers:
-            sp.process_event(ev)
+            keys.update(dict.fromkeys(sp.cbs, True))
+
+        return functools.partial(resolve_cb, keys)
 
     @property
     def state(self):
@@ -21,10 +21,22 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from . import sp, sv
+import collections
+import operator
+from . import sched, sp, sv
 
 
 class BlockStateProvider(sp.StateProvider):
+    NOTIFICATIONS = ['block_rq_complete']
+    DEPENDENCIES = [sched.SchedStateProvider]
+
+    # Remapped and pending requests without a completion for this long
+    # (ns) are considered lost and evicted, as are the oldest ones
+    # beyond these counts (per disk for the pending requests).
+    MAX_REQUEST_AGE = 60 * 1000000000
+    MAX_REMAP_REQUESTS = 65536
+    MAX_PENDING_REQUESTS = 65536
+
     def __init__(self, state):
         cbs = {
             'block_rq_complete': self._process_block_rq_complete,
@@ -34,7 +46,26 @@ class BlockStateProvider(sp.StateProvider):
         }
 
         super().__init__(state, cbs)
-        self._remap_requests = []
+        # indexed by (dev, sector) of their last remap, oldest first
+        self._remap_requests = collections.OrderedDict()
+
+    def _evict_stale_requests(self, requests, get_ts, timestamp,
+                              max_count):
+        # Evicts the oldest requests of an OrderedDict that are too old
+        # or too many, and returns their number
+        count = 0
+
+        while requests:
+            req = next(iter(requests.values()))
+
+            if timestamp - get_ts(req) <= self.MAX_REQUEST_AGE and \
+                    len(requests) <= max_count:
+                break
+
+            requests.popitem(last=False)
+            count += 1
+
+        return count
 
     def _process_block_bio_remap(self, event):
         dev = event['dev']
@@ -42,24 +73,29 @@ class BlockStateProvider(sp.StateProvider):
         old_dev = event['old_dev']
         old_sector = event['old_sector']
 
-        for req in self._remap_requests:
-            if req.dev == old_dev and req.sector == old_sector:
-                req.dev = dev
-                req.sector = sector
-                return
+        # A remap of a remapped request only changes its location
+        req = self._remap_requests.pop((old_dev, old_sector), None)
 
-        req = sv.BlockRemapRequest(dev, sector, old_dev, old_sector)
-        self._remap_requests.append(req)
+        if req is None:
+            req = sv.BlockRemapRequest(dev, sector, old_dev, old_sector,
+                                       event.timestamp)
+        else:
+            req.dev = dev
+            req.sector = sector
+            req.timestamp = event.timestamp
+
+        # a stale request at the same location is replaced
+        self._remap_requests.pop((dev, sector), None)
+        self._remap_requests[(dev, sector)] = req
+        self._state.evicted_block_remaps += self._evict_stale_requests(
+            self._remap_requests, operator.attrgetter('timestamp'),
+            event.timestamp, self.MAX_REMAP_REQUESTS)
 
     # For backmerge requests, just remove the request from the
     # _remap_requests queue, because we rely later on the nr_sector
     # which has all the info we need
     def _process_block_bio_backmerge(self, event):
-        dev = event['dev']
-        sector = event['sector']
-        for remap_req in self._remap_requests:
-            if remap_req.dev == dev and remap_req.sector == sector:
-                self._remap_requests.remove(remap_req)
+        self._remap_requests.pop((event['dev'], event['sector']), None)
 
     def _process_block_rq_issue(self, event):
         dev = event['dev']
@@ -71,15 +107,20 @@ class BlockStateProvider(sp.StateProvider):
 
         req = sv.BlockIORequest.new_from_rq_issue(event)
 
-        for remap_req in self._remap_requests:
-            if remap_req.dev == dev and remap_req.sector == sector:
-                dev = remap_req.old_dev
-                break
+        remap_req = self._remap_requests.get((dev, sector))
+        if remap_req is not None:
+            dev = remap_req.old_dev
 
         if dev not in self._state.disks:
             self._state.disks[dev] = sv.Disk(dev)
 
-        self._state.disks[dev].pending_requests[sector] = req
+        pending_requests = self._state.disks[dev].pending_requests
+        # keep the requests in issue order
+        pending_requests.pop(sector, None)
+        pending_requests[sector] = req
+        self._state.evicted_block_rqs += self._evict_stale_requests(
+            pending_requests, operator.attrgetter('begin_ts'),
+            event.timestamp, self.MAX_PENDING_REQUESTS)
 
     def _process_block_rq_complete(self, event):
         dev = event['dev']
@@ -89,11 +130,9 @@ class BlockStateProvider(sp.StateProvider):
         if nr_sector == 0:
             return
 
-        for remap_req in self._remap_requests:
-            if remap_req.dev == dev and remap_req.sector == sector:
-                dev = remap_req.old_dev
-                self._remap_requests.remove(remap_req)
-                break
+        remap_req = self._remap_requests.pop((dev, sector), None)
+        if remap_req is not None:
+            dev = remap_req.old_dev
 
         if dev not in self._state.disks:
             self._state.disks[dev] = sv.Disk(dev)
@@ -110,11 +149,13 @@ class BlockStateProvider(sp.StateProvider):
             return
 
         req.update_from_rq_complete(event)
-        if req.tid in self._state.tids.keys():
-            proc = self._state.tids[req.tid]
-        else:
-            proc = None
-        self._state.send_notification_cb('block_rq_complete', req=req,
-                                         proc=proc, cpu_id=event['cpu_id'],
-                                         disk=disk)
+        if self._state.has_notification_cbs('block_rq_complete'):
+            if req.tid in self._state.tids.keys():
+                proc = self._state.tids[req.tid]
+            else:
+                proc = None
+            self._state.send_notification_cb('block_rq_complete', req=req,
+                                             proc=proc,
+                                             cpu_id=event['cpu_id'],
+                                             disk=disk)
         del disk.pending_requests[sector]
@@ -0,0 +1,208 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import os
+import pickle
+import stat
+from ..common.trace_utils import get_trace_signature
+
+# Checkpoints are pickled automatons, which run arbitrary code when
+# loaded: they are only saved to and loaded from a directory given by
+# the user, never from the trace itself, which may come from anyone.
+# Each trace has its own subdirectory, with one file per checkpoint,
+# named after the timestamp of the first event which was not yet
+# processed by the saved automaton.
+_CHECKPOINT_SUFFIX = '.ckpt'
+_CHECKPOINT_VERSION = 5
+
+
+def get_checkpoint_dir(checkpoints_path, trace_path):
+    """Get the directory of the checkpoints of a trace.
+
+    Args:
+        checkpoints_path (str): path of the directory of the
+        checkpoints of all the traces.
+        trace_path (str): root path of the trace.
+
+    Returns:
+        The path of the subdirectory of checkpoints_path named after
+        the real path of the trace.
+    """
+    trace_path = os.path.realpath(trace_path)
+    digest = hashlib.sha1(trace_path.encode('utf-8', 'surrogateescape'))
+
+    return os.path.join(checkpoints_path, digest.hexdigest())
+
+
+def _is_trusted(path):
+    # Only the files and directories owned by the current user and that
+    # no one else can write to are trusted, where ownership applies.
+    if not hasattr(os, 'getuid'):
+        return True
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+
+    return st.st_uid == os.getuid() and \
+        not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+class CheckpointWriter():
+    def __init__(self, automaton, checkpoint_dir, trace_path, interval):
+        self._automaton = automaton
+        self._dir = checkpoint_dir
+        self._interval = interval
+        self._signature = get_trace_signature(trace_path)
+        self._next_ts = None
+        self.error = None
+
+    def process_event(self, ev):
+        # Must be called before the automaton processes the event, so
+        # that the saved state covers exactly the events preceding it.
+        if self.error is not None:
+            return
+
+        ts = ev.timestamp
+
+        if self._next_ts is None:
+            self._next_ts = (ts // self._interval + 1) * self._interval
+        elif ts >= self._next_ts:
+            self._save(ts)
+            self._next_ts = (ts // self._interval + 1) * self._interval
+
+    def _save(self, ts):
+        checkpoint = {
+            'version': _CHECKPOINT_VERSION,
+            'signature': self._signature,
+            'timestamp': ts,
+            'automaton': self._automaton,
+        }
+        path = os.path.join(self._dir, '{}{}'.format(ts, _CHECKPOINT_SUFFIX))
+        tmp_path = path + '.tmp'
+
+        try:
+            os.makedirs(self._dir, mode=0o700, exist_ok=True)
+
+            # not group-writable whatever the umask (see _is_trusted())
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, TypeError,
+                AttributeError) as e:
+            # e.g. a part of the state which cannot be pickled
+            self.error = e
+
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _get_checkpoint_timestamps(checkpoint_dir):
+    try:
+        names = os.listdir(checkpoint_dir)
+    except OSError:
+        return []
+
+    timestamps = []
+
+    for name in names:
+        if not name.endswith(_CHECKPOINT_SUFFIX):
+            continue
+
+        ts = name[:-len(_CHECKPOINT_SUFFIX)]
+
+        if ts.isdigit():
+            timestamps.append(int(ts))
+
+    return sorted(timestamps)
+
+
+def load_checkpoint(checkpoint_dir, trace_path, timestamp,
+                    notifications=None):
+    """Load the latest checkpoint of a trace preceding a timestamp.
+
+    The checkpoints are only loaded if the directory and the files are
+    owned by the current user, and no one else can write to them.
+
+    Args:
+        checkpoint_dir (str): directory of the checkpoints of the trace
+        (see get_checkpoint_dir()).
+        trace_path (str): root path of the trace.
+        timestamp (int): timestamp (ns) at or before which the
+        checkpoint must have been taken.
+        notifications (optional): names of the notifications the
+        automaton must send, or None for all of them (default: None).
+
+    Returns:
+        A (timestamp, automaton) tuple, where the automaton has
+        processed all the events preceding the timestamp, or None if
+        no valid checkpoint is found.
+    """
+    if not _is_trusted(checkpoint_dir):
+        return None
+
+    signature = None
+
+    for ts in reversed(_get_checkpoint_timestamps(checkpoint_dir)):
+        if ts > timestamp:
+            continue
+
+        path = os.path.join(checkpoint_dir,
+                            '{}{}'.format(ts, _CHECKPOINT_SUFFIX))
+
+        if not _is_trusted(path):
+            continue
+
+        try:
+            with open(path, 'rb') as f:
+                checkpoint = pickle.load(f)
+        except (OSError, EOFError, AttributeError, ImportError,
+                pickle.UnpicklingError):
+            continue
+
+        if not isinstance(checkpoint, dict) or \
+                checkpoint.get('version') != _CHECKPOINT_VERSION:
+            continue
+
+        if signature is None:
+            signature = get_trace_signature(trace_path)
+
+        # All the checkpoints were taken from an older version of the
+        # trace files.
+        if checkpoint['signature'] != signature:
+            return None
+
+        # Taken by an analysis needing less of the state
+        if not checkpoint['automaton'].sends_notifications(notifications):
+            continue
+
+        return checkpoint['timestamp'], checkpoint['automaton']
+
+    return None
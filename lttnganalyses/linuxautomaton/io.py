@@ -24,11 +24,19 @@
 import os
 import socket
 from babeltrace import CTFScope
-from . import sp, sv
+from . import mem, sched, sp, statedump, sv, syscalls
 from ..common import format_utils, trace_utils
 
 
 class IoStateProvider(sp.StateProvider):
+    NOTIFICATIONS = ['io_rq_exit', 'create_fd', 'close_fd', 'update_fd']
+    # The I/O requests are created from the current syscalls, and
+    # account for the pages allocated during their execution
+    DEPENDENCIES = [
+        sched.SchedStateProvider, syscalls.SyscallsStateProvider,
+        mem.MemStateProvider, statedump.StatedumpStateProvider,
+    ]
+
     def __init__(self, state):
         cbs = {
             'syscall_entry': self._process_syscall_entry,
@@ -42,11 +50,6 @@ class IoStateProvider(sp.StateProvider):
         super().__init__(state, cbs)
 
     def _process_syscall_entry(self, event):
-        # Only handle IO Syscalls
-        name = trace_utils.get_syscall_name(event)
-        if name not in sv.SyscallConsts.IO_SYSCALLS:
-            return
-
         cpu_id = event['cpu_id']
         if cpu_id not in self._state.cpus:
             return
@@ -55,6 +58,15 @@ class IoStateProvider(sp.StateProvider):
         if cpu.current_tid is None:
             return
 
+        # The new syscall replaces the current one of the process, along
+        # with its I/O request if it was still in flight
+        self._state.syscall_io_rqs.pop(cpu.current_tid, None)
+
+        # Only handle IO Syscalls
+        name = trace_utils.get_syscall_name(event)
+        if name not in sv.SyscallConsts.IO_SYSCALLS:
+            return
+
         proc = self._state.tids[cpu.current_tid]
 
         # check if we can fix the pid from a context
@@ -70,6 +82,10 @@ class IoStateProvider(sp.StateProvider):
         elif name in sv.SyscallConsts.SYNC_SYSCALLS:
             self._track_sync(event, name, proc)
 
+        io_rq = proc.current_syscall.io_rq
+        if io_rq is not None:
+            self._state.syscall_io_rqs[cpu.current_tid] = io_rq
+
     def _process_syscall_exit(self, event):
         cpu_id = event['cpu_id']
         if cpu_id not in self._state.cpus:
@@ -79,18 +95,16 @@ class IoStateProvider(sp.StateProvider):
         if cpu.current_tid is None:
             return
 
-        proc = self._state.tids[cpu.current_tid]
-        current_syscall = proc.current_syscall
-        if current_syscall is None:
-            return
-
-        name = current_syscall.name
-        if name not in sv.SyscallConsts.IO_SYSCALLS:
+        # The current syscall was already cleared by the syscalls state
+        # provider. There is no I/O request if the syscall is not an I/O
+        # one, or in the case of fcntl when cmd is not F_DUPFD, in which
+        # case we disregard the syscall as it did not open any FD
+        io_rq = self._state.syscall_io_rqs.pop(cpu.current_tid, None)
+        if io_rq is None:
             return
 
-        self._track_io_rq_exit(event, proc)
-
-        proc.current_syscall = None
+        proc = self._state.tids[cpu.current_tid]
+        self._track_io_rq_exit(event, proc, io_rq)
 
     def _process_connect(self, event):
         cpu_id = event['cpu_id']
@@ -118,16 +132,12 @@ class IoStateProvider(sp.StateProvider):
                                              cpu_id=event['cpu_id'])
 
     def _process_writeback_pages_written(self, event):
-        for cpu in self._state.cpus.values():
-            if cpu.current_tid is None:
-                continue
-
-            current_syscall = self._state.tids[cpu.current_tid].current_syscall
-            if current_syscall is None:
-                continue
+        # Only the in-flight requests of the running processes
+        running_tids = self._state.running_tids
 
-            if current_syscall.io_rq:
-                current_syscall.io_rq.pages_written += event['pages']
+        for tid, io_rq in self._state.syscall_io_rqs.items():
+            if tid in running_tids:
+                io_rq.pages_written += event['pages']
 
     def _process_mm_vmscan_wakeup_kswapd(self, event):
         cpu_id = event['cpu_id']
@@ -146,24 +156,22 @@ class IoStateProvider(sp.StateProvider):
             current_syscall.io_rq.woke_kswapd = True
 
     def _process_mm_page_free(self, event):
-        for cpu in self._state.cpus.values():
-            if cpu.current_tid is None:
-                continue
+        syscall_io_rqs = self._state.syscall_io_rqs
+        if not syscall_io_rqs:
+            return
 
-            proc = self._state.tids[cpu.current_tid]
+        for tid in self._state.running_tids:
+            proc = self._state.tids[tid]
 
             # if the current process is kswapd0, we need to
             # attribute the page freed to the process that
             # woke it up.
             if proc.comm == 'kswapd0' and proc.prev_tid > 0:
-                proc = self._state.tids[proc.prev_tid]
-
-            current_syscall = proc.current_syscall
-            if current_syscall is None:
-                continue
+                tid = proc.prev_tid
 
-            if current_syscall.io_rq and current_syscall.io_rq.woke_kswapd:
-                current_syscall.io_rq.pages_freed += 1
+            io_rq = syscall_io_rqs.get(tid)
+            if io_rq is not None and io_rq.woke_kswapd:
+                io_rq.pages_freed += 1
 
     def _track_open(self, event, name, proc):
         current_syscall = proc.current_syscall
@@ -256,27 +264,21 @@ class IoStateProvider(sp.StateProvider):
             current_syscall.io_rq = sv.SyncIORequest.new_from_sync_file_range(
                 event, proc.tid)
 
-    def _track_io_rq_exit(self, event, proc):
+    def _track_io_rq_exit(self, event, proc, io_rq):
         ret = event['ret']
         cpu_id = event['cpu_id']
-        io_rq = proc.current_syscall.io_rq
-        # io_rq can be None in the case of fcntl when cmd is not
-        # F_DUPFD, in which case we disregard the syscall as it did
-        # not open any FD
-        if io_rq is None:
-            return
-
         io_rq.update_from_exit(event)
 
         if ret >= 0:
             self._create_fd(proc, io_rq, cpu_id)
 
-        parent_proc = self._get_parent_proc(proc)
-        self._state.send_notification_cb('io_rq_exit',
-                                         io_rq=io_rq,
-                                         proc=proc,
-                                         parent_proc=parent_proc,
-                                         cpu_id=cpu_id)
+        if self._state.has_notification_cbs('io_rq_exit'):
+            parent_proc = self._get_parent_proc(proc)
+            self._state.send_notification_cb('io_rq_exit',
+                                             io_rq=io_rq,
+                                             proc=proc,
+                                             parent_proc=parent_proc,
+                                             cpu_id=cpu_id)
 
         if isinstance(io_rq, sv.CloseIORequest) and ret == 0:
             self._close_fd(proc, io_rq.fd, io_rq.end_ts, cpu_id)
@@ -25,6 +25,8 @@ from . import sp, sv
 
 
 class IrqStateProvider(sp.StateProvider):
+    NOTIFICATIONS = ['irq_handler_entry', 'irq_handler_exit', 'softirq_exit']
+
     def __init__(self, state):
         cbs = {
             'irq_handler_entry': self._process_irq_handler_entry,
@@ -48,6 +50,9 @@ class IrqStateProvider(sp.StateProvider):
         irq = sv.HardIRQ.new_from_irq_handler_entry(event)
         cpu.current_hard_irq = irq
 
+        if not self._state.has_notification_cbs('irq_handler_entry'):
+            return
+
         self._state.send_notification_cb('irq_handler_entry',
                                          id=irq.id,
                                          irq_name=event['name'])
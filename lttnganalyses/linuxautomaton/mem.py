@@ -21,10 +21,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from . import sp
+from . import sched, sp
 
 
 class MemStateProvider(sp.StateProvider):
+    NOTIFICATIONS = ['tid_page_alloc', 'tid_page_free']
+    DEPENDENCIES = [sched.SchedStateProvider]
+
     def __init__(self, state):
         cbs = {
             'mm_page_alloc': self._process_mm_page_alloc,
@@ -51,12 +54,11 @@ class MemStateProvider(sp.StateProvider):
 
         # Increment the number of pages allocated during the execution
         # of all currently syscall io requests
-        for process in self._state.tids.values():
-            if process.current_syscall is None:
-                continue
+        for io_rq in self._state.syscall_io_rqs.values():
+            io_rq.pages_allocated += 1
 
-            if process.current_syscall.io_rq:
-                process.current_syscall.io_rq.pages_allocated += 1
+        if not self._state.has_notification_cbs('tid_page_alloc'):
+            return
 
         current_process = self._get_current_proc(event)
         if current_process is None:
@@ -72,6 +74,9 @@ class MemStateProvider(sp.StateProvider):
 
         self._state.mm.page_count -= 1
 
+        if not self._state.has_notification_cbs('tid_page_free'):
+            return
+
         current_process = self._get_current_proc(event)
         if current_process is None:
             return
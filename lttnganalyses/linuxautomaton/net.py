@@ -21,10 +21,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from . import sp, sv
+from . import io, sched, sp, sv
 
 
 class NetStateProvider(sp.StateProvider):
+    NOTIFICATIONS = ['net_dev_xmit', 'netif_receive_skb']
+    # The type of the FDs written to is updated from the I/O requests
+    DEPENDENCIES = [sched.SchedStateProvider, io.IoStateProvider]
+
     def __init__(self, state):
         cbs = {
             'net_dev_xmit': self._process_net_dev_xmit,
@@ -34,10 +38,11 @@ class NetStateProvider(sp.StateProvider):
         super().__init__(state, cbs)
 
     def _process_net_dev_xmit(self, event):
-        self._state.send_notification_cb('net_dev_xmit',
-                                         iface_name=event['name'],
-                                         sent_bytes=event['len'],
-                                         cpu_id=event['cpu_id'])
+        if self._state.has_notification_cbs('net_dev_xmit'):
+            self._state.send_notification_cb('net_dev_xmit',
+                                             iface_name=event['name'],
+                                             sent_bytes=event['len'],
+                                             cpu_id=event['cpu_id'])
 
         cpu_id = event['cpu_id']
         if cpu_id not in self._state.cpus:
@@ -63,6 +68,9 @@ class NetStateProvider(sp.StateProvider):
                 proc.fds[fd].fd_type = sv.FDType.maybe_net
 
     def _process_netif_receive_skb(self, event):
+        if not self._state.has_notification_cbs('netif_receive_skb'):
+            return
+
         self._state.send_notification_cb('netif_receive_skb',
                                          iface_name=event['name'],
                                          recv_bytes=event['len'],
@@ -21,13 +21,20 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from . import sp, sv
+from . import sp, statedump, sv
 from ..common import version_utils
 
 
 class SchedStateProvider(sp.StateProvider):
+    NOTIFICATIONS = [
+        'sched_switch_per_cpu', 'sched_switch_per_tid', 'prio_changed',
+        'sched_migrate_task', 'create_fd', 'close_fd',
+    ]
+    # The PIDs and names of the processes which existed before the
+    # tracing session are only known from the statedump
+    DEPENDENCIES = [statedump.StatedumpStateProvider]
     # The priority offset for sched_wak* events was fixed in
-    # lttng-modules 2.7.1 upwards
+    # lttng-modules 2.7.1 upwards (see State.wakeup_prio_offset)
     PRIO_OFFSET_FIX_VERSION = version_utils.Version(2, 7, 1)
 
     def __init__(self, state):
@@ -49,11 +56,17 @@ class SchedStateProvider(sp.StateProvider):
             self._state.cpus[cpu_id] = sv.CPU(cpu_id)
 
         cpu = self._state.cpus[cpu_id]
+        running_tids = self._state.running_tids
+
+        if running_tids.get(cpu.current_tid) == cpu_id:
+            del running_tids[cpu.current_tid]
+
         # exclude swapper process
         if next_tid == 0:
             cpu.current_tid = None
         else:
             cpu.current_tid = next_tid
+            running_tids[next_tid] = cpu_id
 
     def _create_proc(self, tid):
         if tid not in self._state.tids:
@@ -104,19 +117,15 @@ class SchedStateProvider(sp.StateProvider):
         if wakee_proc.last_waker is not None:
             waker_proc = self._state.tids[wakee_proc.last_waker]
 
-        cb_data = {
-            'timestamp': timestamp,
-            'cpu_id': cpu_id,
-            'prev_tid': prev_tid,
-            'next_tid': next_tid,
-            'next_comm': next_comm,
-            'wakee_proc': wakee_proc,
-            'waker_proc': waker_proc,
-            'prev_comm': prev_comm,
-        }
+        for name in ('sched_switch_per_cpu', 'sched_switch_per_tid'):
+            if not self._state.has_notification_cbs(name):
+                continue
 
-        self._state.send_notification_cb('sched_switch_per_cpu', **cb_data)
-        self._state.send_notification_cb('sched_switch_per_tid', **cb_data)
+            self._state.send_notification_cb(
+                name, timestamp=timestamp, cpu_id=cpu_id, prev_tid=prev_tid,
+                next_tid=next_tid, next_comm=next_comm,
+                wakee_proc=wakee_proc, waker_proc=waker_proc,
+                prev_comm=prev_comm)
 
         wakee_proc.last_wakeup = None
         wakee_proc.last_waker = None
@@ -140,12 +149,9 @@ class SchedStateProvider(sp.StateProvider):
     def _process_sched_wakeup(self, event):
         target_cpu = event['target_cpu']
         current_cpu = event['cpu_id']
-        prio = event['prio']
+        prio = event['prio'] + self._state.wakeup_prio_offset
         tid = event['tid']
 
-        if self._state.tracer_version < self.PRIO_OFFSET_FIX_VERSION:
-            prio -= 100
-
         if target_cpu not in self._state.cpus:
             self._state.cpus[target_cpu] = sv.CPU(target_cpu)
 
@@ -153,10 +159,8 @@ class SchedStateProvider(sp.StateProvider):
             self._state.cpus[current_cpu] = sv.CPU(current_cpu)
 
         # If the TID is already executing on a CPU, ignore this wakeup
-        for cpu_id in self._state.cpus:
-            cpu = self._state.cpus[cpu_id]
-            if cpu.current_tid == tid:
-                return
+        if tid in self._state.running_tids:
+            return
 
         if tid not in self._state.tids:
             proc = sv.Process()
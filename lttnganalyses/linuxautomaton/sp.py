@@ -21,21 +21,83 @@
 # SOFTWARE.
 
 
+def resolve_cb(cbs, name):
+    """Resolve the callback of a callback dict handling an event name.
+
+    Exact event names take precedence; otherwise, all the syscall entry
+    and exit events are handled at the same place.
+
+    Args:
+        cbs (dict): callbacks indexed by event name.
+        name (str): name of the event.
+
+    Returns:
+        The matching callback, or None if no callback handles the event.
+    """
+    if name in cbs:
+        return cbs[name]
+
+    if name.startswith('sys_') or name.startswith('syscall_entry_'):
+        return cbs.get('syscall_entry')
+
+    if name.startswith('exit_syscall') or name.startswith('syscall_exit_'):
+        return cbs.get('syscall_exit')
+
+    return None
+
+
+class EventRouter:
+    """Dispatch events to an ordered list of callback dicts.
+
+    The handlers interested in an event name are resolved the first
+    time the name is seen and memoized, so that uninteresting events
+    cost a single dict lookup.
+    """
+    def __init__(self, cbs_list=None):
+        self._cbs_list = []
+        self._routes = {}
+
+        if cbs_list is not None:
+            for cbs in cbs_list:
+                self.add_cbs(cbs)
+
+    def add_cbs(self, cbs):
+        self._cbs_list.append(cbs)
+        self._routes.clear()
+
+    def route(self, name):
+        handlers = self._routes.get(name)
+
+        if handlers is None:
+            handlers = []
+
+            for cbs in self._cbs_list:
+                cb = resolve_cb(cbs, name)
+
+                if cb is not None:
+                    handlers.append(cb)
+
+            handlers = tuple(handlers)
+            self._routes[name] = handlers
+
+        return handlers
+
+    def process_event(self, ev):
+        for cb in self.route(ev.name):
+            cb(ev)
+
+
 class StateProvider:
+    # Names of the notifications sent by the state provider, and the
+    # state providers keeping the parts of the state it reads (see
+    # automaton.get_state_provider_classes())
+    NOTIFICATIONS = []
+    DEPENDENCIES = []
+
     def __init__(self, state, cbs):
         self._state = state
         self._cbs = cbs
 
-    def process_event(self, ev):
-        name = ev.name
-
-        if name in self._cbs:
-            self._cbs[name](ev)
-        # for now we process all the syscalls at the same place
-        elif 'syscall_entry' in self._cbs and \
-                (name.startswith('sys_') or name.startswith('syscall_entry_')):
-            self._cbs['syscall_entry'](ev)
-        elif 'syscall_exit' in self._cbs and \
-                (name.startswith('exit_syscall') or
-                 name.startswith('syscall_exit_')):
-            self._cbs['syscall_exit'](ev)
+    @property
+    def cbs(self):
+        return self._cbs
@@ -26,6 +26,11 @@ from . import sp, sv
 
 
 class StatedumpStateProvider(sp.StateProvider):
+    NOTIFICATIONS = [
+        'lttng_statedump_block_device', 'create_parent_proc', 'create_fd',
+        'update_fd',
+    ]
+
     def __init__(self, state):
         cbs = {
             'lttng_statedump_process_state':
@@ -21,6 +21,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import collections
 import os
 import socket
 from ..common import format_utils, trace_utils
@@ -88,8 +89,8 @@ class Disk():
     def __init__(self, dev, diskname=None):
         self.dev = dev
         self.diskname = diskname
-        # pending block IO Requests, indexed by sector
-        self.pending_requests = {}
+        # pending block IO Requests, indexed by sector, in issue order
+        self.pending_requests = collections.OrderedDict()
 
 
 class FDType():
@@ -445,11 +446,13 @@ class BlockIORequest(IORequest):
 
 
 class BlockRemapRequest():
-    def __init__(self, dev, sector, old_dev, old_sector):
+    def __init__(self, dev, sector, old_dev, old_sector, timestamp):
         self.dev = dev
         self.sector = sector
         self.old_dev = old_dev
         self.old_sector = old_sector
+        # time of the last remap of the request
+        self.timestamp = timestamp
 
 
 class SyscallConsts():
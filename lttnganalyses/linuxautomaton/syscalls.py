@@ -21,10 +21,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from . import sp, sv
+from . import sched, sp, sv
 
 
 class SyscallsStateProvider(sp.StateProvider):
+    NOTIFICATIONS = ['syscall_exit']
+    DEPENDENCIES = [sched.SchedStateProvider]
+
     def __init__(self, state):
         cbs = {
             'syscall_entry': self._process_syscall_entry,
@@ -67,7 +70,7 @@ class SyscallsStateProvider(sp.StateProvider):
                                          event=event,
                                          cpu_id=cpu_id)
 
-        # If it's an IO Syscall, the IO state provider will take care of
-        # clearing the current syscall, so only clear here if it's not
-        if current_syscall.name not in sv.SyscallConsts.IO_SYSCALLS:
-            self._state.tids[cpu.current_tid].current_syscall = None
+        # The I/O state provider gets the I/O request of the syscall
+        # from State.syscall_io_rqs, so that the syscall is cleared
+        # even if the I/O requests are not tracked
+        proc.current_syscall = None
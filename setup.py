@@ -112,6 +112,7 @@ setup(
             'lttng-periodtop = lttnganalyses.cli.periods:runtop',
             'lttng-periodstats = lttnganalyses.cli.periods:runstats',
             'lttng-periodfreq = lttnganalyses.cli.periods:runfreq',
+            'lttng-analyses-all = lttnganalyses.cli.multi:run',
 
             # MI mode
             'lttng-cputop-mi = lttnganalyses.cli.cputop:run_mi',
@@ -133,6 +134,7 @@ setup(
             'lttng-periodtop-mi = lttnganalyses.cli.periods:runtop_mi',
             'lttng-periodstats-mi = lttnganalyses.cli.periods:runstats_mi',
             'lttng-periodfreq-mi = lttnganalyses.cli.periods:runfreq_mi',
+            'lttng-analyses-all-mi = lttnganalyses.cli.multi:run_mi',
         ],
     },
 
@@ -146,7 +148,8 @@ setup(
     ],
 
     extras_require={
-        'progressbar': ["progressbar"]
+        'progressbar': ["progressbar"],
+        'numpy': ["numpy"]
     },
 
     test_suite='tests',
@@ -0,0 +1,369 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import pickle
+import unittest
+from lttnganalyses.common.version_utils import Version
+
+try:
+    from lttnganalyses.core.cputop import Cputop
+    from lttnganalyses.core.io import IoAnalysis
+    from lttnganalyses.core.irq import IrqAnalysis
+    from lttnganalyses.linuxautomaton import automaton
+    from lttnganalyses.linuxautomaton.block import BlockStateProvider
+    from lttnganalyses.linuxautomaton.io import IoStateProvider
+    from lttnganalyses.linuxautomaton.irq import IrqStateProvider
+    from lttnganalyses.linuxautomaton.mem import MemStateProvider
+    from lttnganalyses.linuxautomaton.net import NetStateProvider
+    from lttnganalyses.linuxautomaton.sched import SchedStateProvider
+    from lttnganalyses.linuxautomaton.statedump import \
+        StatedumpStateProvider
+    from lttnganalyses.linuxautomaton.syscalls import SyscallsStateProvider
+except ImportError:
+    # the state providers need babeltrace (see core.event)
+    automaton = None
+    IoAnalysis = None
+
+
+# Event of the state providers: mapping of field names to their
+# values, with a name, a timestamp and no context fields
+class _Event(dict):
+    def __init__(self, name, timestamp, **fields):
+        super().__init__(fields)
+        self.name = name
+        self.timestamp = timestamp
+
+    def field_list_with_scope(self, scope):
+        return []
+
+
+def _sched_switch(timestamp, cpu_id, prev_tid, next_tid, next_comm=None):
+    if next_comm is None:
+        next_comm = 'proc%d' % next_tid
+
+    return _Event('sched_switch', timestamp, cpu_id=cpu_id,
+                  prev_tid=prev_tid, prev_comm='proc%d' % prev_tid,
+                  prev_prio=20, next_tid=next_tid, next_comm=next_comm,
+                  next_prio=20)
+
+
+def _sched_wakeup(timestamp, cpu_id, tid, prio):
+    return _Event('sched_wakeup', timestamp, cpu_id=cpu_id, target_cpu=1,
+                  tid=tid, prio=prio)
+
+
+@unittest.skipIf(automaton is None, 'babeltrace is not available')
+class TestStateProviderClasses(unittest.TestCase):
+    def test_all(self):
+        self.assertEqual(automaton.get_state_provider_classes(), [
+            SchedStateProvider, MemStateProvider, IrqStateProvider,
+            SyscallsStateProvider, IoStateProvider, StatedumpStateProvider,
+            BlockStateProvider, NetStateProvider,
+        ])
+        self.assertEqual(automaton.get_state_provider_classes(None),
+                         automaton.get_state_provider_classes())
+
+    def test_none_needed(self):
+        self.assertEqual(automaton.get_state_provider_classes([]), [])
+        self.assertEqual(automaton.get_state_provider_classes(['unknown']),
+                         [])
+
+    def test_minimal(self):
+        self.assertEqual(
+            automaton.get_state_provider_classes(['syscall_exit']),
+            [SchedStateProvider, SyscallsStateProvider,
+             StatedumpStateProvider])
+
+    def test_transitive_dependencies(self):
+        # net depends on io, which depends on mem and syscalls, which
+        # depend on sched, which depends on statedump
+        self.assertEqual(
+            automaton.get_state_provider_classes(['net_dev_xmit']),
+            [SchedStateProvider, MemStateProvider, SyscallsStateProvider,
+             IoStateProvider, StatedumpStateProvider, NetStateProvider])
+
+    def test_irqstats(self):
+        self.assertEqual(automaton.get_state_provider_classes(
+            IrqAnalysis.STATE_NOTIFICATIONS), [IrqStateProvider])
+
+    def test_cputop(self):
+        self.assertEqual(automaton.get_state_provider_classes(
+            Cputop.STATE_NOTIFICATIONS),
+            [SchedStateProvider, StatedumpStateProvider])
+
+
+@unittest.skipIf(automaton is None, 'babeltrace is not available')
+class TestAutomaton(unittest.TestCase):
+    def test_all(self):
+        all_automaton = automaton.Automaton()
+
+        self.assertTrue(all_automaton.sends_notifications(None))
+        self.assertTrue(all_automaton.sends_notifications(
+            Cputop.STATE_NOTIFICATIONS))
+        self.assertTrue(all_automaton.handles_event('sched_switch'))
+        self.assertTrue(all_automaton.handles_event('syscall_entry_open'))
+
+    def test_irqstats(self):
+        irq_automaton = automaton.Automaton(IrqAnalysis.STATE_NOTIFICATIONS)
+
+        self.assertTrue(irq_automaton.sends_notifications(
+            IrqAnalysis.STATE_NOTIFICATIONS))
+        self.assertFalse(irq_automaton.sends_notifications(
+            Cputop.STATE_NOTIFICATIONS))
+        self.assertFalse(irq_automaton.sends_notifications(None))
+        self.assertTrue(irq_automaton.handles_event('irq_handler_entry'))
+        self.assertFalse(irq_automaton.handles_event('sched_switch'))
+        self.assertFalse(irq_automaton.handles_event('syscall_entry_open'))
+
+    def test_event_filter(self):
+        cputop_automaton = automaton.Automaton(Cputop.STATE_NOTIFICATIONS)
+        event_filter = pickle.loads(pickle.dumps(
+            cputop_automaton.get_event_filter()))
+
+        for name in ['sched_switch', 'sched_process_fork',
+                     'lttng_statedump_process_state', 'irq_handler_entry',
+                     'syscall_entry_open', 'sys_open']:
+            self.assertEqual(bool(event_filter(name)),
+                             cputop_automaton.handles_event(name), name)
+
+        self.assertTrue(event_filter('sched_switch'))
+        self.assertFalse(event_filter('irq_handler_entry'))
+
+
+@unittest.skipIf(automaton is None, 'babeltrace is not available')
+class TestSchedState(unittest.TestCase):
+    def setUp(self):
+        self.automaton = automaton.Automaton(Cputop.STATE_NOTIFICATIONS)
+        self.state = self.automaton.state
+
+    def _process(self, *events):
+        for event in events:
+            self.automaton.process_event(event)
+
+    def test_running_tids(self):
+        self._process(_sched_switch(1, 0, 0, 10),
+                      _sched_switch(2, 1, 0, 11))
+        self.assertEqual(self.state.running_tids, {10: 0, 11: 1})
+
+        # switch to the swapper
+        self._process(_sched_switch(3, 0, 10, 0))
+        self.assertEqual(self.state.running_tids, {11: 1})
+        self.assertIsNone(self.state.cpus[0].current_tid)
+
+    def test_migration(self):
+        # the switch to the TID on its new CPU may come before the
+        # switch from it on its previous one
+        self._process(_sched_switch(1, 0, 0, 10),
+                      _sched_switch(2, 1, 0, 10))
+        self.assertEqual(self.state.running_tids, {10: 1})
+
+        self._process(_sched_switch(3, 0, 10, 12))
+        self.assertEqual(self.state.running_tids, {10: 1, 12: 0})
+
+        self._process(_sched_switch(4, 1, 10, 0))
+        self.assertEqual(self.state.running_tids, {12: 0})
+
+    def test_wakeup_running_tid(self):
+        self._process(_sched_switch(1, 0, 0, 10),
+                      _sched_wakeup(2, 1, 10, 30))
+        self.assertIsNone(self.state.tids[10].last_wakeup)
+        self.assertEqual(self.state.tids[10].prio, 20)
+
+    def _wakeup_prio(self, version):
+        self.state.tracer_version = version
+        self._process(_sched_wakeup(1, 0, 10, 120))
+
+        return self.state.tids[10].prio
+
+    def test_wakeup_prio_before_fix(self):
+        self.assertEqual(self._wakeup_prio(Version(2, 7, 0)), 20)
+        self.assertEqual(self.state.tids[10].last_wakeup, 1)
+
+    def test_wakeup_prio_fixed(self):
+        self.assertEqual(self._wakeup_prio(Version(2, 7, 1)), 120)
+
+    def test_wakeup_prio_unknown_version(self):
+        self.assertEqual(self._wakeup_prio(None), 120)
+
+    def test_tracer_version_reset(self):
+        self.state.tracer_version = Version(2, 6, 0)
+        self.assertEqual(self.state.wakeup_prio_offset, -100)
+        self.state.tracer_version = Version(2, 8, 0)
+        self.assertEqual(self.state.wakeup_prio_offset, 0)
+        self.state.tracer_version = Version(2, 6, 0)
+        self.state.tracer_version = None
+        self.assertEqual(self.state.wakeup_prio_offset, 0)
+
+
+@unittest.skipIf(automaton is None, 'babeltrace is not available')
+class TestSyscallIoRequests(unittest.TestCase):
+    def setUp(self):
+        self.automaton = automaton.Automaton(IoAnalysis.STATE_NOTIFICATIONS)
+        self.state = self.automaton.state
+        self.exits = []
+        self.state.register_notification_cbs(self, {
+            'io_rq_exit': lambda period_data, io_rq, **kwargs:
+            self.exits.append(io_rq),
+        })
+        self._process(_sched_switch(1, 0, 0, 10))
+
+    def _process(self, *events):
+        for event in events:
+            self.automaton.process_event(event)
+
+    def _syscall_entry(self, timestamp, name, cpu_id=0):
+        return _Event('syscall_entry_' + name, timestamp, cpu_id=cpu_id,
+                      fd=3, count=4096)
+
+    def test_lifecycle(self):
+        self._process(self._syscall_entry(2, 'read'))
+        io_rq = self.state.syscall_io_rqs[10]
+        self.assertIs(io_rq, self.state.tids[10].current_syscall.io_rq)
+
+        self._process(_Event('mm_page_alloc', 3, cpu_id=1))
+        self.assertEqual(io_rq.pages_allocated, 1)
+
+        self._process(_Event('syscall_exit_read', 4, cpu_id=0, ret=4096))
+        self.assertEqual(self.state.syscall_io_rqs, {})
+        self.assertEqual(self.exits, [io_rq])
+        self.assertIsNone(self.state.tids[10].current_syscall)
+
+        # no more I/O request to account the pages for
+        self._process(_Event('mm_page_alloc', 5, cpu_id=1))
+        self.assertEqual(io_rq.pages_allocated, 1)
+
+    def test_replaced_entry(self):
+        # the exit of the read is lost
+        self._process(self._syscall_entry(2, 'read'))
+        read_rq = self.state.syscall_io_rqs[10]
+        self._process(self._syscall_entry(3, 'write'))
+        write_rq = self.state.syscall_io_rqs[10]
+        self.assertIsNot(write_rq, read_rq)
+
+        self._process(_Event('mm_page_alloc', 4, cpu_id=0))
+        self.assertEqual(read_rq.pages_allocated, 0)
+        self.assertEqual(write_rq.pages_allocated, 1)
+
+        # a syscall without I/O request also replaces it
+        self._process(self._syscall_entry(5, 'getpid'))
+        self.assertEqual(self.state.syscall_io_rqs, {})
+
+        self._process(_Event('syscall_exit_getpid', 6, cpu_id=0, ret=10))
+        self.assertEqual(self.exits, [])
+
+    def test_kswapd(self):
+        self._process(self._syscall_entry(2, 'write'),
+                      _sched_switch(3, 1, 0, 11),
+                      self._syscall_entry(4, 'write', cpu_id=1))
+        rq_10 = self.state.syscall_io_rqs[10]
+        rq_11 = self.state.syscall_io_rqs[11]
+
+        # TID 10 wakes kswapd up, which then runs in its place
+        self._process(_Event('mm_vmscan_wakeup_kswapd', 5, cpu_id=0),
+                      _sched_switch(6, 0, 10, 50, 'kswapd0'))
+        self.assertTrue(rq_10.woke_kswapd)
+        self.assertFalse(rq_11.woke_kswapd)
+        self.assertEqual(self.state.tids[50].prev_tid, 10)
+
+        self._process(_Event('mm_page_free', 7, cpu_id=0))
+        self.assertEqual(rq_10.pages_freed, 1)
+        self.assertEqual(rq_11.pages_freed, 0)
+
+        # back to TID 10, still in its syscall
+        self._process(_sched_switch(8, 0, 50, 10),
+                      _Event('mm_page_free', 9, cpu_id=0))
+        self.assertEqual(rq_10.pages_freed, 2)
+        self.assertEqual(rq_11.pages_freed, 0)
+
+
+@unittest.skipIf(automaton is None, 'babeltrace is not available')
+class TestNotificationCbs(unittest.TestCase):
+    def setUp(self):
+        self.state = automaton.State()
+        self.calls = []
+
+    def _cbs(self, *names):
+        return {name: lambda period_data, name=name, **kwargs:
+                self.calls.append((period_data, name, kwargs))
+                for name in names}
+
+    def _send(self, name):
+        del self.calls[:]
+        self.state.send_notification_cb(name, cpu_id=0)
+
+        return [period_data for period_data, _, _ in self.calls]
+
+    def test_clear_several_periods(self):
+        for period_data in ['a', 'b', 'c', 'd']:
+            self.state.register_notification_cbs(
+                period_data, self._cbs('irq_handler_entry', 'softirq_exit'))
+
+        # adjacent subscribers removed one after the other
+        self.state.clear_period_notification_cbs('a')
+        self.state.clear_period_notification_cbs('b')
+        self.state.clear_period_notification_cbs('d')
+
+        self.assertEqual(self._send('irq_handler_entry'), ['c'])
+        self.assertEqual(self._send('softirq_exit'), ['c'])
+        self.assertEqual(self.calls, [('c', 'softirq_exit', {'cpu_id': 0})])
+
+        self.state.clear_period_notification_cbs('c')
+        self.assertFalse(self.state.has_notification_cbs('irq_handler_entry'))
+        self.assertFalse(self.state.has_notification_cbs('softirq_exit'))
+        self.assertEqual(self._send('irq_handler_entry'), [])
+
+    def test_clear_registered_twice(self):
+        self.state.register_notification_cbs('a', self._cbs('syscall_exit'))
+        self.state.register_notification_cbs('a', self._cbs('syscall_exit'))
+        self.state.register_notification_cbs('b', self._cbs('syscall_exit'))
+        self.assertEqual(self._send('syscall_exit'), ['a', 'b'])
+
+        self.state.clear_period_notification_cbs('a')
+        self.assertEqual(self._send('syscall_exit'), ['b'])
+
+    def test_clear_unknown_period(self):
+        self.state.register_notification_cbs('a', self._cbs('syscall_exit'))
+        self.state.clear_period_notification_cbs('b')
+
+        self.assertEqual(self._send('syscall_exit'), ['a'])
+
+    def test_cached_cbs(self):
+        self.assertFalse(self.state.has_notification_cbs('syscall_exit'))
+
+        self.state.register_notification_cbs('a', self._cbs('syscall_exit'))
+        self.assertTrue(self.state.has_notification_cbs('syscall_exit'))
+        self.assertEqual(self._send('syscall_exit'), ['a'])
+
+        # the subscribers resolved by the previous notification are
+        # rebuilt after a subscription
+        self.state.register_notification_cbs(
+            'b', self._cbs('syscall_exit', 'prio_changed'))
+        self.assertEqual(self._send('syscall_exit'), ['a', 'b'])
+        self.assertEqual(self._send('prio_changed'), ['b'])
+
+        # and after an unsubscription
+        self.state.clear_period_notification_cbs('a')
+        self.assertEqual(self._send('syscall_exit'), ['b'])
+        self.state.clear_period_notification_cbs('b')
+        self.assertEqual(self._send('syscall_exit'), [])
+        self.assertFalse(self.state.has_notification_cbs('prio_changed'))
@@ -0,0 +1,115 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+from lttnganalyses.linuxautomaton import block
+
+
+class _Event(dict):
+    def __init__(self, name, timestamp, **fields):
+        super().__init__(fields)
+        self.name = name
+        self.timestamp = timestamp
+
+
+class _State():
+    # The parts of the automaton's state used by the block state
+    # provider
+    def __init__(self):
+        self.disks = {}
+        self.tids = {}
+        self.evicted_block_remaps = 0
+        self.evicted_block_rqs = 0
+        self.completed_requests = []
+
+    def has_notification_cbs(self, name):
+        return name == 'block_rq_complete'
+
+    def send_notification_cb(self, name, **kwargs):
+        if name == 'block_rq_complete':
+            self.completed_requests.append((kwargs['disk'].dev,
+                                            kwargs['req']))
+
+
+class TestBlockStateProvider(unittest.TestCase):
+    def setUp(self):
+        self.state = _State()
+        self.provider = block.BlockStateProvider(self.state)
+
+    def _process(self, name, timestamp, **fields):
+        self.provider.cbs[name](_Event(name, timestamp, **fields))
+
+    def _issue_complete(self, dev, sector, issue_ts, complete_ts):
+        self._process('block_rq_issue', issue_ts, dev=dev, sector=sector,
+                      nr_sector=8, tid=1, rwbs=0, cpu_id=0)
+        self._process('block_rq_complete', complete_ts, dev=dev,
+                      sector=sector, nr_sector=8, cpu_id=0)
+
+    def test_remap(self):
+        # dm device 10 -> partition 2 -> disk 1
+        self._process('block_bio_remap', 1, dev=2, sector=100, old_dev=10,
+                      old_sector=0)
+        self._process('block_bio_remap', 2, dev=1, sector=2148, old_dev=2,
+                      old_sector=100)
+        self._issue_complete(1, 2148, 3, 4)
+
+        self.assertEqual(len(self.state.completed_requests), 1)
+        dev, req = self.state.completed_requests[0]
+        self.assertEqual(dev, 10)
+        self.assertEqual(req.duration, 1)
+        self.assertFalse(self.provider._remap_requests)
+
+    def test_backmerge(self):
+        self._process('block_bio_remap', 1, dev=1, sector=100, old_dev=10,
+                      old_sector=0)
+        self._process('block_bio_backmerge', 2, dev=1, sector=100)
+        self._issue_complete(1, 100, 3, 4)
+
+        self.assertEqual(self.state.completed_requests[0][0], 1)
+
+    def test_evict_old(self):
+        age = block.BlockStateProvider.MAX_REQUEST_AGE
+        self._process('block_bio_remap', 0, dev=1, sector=100, old_dev=10,
+                      old_sector=0)
+        self._process('block_rq_issue', 0, dev=3, sector=8, nr_sector=8,
+                      tid=1, rwbs=0, cpu_id=0)
+        self._process('block_bio_remap', age + 1, dev=1, sector=200,
+                      old_dev=10, old_sector=100)
+        self._process('block_rq_issue', age + 1, dev=3, sector=16,
+                      nr_sector=8, tid=1, rwbs=0, cpu_id=0)
+
+        self.assertEqual(self.state.evicted_block_remaps, 1)
+        self.assertEqual(self.state.evicted_block_rqs, 1)
+        self.assertEqual(list(self.provider._remap_requests), [(1, 200)])
+        self.assertEqual(list(self.state.disks[3].pending_requests), [16])
+
+    def test_evict_many(self):
+        max_count = 4
+        self.provider.MAX_REMAP_REQUESTS = max_count
+
+        for index in range(max_count + 2):
+            self._process('block_bio_remap', index, dev=1,
+                          sector=index * 8, old_dev=10, old_sector=index)
+
+        self.assertEqual(self.state.evicted_block_remaps, 2)
+        self.assertEqual(list(self.provider._remap_requests),
+                         [(1, index * 8) for index in range(2, 6)])
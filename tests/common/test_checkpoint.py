@@ -0,0 +1,103 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import tempfile
+import unittest
+from lttnganalyses.linuxautomaton import checkpoint
+
+
+class _Automaton():
+    def __init__(self, value):
+        self.value = value
+
+    def sends_notifications(self, notifications):
+        return True
+
+
+class _Event():
+    def __init__(self, timestamp):
+        self.timestamp = timestamp
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.trace_path = os.path.join(self.tmpdir.name, 'trace')
+        os.mkdir(self.trace_path)
+
+        with open(os.path.join(self.trace_path, 'metadata'), 'w') as f:
+            f.write('metadata')
+
+        self.checkpoint_dir = checkpoint.get_checkpoint_dir(
+            os.path.join(self.tmpdir.name, 'checkpoints'), self.trace_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, automaton, timestamps, interval=10):
+        writer = checkpoint.CheckpointWriter(
+            automaton, self.checkpoint_dir, self.trace_path, interval)
+
+        for ts in timestamps:
+            writer.process_event(_Event(ts))
+
+        return writer
+
+    def test_load(self):
+        writer = self._write(_Automaton(42), [5, 12, 25])
+
+        self.assertIsNone(writer.error)
+        self.assertIsNone(checkpoint.load_checkpoint(
+            self.checkpoint_dir, self.trace_path, 11))
+
+        ts, automaton = checkpoint.load_checkpoint(
+            self.checkpoint_dir, self.trace_path, 30)
+        self.assertEqual(ts, 25)
+        self.assertEqual(automaton.value, 42)
+
+    def test_trace_dir(self):
+        # the checkpoints are never saved in the trace itself
+        self._write(_Automaton(42), [5, 12])
+
+        self.assertEqual(os.listdir(self.trace_path), ['metadata'])
+        self.assertNotEqual(
+            self.checkpoint_dir,
+            checkpoint.get_checkpoint_dir(
+                os.path.join(self.tmpdir.name, 'checkpoints'),
+                self.tmpdir.name))
+
+    @unittest.skipIf(not hasattr(os, 'getuid'), 'no file ownership')
+    def test_untrusted(self):
+        self._write(_Automaton(42), [5, 12])
+        path = os.path.join(self.checkpoint_dir, '12.ckpt')
+        os.chmod(path, 0o666)
+
+        self.assertIsNone(checkpoint.load_checkpoint(
+            self.checkpoint_dir, self.trace_path, 30))
+
+    def test_unpicklable(self):
+        writer = self._write(_Automaton(lambda: None), [5, 12])
+
+        self.assertIsNotNone(writer.error)
+        self.assertEqual(os.listdir(self.checkpoint_dir), [])
@@ -0,0 +1,157 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import os
+import struct
+import tempfile
+import unittest
+from lttnganalyses.common import ctf_utils
+
+
+_METADATA = '''/* CTF 1.8 */
+
+typealias integer { size = 8; align = 8; signed = false; } := uint8_t;
+typealias integer { size = 32; align = 8; signed = false; } := uint32_t;
+typealias integer { size = 64; align = 8; signed = false; } := uint64_t;
+typealias integer { size = 32; align = 8; signed = false; } := unsigned long;
+
+trace {
+    major = 1;
+    minor = 8;
+    byte_order = le;
+    packet.header := struct {
+        uint32_t magic;
+        uint8_t  uuid[16];
+        uint32_t stream_id;
+    } align(8);
+};
+
+clock {
+    name = "monotonic";
+    freq = 1000000000;
+    offset_s = 10;
+    offset = 5;
+};
+
+struct packet_context {
+    uint64_t timestamp_begin;
+    uint64_t timestamp_end;
+    uint64_t content_size;
+    uint64_t packet_size;
+    uint64_t packet_seq_num;
+    unsigned long events_discarded;
+    uint32_t cpu_id;
+} align(8);
+
+stream {
+    id = 0;
+    packet.context := struct packet_context;
+};
+'''
+
+_PACKET_SIZE = 4096
+
+
+def _make_packet(begin, end, seq_num, discarded, cpu_id):
+    header = struct.pack('<I16sIQQQQQII', 0xc1fc1fc1, b'\0' * 16, 0,
+                         begin, end, _PACKET_SIZE * 8, _PACKET_SIZE * 8,
+                         seq_num, discarded, cpu_id)
+
+    return header + b'\0' * (_PACKET_SIZE - len(header))
+
+
+class TestLostEvents(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.trace_dir = os.path.join(self.tmpdir.name, 'kernel')
+        os.mkdir(self.trace_dir)
+
+        with open(os.path.join(self.trace_dir, 'metadata'), 'w') as f:
+            f.write(_METADATA)
+
+        # 3 events discarded, then 2 more
+        with open(os.path.join(self.trace_dir, 'channel0_0'), 'wb') as f:
+            f.write(_make_packet(100, 200, 0, 3, 0))
+            f.write(_make_packet(200, 300, 1, 5, 0))
+            f.write(_make_packet(300, 400, 2, 5, 0))
+
+        # Packets 1 and 2 are missing
+        with open(os.path.join(self.trace_dir, 'channel0_1'), 'wb') as f:
+            f.write(_make_packet(100, 200, 0, 0, 1))
+            f.write(_make_packet(400, 500, 3, 0, 1))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_packet_layout(self):
+        layout = ctf_utils.read_packet_layout(self.trace_dir)
+
+        self.assertEqual(len(layout.header), 3)
+        self.assertEqual(layout.field_size(0, 'events_discarded'), 32)
+        self.assertEqual(layout.clock_offset, 10 * 1000000000 + 5)
+
+    def test_iter_packets(self):
+        layout = ctf_utils.read_packet_layout(self.trace_dir)
+        path = os.path.join(self.trace_dir, 'channel0_0')
+        packets = list(ctf_utils.iter_packets(path, layout))
+
+        self.assertEqual([p.offset for p in packets],
+                         [0, _PACKET_SIZE, 2 * _PACKET_SIZE])
+        self.assertEqual(packets[1].timestamp_begin, 200)
+        self.assertEqual(packets[2].seq_num, 2)
+
+    def test_lost_events(self):
+        lost_events = ctf_utils.get_lost_events(self.tmpdir.name)
+
+        self.assertEqual(len(lost_events), 2)
+        self.assertEqual(lost_events[0].cpu_id, 0)
+        self.assertEqual(lost_events[0].discarded, 5)
+        self.assertEqual(lost_events[0].missing_packets, 0)
+        self.assertEqual(lost_events[1].cpu_id, 1)
+        self.assertEqual(lost_events[1].discarded, 0)
+        self.assertEqual(lost_events[1].missing_packets, 2)
+
+    def test_unsupported_layout(self):
+        with self.assertRaises(ctf_utils.UnsupportedTraceError):
+            ctf_utils.parse_packet_layout('trace { packet.header := '
+                                          'struct { foo_t bar; }; };')
+
+    def test_packet_index_sidecar(self):
+        index_path = os.path.join(self.trace_dir, ctf_utils.INDEX_FILENAME)
+        index = ctf_utils.get_packet_index(self.trace_dir)
+
+        self.assertTrue(os.path.exists(index_path))
+        self.assertEqual(len(index), 2)
+        # Timestamps are shifted by the clock offset
+        self.assertEqual(index[0].packets[0].timestamp_begin,
+                         10 * 1000000000 + 5 + 100)
+        self.assertEqual(ctf_utils.get_packet_index(self.trace_dir), index)
+
+    def test_first_packet_timestamp(self):
+        offset = 10 * 1000000000 + 5
+
+        self.assertEqual(ctf_utils.get_first_packet_timestamp(
+            self.tmpdir.name, offset + 250), offset + 200)
+        self.assertEqual(ctf_utils.get_first_packet_timestamp(
+            self.tmpdir.name, offset + 350, offset + 450), offset + 300)
+        self.assertIsNone(ctf_utils.get_first_packet_timestamp(
+            self.tmpdir.name, offset + 600))
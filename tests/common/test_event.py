@@ -0,0 +1,91 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import unittest
+
+try:
+    from lttnganalyses.core import event
+except ImportError:
+    # need babeltrace
+    event = None
+
+
+# Mock of a babeltrace event with the CTF scopes of core.event
+class _BtEvent():
+    def __init__(self, scope_fields):
+        self.name = 'sched_switch'
+        self.cycles = 0
+        self.timestamp = 10
+        self._fields = scope_fields
+
+    def field_list_with_scope(self, scope):
+        return list(self._fields.get(scope, {}).keys())
+
+    def field_with_scope(self, field_name, scope):
+        return self._fields.get(scope, {}).get(field_name)
+
+
+@unittest.skipIf(event is None, 'babeltrace is not available')
+class TestEvent(unittest.TestCase):
+    def setUp(self):
+        fields_scope, context_scope = event._CTF_SCOPES[:2]
+        self.bt_ev = _BtEvent({
+            fields_scope: {'prev_tid': 3, 'cpu_id': None},
+            context_scope: {'cpu_id': 2, 'vtid': 3},
+        })
+        self.fields_scope = fields_scope
+        self.context_scope = context_scope
+
+    def _check_fields(self, ev):
+        self.assertEqual(ev['prev_tid'], 3)
+        self.assertEqual(ev['vtid'], 3)
+        # the first scope which has the field has a None value
+        self.assertNotIn('cpu_id', ev)
+        self.assertIsNone(ev.get('cpu_id'))
+        self.assertEqual(ev.field_with_scope('cpu_id', self.context_scope),
+                         2)
+
+    def test_all_fields(self):
+        self._check_fields(event.Event(self.bt_ev))
+
+    def test_first_fields(self):
+        ev = event.Event(self.bt_ev, [
+            (None, 'prev_tid'), (None, 'vtid'), (None, 'cpu_id'),
+            (self.context_scope, 'cpu_id'), (None, 'missing'),
+        ])
+
+        self._check_fields(ev)
+        self.assertEqual(ev.field_list_with_scope(self.fields_scope),
+                         ['prev_tid', 'cpu_id'])
+        self.assertNotIn('missing', ev)
+
+    def test_scope_fields(self):
+        ev = event.Event(self.bt_ev, [
+            (self.fields_scope, 'prev_tid'), (self.fields_scope, 'cpu_id'),
+            (self.context_scope, 'cpu_id'), (self.context_scope, 'vtid'),
+            (self.context_scope, 'missing'),
+        ])
+
+        self._check_fields(ev)
+        self.assertEqual(ev.field_list_with_scope(self.context_scope),
+                         ['cpu_id', 'vtid'])
@@ -0,0 +1,166 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import os
+import tempfile
+import unittest
+from .utils import MockEvent, SCOPE_FIELDS, SCOPE_PACKET_CONTEXT
+
+try:
+    from lttnganalyses.common import event_cache
+except ImportError:
+    # the events need babeltrace (see core.event)
+    event_cache = None
+
+
+def _make_events():
+    events = []
+
+    for i in range(10):
+        events.append(MockEvent('sched_switch', i * 10, {
+            'prev_comm': 'proc%d' % i,
+            'prev_tid': i,
+            'next_tid': i + 1,
+        }, i % 2))
+        events.append(MockEvent('irq_handler_entry', i * 10 + 5, {
+            'irq': i,
+            'name': 'eth0',
+            'addr': 0xffffffff81000000 + i,
+            'load': i / 2,
+            'saddr': [10, 0, 0, i],
+        }, 0))
+
+    return events
+
+
+@unittest.skipIf(event_cache is None, 'babeltrace is not available')
+class TestEventCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmpdir.name, 'cache')
+        self.block_size = event_cache._BLOCK_SIZE
+        event_cache._BLOCK_SIZE = 4
+        self.events = _make_events()
+        writer = event_cache.EventCacheWriter(
+            self.cache_dir, ['sig'],
+            [(SCOPE_FIELDS, None), (SCOPE_PACKET_CONTEXT, ('cpu_id',))])
+
+        for event in self.events:
+            writer.add_event(event)
+
+        writer.finalize()
+
+    def tearDown(self):
+        event_cache._BLOCK_SIZE = self.block_size
+        self.tmpdir.cleanup()
+
+    def test_all_events(self):
+        cache = event_cache.EventCache.open(self.cache_dir, ['sig'])
+        cached_events = list(cache.events())
+
+        self.assertEqual(cache.count, len(self.events))
+        self.assertEqual(len(cached_events), len(self.events))
+
+        for event, cached_event in zip(self.events, cached_events):
+            self.assertEqual(cached_event.name, event.name)
+            self.assertEqual(cached_event.timestamp, event.timestamp)
+
+            for field_name in event.field_list_with_scope(SCOPE_FIELDS):
+                self.assertEqual(cached_event[field_name],
+                                 event.field_with_scope(field_name,
+                                                        SCOPE_FIELDS))
+
+            self.assertEqual(cached_event['cpu_id'],
+                             event.field_with_scope('cpu_id',
+                                                    SCOPE_PACKET_CONTEXT))
+            self.assertNotIn('packet_size', cached_event)
+
+    def test_time_range(self):
+        cache = event_cache.EventCache.open(self.cache_dir, ['sig'])
+        cached_events = list(cache.events(begin_ts=42, end_ts=70))
+
+        self.assertEqual([e.timestamp for e in cached_events],
+                         [45, 50, 55, 60, 65, 70])
+        self.assertEqual(cached_events[0]['irq'], 4)
+        self.assertEqual(cached_events[1]['prev_comm'], 'proc5')
+
+    def test_filter(self):
+        cache_dir = os.path.join(self.tmpdir.name, 'filtered')
+        writer = event_cache.EventCacheWriter(
+            cache_dir, ['sig'], [(SCOPE_FIELDS, None)],
+            lambda name: name.startswith('sched_'))
+
+        for event in self.events:
+            writer.add_event(event)
+
+        writer.finalize()
+        cache = event_cache.EventCache.open(cache_dir, ['sig'])
+        cached_events = list(cache.events())
+
+        self.assertEqual([e.timestamp for e in cached_events],
+                         [e.timestamp for e in self.events])
+        self.assertEqual(cached_events[2]['prev_tid'], 1)
+        self.assertEqual(cached_events[3].name, 'irq_handler_entry')
+        self.assertEqual(len(cached_events[3]), 0)
+        self.assertIsNone(cached_events[3].field_with_scope('irq',
+                                                            SCOPE_FIELDS))
+
+    def test_field_layouts(self):
+        cache_dir = os.path.join(self.tmpdir.name, 'layouts')
+        writer = event_cache.EventCacheWriter(
+            cache_dir, ['sig'], [(SCOPE_FIELDS, None)])
+        events = [
+            MockEvent('sched_waking', 0, {'tid': 1, 'prio': 20}, 0),
+            MockEvent('sched_waking', 1, {'tid': 2, 'prio': 20,
+                                          'target_cpu': 3}, 0),
+            MockEvent('sched_waking', 2, {'tid': 3}, 0),
+        ]
+
+        for event in events:
+            writer.add_event(event)
+
+        writer.finalize()
+        cache = event_cache.EventCache.open(cache_dir, ['sig'])
+        cached_events = list(cache.events())
+
+        self.assertEqual([e['tid'] for e in cached_events], [1, 2, 3])
+        self.assertNotIn('target_cpu', cached_events[0])
+        self.assertEqual(cached_events[1]['target_cpu'], 3)
+        self.assertNotIn('prio', cached_events[2])
+
+    def test_abort(self):
+        writer = event_cache.EventCacheWriter(
+            self.cache_dir, ['other'], [(SCOPE_FIELDS, None)])
+
+        for event in self.events:
+            writer.add_event(event)
+
+        writer.abort()
+
+        self.assertFalse(os.path.exists(self.cache_dir + '.tmp'))
+        self.assertIsNotNone(event_cache.EventCache.open(self.cache_dir,
+                                                         ['sig']))
+
+    def test_stale_cache(self):
+        self.assertIsNone(event_cache.EventCache.open(self.cache_dir,
+                                                      ['other']))
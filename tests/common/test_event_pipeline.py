@@ -0,0 +1,128 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+from .utils import MockEvent, SCOPE_FIELDS, SCOPE_PACKET_CONTEXT
+
+try:
+    from lttnganalyses.common import event_pipeline
+except ImportError:
+    # the events need babeltrace (see core.event)
+    event_pipeline = None
+
+
+_SCOPES = [(SCOPE_FIELDS, None), (SCOPE_PACKET_CONTEXT, ('cpu_id',))]
+
+
+def _read_events(count):
+    for i in range(count):
+        yield MockEvent('sched_switch', i * 10, {
+            'prev_tid': i,
+            'next_tid': i + 1,
+        }, i % 2)
+        yield MockEvent('irq_handler_entry', i * 10 + 5, {
+            'irq': i,
+            'name': 'eth0',
+        }, 0)
+
+
+def _read_events_error(count):
+    yield from _read_events(count)
+    raise ValueError('corrupted packet')
+
+
+def _is_sched_event(name):
+    return name.startswith('sched_')
+
+
+@unittest.skipIf(event_pipeline is None, 'babeltrace is not available')
+class TestBatchEncoder(unittest.TestCase):
+    def test_round_trip(self):
+        encoder = event_pipeline.BatchEncoder(_SCOPES)
+        decoder = event_pipeline.BatchDecoder()
+        events = []
+
+        for ev in _read_events(3):
+            encoder.add_event(ev)
+
+            if len(encoder) == 4:
+                events += decoder.decode(encoder.flush())
+
+        events += decoder.decode(encoder.flush())
+
+        self.assertEqual(len(events), 6)
+        self.assertEqual([ev.timestamp for ev in events],
+                         [0, 5, 10, 15, 20, 25])
+        self.assertEqual(events[2].name, 'sched_switch')
+        self.assertEqual(events[2]['next_tid'], 2)
+        self.assertEqual(events[2]['cpu_id'], 1)
+        self.assertNotIn('packet_size', events[2])
+        self.assertEqual(events[5].field_with_scope('name', SCOPE_FIELDS),
+                         'eth0')
+        self.assertEqual(events[5].field_list_with_scope(SCOPE_FIELDS),
+                         ['irq', 'name'])
+        self.assertEqual(events[5].field_list_with_scope(42), [])
+        self.assertEqual(events[5].get('next_tid', -1), -1)
+
+    def test_filter(self):
+        encoder = event_pipeline.BatchEncoder(_SCOPES, _is_sched_event)
+
+        for ev in _read_events(3):
+            encoder.add_event(ev)
+
+        events = list(event_pipeline.BatchDecoder().decode(encoder.flush()))
+
+        self.assertEqual([ev.name for ev in events],
+                         ['sched_switch', 'irq_handler_entry'] * 3)
+        self.assertEqual([ev.timestamp for ev in events],
+                         [0, 5, 10, 15, 20, 25])
+        self.assertEqual(events[2]['prev_tid'], 1)
+        self.assertEqual(len(events[3]), 0)
+        self.assertIsNone(events[3].field_with_scope('irq', SCOPE_FIELDS))
+
+
+@unittest.skipIf(event_pipeline is None, 'babeltrace is not available')
+class TestEventPipeline(unittest.TestCase):
+    def test_events(self):
+        pipeline = event_pipeline.EventPipeline(
+            _read_events, (100,), _SCOPES, _is_sched_event, batch_size=16)
+        events = list(pipeline.events())
+
+        self.assertEqual(len(events), 200)
+        self.assertEqual(events[-1].timestamp, 995)
+        self.assertEqual(events[-2]['prev_tid'], 99)
+        self.assertNotIn('irq', events[-1])
+
+    def test_early_stop(self):
+        pipeline = event_pipeline.EventPipeline(
+            _read_events, (100000,), _SCOPES, batch_size=16)
+        events = pipeline.events()
+
+        self.assertEqual(next(events).timestamp, 0)
+        events.close()
+
+    def test_error(self):
+        pipeline = event_pipeline.EventPipeline(
+            _read_events_error, (10,), _SCOPES, batch_size=4)
+
+        with self.assertRaises(event_pipeline.EventPipelineError):
+            list(pipeline.events())
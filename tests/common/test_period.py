@@ -0,0 +1,709 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import collections.abc
+import itertools
+import operator
+import random
+import unittest
+
+try:
+    import babeltrace as bt
+    from lttnganalyses.core import event, period
+except ImportError:
+    # need babeltrace
+    period = None
+
+
+# Mock of a babeltrace event: `fields` and `context` are the fields
+# of its payload and stream event context scopes.
+class _BtEvent(collections.abc.Mapping):
+    def __init__(self, name, timestamp, fields, context=None):
+        self.name = name
+        self.timestamp = timestamp
+        self.cycles = timestamp
+        self._scopes = {
+            bt.CTFScope.EVENT_FIELDS: fields,
+            bt.CTFScope.STREAM_EVENT_CONTEXT: context or {},
+        }
+
+    def field_list_with_scope(self, scope):
+        return list(self._scopes.get(scope, {}).keys())
+
+    def field_with_scope(self, field_name, scope):
+        return self._scopes.get(scope, {}).get(field_name)
+
+    def __getitem__(self, field_name):
+        for scope_fields in self._scopes.values():
+            if field_name in scope_fields:
+                return scope_fields[field_name]
+
+        raise KeyError(field_name)
+
+    def __iter__(self):
+        for scope_fields in self._scopes.values():
+            yield from scope_fields
+
+    def __len__(self):
+        return sum(len(scope_fields) for scope_fields in self._scopes.values())
+
+
+def _field(name, dyn_scope=None):
+    child = period.EventFieldName(name)
+
+    if dyn_scope is not None:
+        child = period.DynamicScope(dyn_scope, child)
+
+    return period.EventScope(child)
+
+
+def _name():
+    return period.EventScope(period.EventName())
+
+
+def _begin(event_scope):
+    return period.BeginScope(event_scope)
+
+
+def _parent(event_scope):
+    return period.ParentScope(period.BeginScope(event_scope))
+
+
+# Reference evaluation of the expressions, as done by the period
+# engine before they were compiled: the compiled expressions must
+# match exactly the same events.
+if period is not None:
+    _REF_DYN_SCOPES = {
+        period.DynScope.TPH: bt.CTFScope.TRACE_PACKET_HEADER,
+        period.DynScope.SPC: bt.CTFScope.STREAM_PACKET_CONTEXT,
+        period.DynScope.SEH: bt.CTFScope.STREAM_EVENT_HEADER,
+        period.DynScope.SEC: bt.CTFScope.STREAM_EVENT_CONTEXT,
+        period.DynScope.EC: bt.CTFScope.EVENT_CONTEXT,
+        period.DynScope.EP: bt.CTFScope.EVENT_FIELDS,
+    }
+    _REF_COMP_FNS = {
+        period.Eq: operator.eq,
+        period.Lt: operator.lt,
+        period.LtEq: operator.le,
+        period.Gt: operator.gt,
+        period.GtEq: operator.ge,
+    }
+
+
+def _ref_resolve_event_expr(evt, event_scope):
+    if evt is None:
+        return
+
+    expr = event_scope.child
+
+    if type(expr) is period.EventName:
+        return evt.name
+
+    if type(expr) is period.DynamicScope:
+        return evt.field_with_scope(expr.child.name,
+                                    _REF_DYN_SCOPES[expr.dyn_scope])
+
+    if expr.name in evt:
+        return evt[expr.name]
+
+
+def _ref_resolve_expr(expr, evt, begin_evt, parent_begin_evt):
+    if type(expr) is period.ParentScope:
+        return _ref_resolve_event_expr(parent_begin_evt, expr.child.child)
+
+    if type(expr) is period.BeginScope:
+        return _ref_resolve_event_expr(begin_evt, expr.child)
+
+    if type(expr) is period.EventScope:
+        return _ref_resolve_event_expr(evt, expr)
+
+    return expr.value
+
+
+def _ref_matches(expr, evt, begin_evt, parent_begin_evt):
+    evts = evt, begin_evt, parent_begin_evt
+
+    if type(expr) is period.LogicalAnd:
+        return _ref_matches(expr.lh_expr, *evts) and \
+            _ref_matches(expr.rh_expr, *evts)
+
+    if type(expr) is period.LogicalOr:
+        return _ref_matches(expr.lh_expr, *evts) or \
+            _ref_matches(expr.rh_expr, *evts)
+
+    if type(expr) is period.LogicalNot:
+        return not _ref_matches(expr.expr, *evts)
+
+    lh_value = _ref_resolve_expr(expr.lh_expr, *evts)
+    rh_value = _ref_resolve_expr(expr.rh_expr, *evts)
+
+    if lh_value is None or rh_value is None:
+        return False
+
+    if type(lh_value) is int and type(rh_value) is float:
+        rh_value = int(rh_value)
+
+    if type(lh_value) is not type(rh_value):
+        return False
+
+    if type(expr) is period.GlobEq:
+        return expr.regex.match(lh_value) is not None
+
+    return _REF_COMP_FNS[type(expr)](lh_value, rh_value)
+
+
+def _ref_get_captures(captures_exprs, evt, begin_evt, parent_begin_evt):
+    return {name: _ref_resolve_expr(expr, evt, begin_evt, parent_begin_evt)
+            for name, expr in captures_exprs.items()}
+
+
+class _RefPeriod():
+    def __init__(self, definition, parent, begin_evt, begin_captures):
+        self.definition = definition
+        self.parent = parent
+        self.begin_evt = event.Event(begin_evt)
+        self.end_evt = None
+        self.completed = False
+        self.children = []
+        self.begin_captures = begin_captures
+        self.end_captures = {}
+
+    @property
+    def parent_begin_evt(self):
+        if self.parent is not None:
+            return self.parent.begin_evt
+
+
+# Reference period engine: every period definition is evaluated for
+# every event, and every open period is checked for its end.
+class _RefPeriodEngine():
+    def __init__(self, registry, end_cb):
+        self._registry = registry
+        self._end_cb = end_cb
+        self._root_periods = []
+
+    def _add_periods(self, parent, periods, period_defs, evt):
+        parent_begin_evt = None
+
+        if parent is not None:
+            parent_begin_evt = parent.begin_evt
+
+        for period_def in period_defs:
+            if _ref_matches(period_def.begin_expr, evt, evt,
+                            parent_begin_evt):
+                captures = _ref_get_captures(
+                    period_def.begin_captures_exprs, evt, evt,
+                    parent_begin_evt)
+                periods.append(_RefPeriod(period_def, parent, evt,
+                                          captures))
+
+        for child in periods:
+            self._add_periods(child, child.children,
+                              child.definition.children, evt)
+
+    def _end_periods(self, periods, evt):
+        for child in periods:
+            self._end_periods(child.children, evt)
+
+        ended = []
+
+        for child in periods:
+            evts = evt, child.begin_evt, child.parent_begin_evt
+
+            if _ref_matches(child.definition.end_expr, *evts):
+                child.end_captures = _ref_get_captures(
+                    child.definition.end_captures_exprs, *evts)
+                ended.append(child)
+
+        for child in ended:
+            child.end_evt = evt
+            child.completed = True
+            self._remove_periods(child.children, evt)
+            self._end_cb(child)
+            periods.remove(child)
+
+    def _remove_periods(self, periods, evt):
+        for child in periods:
+            self._remove_periods(child.children, evt)
+            child.end_evt = evt
+            self._end_cb(child)
+
+        del periods[:]
+
+    def process_event(self, evt):
+        self._end_periods(self._root_periods, evt)
+        self._add_periods(None, self._root_periods,
+                          self._registry.root_period_defs, evt)
+
+    def remove_all_periods(self):
+        self._remove_periods(self._root_periods, None)
+
+
+def _make_registry(period_defs):
+    # `period_defs`: (parent name, name, begin expression, end
+    # expression[, begin captures, end captures]) tuples
+    registry = period.PeriodDefinitionRegistry()
+
+    for parent_name, name, begin_expr, end_expr, *captures in period_defs:
+        begin_captures, end_captures = captures or ({}, {})
+        registry.add_period_def(parent_name, name, begin_expr, end_expr,
+                                begin_captures, end_captures)
+
+    return registry
+
+
+def _get_period_id(p):
+    if p is None:
+        return
+
+    return p.definition.name, p.begin_evt.timestamp, \
+        _get_period_id(p.parent)
+
+
+def _get_ended_period(p):
+    end_ts = None
+
+    if p.end_evt is not None:
+        end_ts = p.end_evt.timestamp
+
+    return repr((_get_period_id(p), end_ts, p.completed,
+                 sorted(p.begin_captures.items()),
+                 sorted(p.end_captures.items())))
+
+
+# Returns the sorted ended periods of the period engine and of the
+# reference one for the events.
+def _run_engines(period_defs, events):
+    ended = []
+    ref_ended = []
+    engine = period.PeriodEngine(_make_registry(period_defs), {
+        period.PeriodEngineCallbackType.PERIOD_BEGIN: lambda p: None,
+        period.PeriodEngineCallbackType.PERIOD_END:
+        lambda p: ended.append(_get_ended_period(p)),
+    })
+    ref_engine = _RefPeriodEngine(
+        _make_registry(period_defs),
+        lambda p: ref_ended.append(_get_ended_period(p)))
+
+    for evt in events:
+        engine.process_event(evt)
+        ref_engine.process_event(evt)
+
+    engine.remove_all_periods()
+    ref_engine.remove_all_periods()
+
+    return sorted(ended), sorted(ref_ended)
+
+
+def _make_events(names, fields, count, seed=0):
+    # `fields`: field name to the candidate values (None: missing)
+    rand = random.Random(seed)
+    events = []
+
+    for timestamp in range(count):
+        evt_fields = {}
+
+        for field_name, values in sorted(fields.items()):
+            value = rand.choice(values)
+
+            if value is not None:
+                evt_fields[field_name] = value
+
+        events.append(_BtEvent(rand.choice(names), timestamp, evt_fields))
+
+    return events
+
+
+@unittest.skipIf(period is None, 'babeltrace is not available')
+class TestExpressionCompiler(unittest.TestCase):
+    def setUp(self):
+        self.evt = _BtEvent('sched_switch', 10, {
+            'tid': 3, 'load': 3.0, 'ratio': 2.5, 'comm': 'bash',
+            'str_tid': '3',
+        }, {'tid': 7, 'vtid': 3})
+        self.begin_evt = event.Event(_BtEvent('sched_wakeup', 5, {
+            'tid': 3, 'load': 2.9, 'comm': 'ba*',
+        }))
+        self.parent_begin_evt = event.Event(_BtEvent('irq_handler_entry', 1, {
+            'tid': 4, 'irq': 3.5,
+        }))
+
+    def _matches(self, expr, evt=None, begin_evt=None,
+                 parent_begin_evt=None):
+        if evt is None:
+            evt = self.evt
+
+        compiler = period._ExpressionCompiler([])
+        matches = compiler.compile_expr(expr)(evt, begin_evt,
+                                              parent_begin_evt)
+        self.assertEqual(matches,
+                         _ref_matches(expr, evt, begin_evt,
+                                      parent_begin_evt),
+                         repr(expr))
+
+        return matches
+
+    def test_int_float_casts(self):
+        # a float compared to an int field is cast to an int
+        self.assertTrue(self._matches(period.Eq(_field('tid'),
+                                                period.Number(3.7))))
+        self.assertFalse(self._matches(period.Lt(_field('tid'),
+                                                 period.Number(3.9))))
+        self.assertTrue(self._matches(period.GtEq(_field('tid'),
+                                                  period.Number(3.9))))
+        # but not an int compared to a float field
+        self.assertFalse(self._matches(period.Eq(_field('load'),
+                                                 period.Number(3))))
+        self.assertTrue(self._matches(period.Eq(_field('load'),
+                                                period.Number(3.0))))
+        self.assertTrue(self._matches(period.Eq(_field('tid'),
+                                                _field('load'))))
+        self.assertFalse(self._matches(period.Eq(_field('load'),
+                                                 _field('tid'))))
+        self.assertTrue(self._matches(period.Eq(period.Number(3),
+                                                _field('load'))))
+        self.assertFalse(self._matches(period.Eq(period.Number(3.0),
+                                                 _field('tid'))))
+
+    def test_mixed_types(self):
+        self.assertFalse(self._matches(period.Eq(_field('str_tid'),
+                                                 period.Number(3))))
+        self.assertFalse(self._matches(period.Eq(_field('tid'),
+                                                 period.String('3'))))
+        self.assertFalse(self._matches(period.Lt(_field('comm'),
+                                                 period.Number(4))))
+        self.assertFalse(self._matches(period.GtEq(_field('tid'),
+                                                   _field('str_tid'))))
+        self.assertTrue(self._matches(period.LogicalNot(
+            period.Eq(_field('tid'), _field('str_tid')))))
+
+    def test_globs(self):
+        self.assertTrue(self._matches(period.GlobEq(_field('comm'),
+                                                    period.String('ba*'))))
+        self.assertTrue(self._matches(period.GlobEq(_field('comm'),
+                                                    period.String('b?sh'))))
+        self.assertFalse(self._matches(period.GlobEq(_field('comm'),
+                                                     period.String('z*'))))
+        self.assertTrue(self._matches(period.GlobEq(
+            _name(), period.String('sched_*'))))
+        # the pattern only applies to strings
+        self.assertFalse(self._matches(period.GlobEq(_field('tid'),
+                                                     period.String('*'))))
+        self.assertFalse(self._matches(period.GlobEq(_field('missing'),
+                                                     period.String('*'))))
+
+    def test_missing_fields(self):
+        for comp in [period.Eq, period.Lt, period.LtEq, period.Gt,
+                     period.GtEq]:
+            self.assertFalse(self._matches(comp(_field('missing'),
+                                                period.Number(3))))
+            self.assertFalse(self._matches(comp(_field('tid'),
+                                                _field('missing'))))
+
+        self.assertTrue(self._matches(period.LogicalNot(
+            period.Eq(_field('missing'), period.Number(3)))))
+        # only in another scope
+        self.assertFalse(self._matches(period.Eq(
+            _field('vtid', period.DynScope.EP), period.Number(3))))
+
+    def test_dynamic_scopes(self):
+        # the automatic scope is the first one which has the field
+        self.assertTrue(self._matches(period.Eq(_field('tid'),
+                                                period.Number(3))))
+        self.assertTrue(self._matches(period.Eq(
+            _field('tid', period.DynScope.SEC), period.Number(7))))
+        self.assertTrue(self._matches(period.Eq(
+            _field('tid', period.DynScope.EP), period.Number(3))))
+        self.assertTrue(self._matches(period.Eq(
+            _field('vtid'), _field('tid', period.DynScope.EP))))
+
+    def test_begin_parent_scopes(self):
+        evts = self.evt, self.begin_evt, self.parent_begin_evt
+        begin_tid = period.Eq(_field('tid'), _begin(_field('tid')))
+        parent_tid = period.Eq(_field('tid'), _parent(_field('tid')))
+        parent_irq = period.Eq(_field('tid'), _parent(_field('irq')))
+        begin_name = period.Eq(_begin(_name()),
+                               period.String('sched_wakeup'))
+
+        self.assertTrue(self._matches(begin_tid, *evts))
+        self.assertFalse(self._matches(parent_tid, *evts))
+        self.assertTrue(self._matches(parent_irq, *evts))
+        self.assertTrue(self._matches(begin_name, *evts))
+        # the value of a field is not a glob pattern
+        self.assertFalse(self._matches(period.Eq(_field('comm'),
+                                                 _begin(_field('comm'))),
+                                       *evts))
+        self.assertTrue(self._matches(period.Gt(_begin(_field('load')),
+                                                _field('ratio')), *evts))
+        self.assertTrue(self._matches(period.Lt(_begin(_field('load')),
+                                                _parent(_field('irq'))),
+                                      *evts))
+
+        # no begin or parent event
+        for expr in [begin_tid, parent_irq, begin_name]:
+            self.assertFalse(self._matches(expr, self.evt))
+            self.assertTrue(self._matches(period.LogicalNot(expr),
+                                          self.evt))
+
+    def test_old_semantics(self):
+        values = [
+            _field('tid'), _field('load'), _field('ratio'), _field('comm'),
+            _field('str_tid'), _field('missing'), _name(),
+            _field('tid', period.DynScope.SEC),
+            _field('vtid', period.DynScope.EP),
+            _begin(_field('tid')), _begin(_field('load')),
+            _begin(_field('comm')), _begin(_name()),
+            _parent(_field('tid')), _parent(_field('irq')),
+            period.Number(3), period.Number(3.0), period.Number(3.7),
+            period.Number(-1), period.String('3'), period.String('bash'),
+        ]
+        evts_list = [
+            (self.evt, self.begin_evt, self.parent_begin_evt),
+            (self.begin_evt, self.begin_evt, None),
+            (self.parent_begin_evt, self.evt, self.begin_evt),
+            (self.evt, None, None),
+        ]
+
+        for lh_expr, rh_expr in itertools.product(values, repeat=2):
+            comps = [period.Eq, period.Lt, period.LtEq, period.Gt,
+                     period.GtEq]
+
+            if type(rh_expr) is period.String:
+                comps.append(period.GlobEq)
+
+            for comp, evts in itertools.product(comps, evts_list):
+                self._matches(comp(lh_expr, rh_expr), *evts)
+
+
+@unittest.skipIf(period is None, 'babeltrace is not available')
+class TestBeginEventNameIndex(unittest.TestCase):
+    def setUp(self):
+        def name_is(name):
+            return period.Eq(_name(), period.String(name))
+
+        tid_is_1 = period.Eq(_field('tid'), period.Number(1))
+        self.period_defs = [
+            (None, 'name', name_is('a'), name_is('c')),
+            (None, 'no_name', tid_is_1, name_is('c')),
+            (None, 'or', period.LogicalOr(name_is('a'), name_is('b')),
+             period.LogicalNot(tid_is_1)),
+            (None, 'or_any', period.LogicalOr(name_is('a'), tid_is_1),
+             name_is('b')),
+            (None, 'not', period.LogicalNot(name_is('a')), name_is('a')),
+            (None, 'and_not', period.LogicalAnd(
+                name_is('b'), period.LogicalNot(name_is('a'))),
+             name_is('c')),
+            (None, 'and_or', period.LogicalAnd(
+                name_is('a'), period.LogicalOr(tid_is_1, name_is('b'))),
+             name_is('c')),
+            (None, 'glob', period.GlobEq(_name(), period.String('sched_*')),
+             tid_is_1),
+            (None, 'rev', period.Eq(period.String('c'), _name()),
+             name_is('a')),
+            ('name', 'child', period.LogicalNot(name_is('c')), name_is('b')),
+        ]
+
+    def test_candidates(self):
+        registry = _make_registry(self.period_defs)
+        index = period._BeginEventNameIndex(registry.root_period_defs)
+        # without a name constraint, with a negation or a
+        # disjunction with any event, all the events are candidates
+        any_names = {'no_name', 'or_any', 'not'}
+        expected = {
+            'a': {'name', 'or', 'and_or'} | any_names,
+            'b': {'or', 'and_not'} | any_names,
+            'c': {'rev'} | any_names,
+            'sched_switch': {'glob'} | any_names,
+            'd': any_names,
+        }
+
+        for name, period_def_names in expected.items():
+            self.assertEqual({period_def.name for period_def in
+                              index.get_period_defs(name)},
+                             period_def_names, name)
+
+        # memoized
+        self.assertIs(index.get_period_defs('a'), index.get_period_defs('a'))
+
+    def test_matching(self):
+        events = _make_events(['a', 'b', 'c', 'd', 'sched_switch'],
+                              {'tid': [1, 2, 1.0, None]}, 200)
+        ended, ref_ended = _run_engines(self.period_defs, events)
+
+        self.assertEqual(ended, ref_ended)
+        self.assertGreater(len(ended), 100)
+
+
+@unittest.skipIf(period is None, 'babeltrace is not available')
+class TestEndKeys(unittest.TestCase):
+    def setUp(self):
+        def name_is(name):
+            return period.Eq(_name(), period.String(name))
+
+        def end_expr(*exprs):
+            return period.create_conjunction_from_exprs(
+                [name_is('exit')] + list(exprs))
+
+        tid_corr = period.Eq(_field('tid'), _begin(_field('tid')))
+        cpu_corr = period.Eq(_begin(_field('cpu_id')), _field('cpu_id'))
+        self.period_defs = [
+            (None, 'corr', name_is('entry'), end_expr(tid_corr)),
+            (None, 'multi', name_is('entry'), end_expr(cpu_corr, tid_corr),
+             {'tid': _field('tid')}, {'end_tid': _field('tid')}),
+            (None, 'lt', name_is('entry'),
+             end_expr(period.Lt(_field('tid'), _begin(_field('tid'))))),
+            (None, 'or', name_is('entry'),
+             end_expr(period.LogicalOr(tid_corr, cpu_corr))),
+            (None, 'not', name_is('entry'),
+             end_expr(period.LogicalNot(tid_corr))),
+            (None, 'no_corr', name_is('entry'), name_is('exit')),
+            (None, 'parent', name_is('begin'), name_is('end')),
+            ('parent', 'child', name_is('entry'), end_expr(
+                period.Eq(_field('cpu_id'), _parent(_field('cpu_id'))),
+                tid_corr)),
+        ]
+
+    def test_keys(self):
+        compiler = period._ExpressionCompiler([])
+        get_evt_key, get_begin_key = compiler.compile_end_key_getters(
+            self.period_defs[1][3])
+        begin_evt = event.Event(_BtEvent('entry', 0,
+                                         {'tid': 3, 'cpu_id': 1}))
+
+        self.assertEqual(get_begin_key(begin_evt, None), (1, 3))
+
+        for fields, key in [
+            ({'tid': 3, 'cpu_id': 1}, (1, 3)),
+            ({'tid': 'x', 'cpu_id': 1}, (1, 'x')),
+            # only the values equal to a value of the same type
+            ({'tid': 3.0, 'cpu_id': 1}, None),
+            ({'tid': True, 'cpu_id': 1}, None),
+            ({'tid': None, 'cpu_id': 1}, None),
+            ({'cpu_id': 1}, None),
+        ]:
+            self.assertEqual(get_evt_key(_BtEvent('exit', 1, fields)), key,
+                             fields)
+
+        self.assertIsNone(compiler.compile_end_key_getters(
+            self.period_defs[4][3]))
+
+    def test_matching(self):
+        # int fields also end the periods of which the begin field is
+        # a float with the same integer part, but not the other way
+        # around
+        events = _make_events(
+            ['entry', 'exit', 'begin', 'end'],
+            {'tid': [1, 2, 1.0, 2.5, '1', None], 'cpu_id': [0, 1, None]},
+            500)
+        ended, ref_ended = _run_engines(self.period_defs, events)
+
+        self.assertEqual(ended, ref_ended)
+        self.assertGreater(len(ended), 300)
+
+    def test_float_begin_key(self):
+        events = [
+            _BtEvent('entry', 0, {'tid': 1.5}),
+            _BtEvent('entry', 1, {'tid': 1}),
+            _BtEvent('exit', 2, {'tid': 1}),
+        ]
+        ended, ref_ended = _run_engines(self.period_defs[:1], events)
+
+        # both periods end, the int TID matching the float one cast
+        self.assertEqual(ended, ref_ended)
+        self.assertEqual(ended, [
+            repr((('corr', 0, None), 2, True, [], [])),
+            repr((('corr', 1, None), 2, True, [], [])),
+        ])
+
+
+@unittest.skipIf(period is None, 'babeltrace is not available')
+class TestSharedSubexpressions(unittest.TestCase):
+    def setUp(self):
+        def tid_is_3():
+            # distinct but identical expressions
+            return period.Eq(_field('tid'), period.Number(3))
+
+        def name_is(name):
+            return period.Eq(_name(), period.String(name))
+
+        self.period_defs = [
+            (None, 'a', period.LogicalAnd(name_is('a'), tid_is_3()),
+             period.LogicalAnd(tid_is_3(), period.Eq(
+                 _field('cpu_id'), _begin(_field('cpu_id')))),
+             {'cpu_id': _field('cpu_id')}, {'cpu_id': _field('cpu_id')}),
+            (None, 'b', period.LogicalOr(tid_is_3(), period.Gt(
+                _field('cpu_id'), period.Number(1))),
+             period.LogicalNot(tid_is_3()),
+             {'tid': _field('tid')}, {}),
+            ('b', 'b_child', period.LogicalAnd(name_is('b'), tid_is_3()),
+             period.Eq(_field('cpu_id'), _parent(_field('cpu_id')))),
+        ]
+        self.registry = _make_registry(self.period_defs)
+
+    def test_shared(self):
+        period_defs = [self.registry.get_period_def(name)
+                       for name in ['a', 'b', 'b_child']]
+        compiler = period._ExpressionCompiler(period_defs)
+        a_def, b_def, child_def = period_defs
+        a_begin = compiler.compile_expr(a_def.begin_expr)
+        a_end = compiler.compile_expr(a_def.end_expr)
+        b_begin = compiler.compile_expr(b_def.begin_expr)
+        b_end = compiler.compile_expr(b_def.end_expr)
+        child_begin = compiler.compile_expr(child_def.begin_expr)
+
+        self.assertIs(compiler.compile_expr(a_def.begin_expr.rh_expr),
+                      compiler.compile_expr(b_def.end_expr.expr))
+
+        begin_evt = event.Event(_BtEvent('a', 0, {'tid': 3, 'cpu_id': 1}))
+        evts = [
+            _BtEvent('a', 1, {'tid': 3, 'cpu_id': 1}),
+            _BtEvent('a', 2, {'tid': 4, 'cpu_id': 1}),
+            # same values, other event
+            _BtEvent('a', 3, {'tid': 4, 'cpu_id': 1}),
+            _BtEvent('b', 4, {'tid': 3, 'cpu_id': 2}),
+            _BtEvent('b', 5, {'cpu_id': 2}),
+            _BtEvent('b', 6, {'tid': 3.0, 'cpu_id': 2}),
+        ]
+        # each event evaluated twice in a row, then in reverse order
+        evts = [evt for evt in evts for _ in range(2)] + evts[::-1]
+
+        for evt in evts:
+            for expr, matches, begin in [
+                (a_def.begin_expr, a_begin, evt),
+                (a_def.end_expr, a_end, begin_evt),
+                (b_def.begin_expr, b_begin, evt),
+                (b_def.end_expr, b_end, begin_evt),
+                (child_def.begin_expr, child_begin, evt),
+            ]:
+                self.assertEqual(matches(evt, begin, begin_evt),
+                                 _ref_matches(expr, evt, begin, begin_evt),
+                                 (expr, evt.timestamp))
+
+    def test_matching(self):
+        events = _make_events(['a', 'b', 'c'],
+                              {'tid': [3, 4, 3.0, None],
+                               'cpu_id': [0, 1, 2, None]}, 300)
+        ended, ref_ended = _run_engines(self.period_defs, events)
+
+        self.assertEqual(ended, ref_ended)
+        self.assertGreater(len(ended), 100)
@@ -0,0 +1,80 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import statistics
+import unittest
+
+try:
+    from lttnganalyses.core import periods
+except ImportError:
+    # the core analyses need babeltrace
+    periods = None
+
+
+class _PeriodEvent():
+    def __init__(self, duration):
+        self.duration = duration
+
+
+@unittest.skipIf(periods is None, 'babeltrace is not available')
+class TestPeriodStats(unittest.TestCase):
+    def test_filtered_stats(self):
+        period_stats = periods.PeriodStats(
+            'switch', retain_periods=False,
+            duration_filter=lambda duration: 10 <= duration <= 30)
+
+        for duration in [5, 10, 20, 30, 40]:
+            period_stats.update_stats(_PeriodEvent(duration))
+
+        self.assertEqual(period_stats.count, 5)
+        self.assertEqual(period_stats.min_duration, 5)
+        self.assertEqual(period_stats.max_duration, 40)
+        self.assertEqual(period_stats.period_list, [])
+
+        filtered_stats = period_stats.filtered_stats
+        self.assertEqual(filtered_stats.count, 3)
+        self.assertEqual(filtered_stats.min, 10)
+        self.assertEqual(filtered_stats.max, 30)
+        self.assertEqual(filtered_stats.total, 60)
+        self.assertAlmostEqual(filtered_stats.stdev, 10)
+        self.assertEqual(period_stats.filtered_duration_hist.count, 3)
+
+    def test_duration_stats(self):
+        durations = [5, 10, 20, 30, 40]
+        period_stats = periods.PeriodStats('switch')
+
+        for duration in durations:
+            period_stats.update_stats(_PeriodEvent(duration))
+
+        self.assertEqual(period_stats.count, 5)
+        self.assertEqual(period_stats.min_duration, 5)
+        self.assertEqual(period_stats.max_duration, 40)
+        self.assertEqual(period_stats.total_duration, 105)
+        self.assertAlmostEqual(period_stats.stdev,
+                               statistics.stdev(durations))
+
+    def test_no_filter(self):
+        period_stats = periods.PeriodStats('switch')
+        period_stats.update_stats(_PeriodEvent(5))
+
+        self.assertIsNone(period_stats.filtered_stats)
+        self.assertEqual(len(period_stats.period_list), 1)
@@ -0,0 +1,86 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import collections
+import unittest
+from lttnganalyses.core import records
+
+
+_Request = collections.namedtuple('_Request', ['begin_ts', 'size', 'name'])
+
+
+class _RequestStore(records.RecordStore):
+    _FIELDS = list(_Request._fields)
+    _STRING_FIELDS = frozenset(['name'])
+    _RECORD_TYPE = _Request
+
+
+class TestRecordStore(unittest.TestCase):
+    def test_records(self):
+        requests = [
+            _Request(10, 4096, 'read'),
+            _Request(20, None, 'open'),
+            _Request(30, -1, 'read'),
+            _Request(40, 0, None),
+        ]
+        store = _RequestStore()
+
+        for request in requests:
+            store.append(request)
+
+        self.assertEqual(len(store), 4)
+        self.assertEqual(list(store), requests)
+        self.assertEqual(store[1], requests[1])
+        self.assertEqual(store[-1], requests[-1])
+        self.assertEqual(list(store.take([3, 0])),
+                         [requests[3], requests[0]])
+        self.assertEqual(list(store.column('size')),
+                         [4096, records.NONE, -1, 0])
+        self.assertEqual([store.string(index) for index in
+                          store.column('name')],
+                         ['read', 'open', 'read', None])
+
+        with self.assertRaises(IndexError):
+            store[4]
+
+    def test_chunks(self):
+        count = records._CHUNK_SIZE + 10
+        store = _RequestStore()
+
+        for index in range(count):
+            store.append(_Request(index, index * 2, 'write'))
+
+        self.assertEqual(len(store), count)
+        self.assertEqual(store[count - 1],
+                         _Request(count - 1, (count - 1) * 2, 'write'))
+        self.assertEqual(list(store.column('begin_ts')), list(range(count)))
+        self.assertEqual(sum(1 for request in store), count)
+
+    def test_reset(self):
+        store = _RequestStore()
+        store.append(_Request(10, 4096, 'read'))
+        store.reset()
+
+        self.assertEqual(len(store), 0)
+        self.assertEqual(list(store), [])
+        self.assertEqual(len(store.column('size')), 0)
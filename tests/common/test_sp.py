@@ -0,0 +1,101 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import unittest
+from lttnganalyses.linuxautomaton.sp import EventRouter, resolve_cb
+
+
+class _Event():
+    def __init__(self, name):
+        self.name = name
+
+
+class TestResolveCb(unittest.TestCase):
+    def setUp(self):
+        self.cbs = {
+            'sys_open': 'open',
+            'syscall_entry': 'entry',
+            'syscall_exit': 'exit',
+            'sched_switch': 'switch',
+        }
+
+    def test_exact_name(self):
+        self.assertEqual(resolve_cb(self.cbs, 'sched_switch'), 'switch')
+        self.assertEqual(resolve_cb(self.cbs, 'sys_open'), 'open')
+
+    def test_syscalls(self):
+        self.assertEqual(resolve_cb(self.cbs, 'sys_read'), 'entry')
+        self.assertEqual(resolve_cb(self.cbs, 'syscall_entry_read'),
+                         'entry')
+        self.assertEqual(resolve_cb(self.cbs, 'exit_syscall'), 'exit')
+        self.assertEqual(resolve_cb(self.cbs, 'syscall_exit_read'), 'exit')
+
+    def test_no_syscall_cbs(self):
+        cbs = {'sched_switch': 'switch'}
+
+        self.assertIsNone(resolve_cb(cbs, 'sys_read'))
+        self.assertIsNone(resolve_cb(cbs, 'syscall_exit_read'))
+        self.assertIsNone(resolve_cb(cbs, 'irq_handler_entry'))
+
+
+class TestEventRouter(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def _cb(self, tag):
+        return lambda ev: self.calls.append((tag, ev.name))
+
+    def test_order(self):
+        router = EventRouter([
+            {'syscall_entry': self._cb('a_entry')},
+            {'sched_switch': self._cb('b_switch')},
+            {'sys_open': self._cb('c_open'),
+             'syscall_entry': self._cb('c_entry')},
+        ])
+
+        for name in ['sys_open', 'sched_switch', 'irq_handler_entry',
+                     'syscall_exit_open']:
+            router.process_event(_Event(name))
+
+        self.assertEqual(self.calls, [
+            ('a_entry', 'sys_open'),
+            ('c_open', 'sys_open'),
+            ('b_switch', 'sched_switch'),
+        ])
+        self.assertEqual(router.route('irq_handler_entry'), ())
+
+    def test_add_cbs(self):
+        router = EventRouter([{'sched_switch': self._cb('a_switch')}])
+        router.process_event(_Event('sys_open'))
+        router.process_event(_Event('sched_switch'))
+        router.add_cbs({'syscall_entry': self._cb('b_entry'),
+                        'sched_switch': self._cb('b_switch')})
+        router.process_event(_Event('sys_open'))
+        router.process_event(_Event('sched_switch'))
+
+        self.assertEqual(self.calls, [
+            ('a_switch', 'sched_switch'),
+            ('b_entry', 'sys_open'),
+            ('a_switch', 'sched_switch'),
+            ('b_switch', 'sched_switch'),
+        ])
@@ -0,0 +1,215 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import random
+import statistics
+import unittest
+from lttnganalyses.core import stats
+
+
+class TestRunningStats(unittest.TestCase):
+    def test_empty(self):
+        running_stats = stats.RunningStats()
+
+        self.assertEqual(running_stats.count, 0)
+        self.assertIsNone(running_stats.min)
+        self.assertEqual(running_stats.mean, 0)
+
+    def test_values(self):
+        values = [3, 5, 10, 2, 7]
+        running_stats = stats.RunningStats()
+
+        for value in values:
+            running_stats.update(value)
+
+        self.assertEqual(running_stats.count, 5)
+        self.assertEqual(running_stats.min, 2)
+        self.assertEqual(running_stats.max, 10)
+        self.assertEqual(running_stats.total, 27)
+        self.assertAlmostEqual(running_stats.stdev, statistics.stdev(values))
+
+    def test_repeated_values(self):
+        values = [3, 5, 10, 0, 0, 0]
+        running_stats = stats.RunningStats()
+
+        for value in values[:3]:
+            running_stats.update(value)
+
+        running_stats.update(0, 3)
+
+        self.assertEqual(running_stats.count, 6)
+        self.assertEqual(running_stats.min, 0)
+        self.assertEqual(running_stats.total, 18)
+        self.assertAlmostEqual(running_stats.stdev, statistics.stdev(values))
+
+
+class TestLogLinearHistogram(unittest.TestCase):
+    def test_bucket_bounds(self):
+        hist = stats.LogLinearHistogram(sub_bucket_bits=3)
+
+        for value in range(200):
+            lower, upper = hist._bucket_bounds(hist._bucket_index(value))
+            self.assertLessEqual(lower, value)
+            self.assertLess(value, upper)
+
+            if value >= 8:
+                self.assertLessEqual((upper - lower) / lower, 1 / 4)
+
+    def test_merge(self):
+        rand = random.Random(0)
+        hist = stats.LogLinearHistogram()
+        left = stats.LogLinearHistogram()
+        right = stats.LogLinearHistogram()
+
+        for index in range(1000):
+            value = rand.randint(0, 10 ** 6)
+            hist.update(value)
+
+            if index % 2:
+                left.update(value)
+            else:
+                right.update(value)
+
+        left += right
+        self.assertEqual(list(left.buckets()), list(hist.buckets()))
+        self.assertEqual(left.count, hist.count)
+        self.assertEqual(left.min, hist.min)
+        self.assertEqual(left.max, hist.max)
+        self.assertEqual(left.total, hist.total)
+
+    def test_merge_precision(self):
+        hist = stats.LogLinearHistogram(sub_bucket_bits=4)
+
+        with self.assertRaises(ValueError):
+            hist += stats.LogLinearHistogram(sub_bucket_bits=5)
+
+    def test_rebin_exact(self):
+        # the values below 2^sub_bucket_bits have their own bucket
+        hist = stats.LogLinearHistogram()
+
+        for value in [0, 1, 1, 5, 9, 10, 20, 30, 99, 100]:
+            hist.update(value)
+
+        self.assertEqual(hist.rebin(0, 100, 4), [7, 1, 0, 2])
+        self.assertEqual(hist.rebin(10, 30, 2), [1, 2])
+        self.assertEqual(hist.rebin(0, 0, 4), [0, 0, 0, 0])
+
+    def test_rebin_approximate(self):
+        rand = random.Random(0)
+        values = [rand.randint(10 ** 5, 10 ** 7) for i in range(10000)]
+        min_value = min(values)
+        max_value = max(values)
+        hist = stats.LogLinearHistogram()
+        step = (max_value - min_value) / 10
+        expected_counts = [0] * 10
+
+        for value in values:
+            hist.update(value)
+            index = min(int((value - min_value) / step), 9)
+            expected_counts[index] += 1
+
+        counts = hist.rebin(min_value, max_value, 10)
+        self.assertEqual(sum(counts), len(values))
+
+        for count, expected_count in zip(counts, expected_counts):
+            self.assertAlmostEqual(count, expected_count,
+                                   delta=expected_count / 50)
+
+    def test_update_values(self):
+        rand = random.Random(0)
+        values = [rand.randint(0, 10 ** 12) for i in range(1000)] + \
+            [0, 255, 256, 257, 511, 512, 2 ** 62]
+        expected_hist = stats.LogLinearHistogram()
+
+        for value in values:
+            expected_hist.update(value)
+
+        hist = stats.LogLinearHistogram()
+        hist.update_values(values)
+        self.assertEqual(list(hist.buckets()), list(expected_hist.buckets()))
+
+        if stats.numpy is not None:
+            hist = stats.LogLinearHistogram()
+            hist.update_values(stats.numpy.array(values))
+            self.assertEqual(list(hist.buckets()),
+                             list(expected_hist.buckets()))
+            self.assertEqual((hist.count, hist.min, hist.max, hist.total),
+                             (expected_hist.count, expected_hist.min,
+                              expected_hist.max, expected_hist.total))
+
+    def test_quantile(self):
+        rand = random.Random(0)
+        values = sorted(rand.randint(0, 10 ** 9) for i in range(10000))
+        hist = stats.LogLinearHistogram()
+
+        self.assertIsNone(hist.quantile(0.5))
+
+        for value in values:
+            hist.update(value)
+
+        self.assertEqual(hist.quantile(0), values[0])
+        self.assertEqual(hist.quantile(1), values[-1])
+
+        for q in [0.5, 0.9, 0.99, 0.999]:
+            expected = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(hist.quantile(q), expected,
+                                   delta=expected / 2 ** 8)
+
+    def test_quantile_exact(self):
+        hist = stats.LogLinearHistogram()
+
+        for value in [1, 2, 3, 4, 100]:
+            hist.update(value)
+
+        self.assertEqual(hist.quantile(0.5), 3)
+        self.assertEqual(hist.quantile(0.8), 4)
+        self.assertEqual(hist.quantile(0.9), 100)
+
+
+class TestTopList(unittest.TestCase):
+    def test_top(self):
+        rand = random.Random(0)
+        values = [rand.randint(0, 100) for i in range(1000)]
+        top_list = stats.TopList(10, key=lambda item: item[0])
+
+        for index, value in enumerate(values):
+            top_list.update((value, index))
+
+        expected_items = sorted(((value, index) for index, value in
+                                 enumerate(values)),
+                                key=lambda item: item[0], reverse=True)
+        self.assertEqual(top_list.items, expected_items[:10])
+
+    def test_less_than_limit(self):
+        top_list = stats.TopList(10, key=len)
+
+        for item in ['a', 'ccc', 'bb']:
+            top_list.update(item)
+
+        self.assertEqual(top_list.items, ['ccc', 'bb', 'a'])
+
+    def test_zero_limit(self):
+        top_list = stats.TopList(0, key=len)
+        top_list.update('a')
+
+        self.assertEqual(top_list.items, [])
@@ -0,0 +1,113 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import array
+import math
+import random
+import statistics
+import unittest
+from lttnganalyses.common import stats_utils
+from lttnganalyses.core import stats
+
+
+class TestSummarize(unittest.TestCase):
+    def test_empty(self):
+        summary = stats_utils.summarize([])
+
+        self.assertEqual(summary.count, 0)
+        self.assertIsNone(summary.min)
+        self.assertIsNone(summary.max)
+        self.assertEqual(summary.total, 0)
+        self.assertTrue(math.isnan(summary.stdev))
+
+    def test_single(self):
+        summary = stats_utils.summarize([42])
+
+        self.assertEqual((summary.count, summary.min, summary.max,
+                          summary.total), (1, 42, 42, 42))
+        self.assertTrue(math.isnan(summary.stdev))
+
+    def test_values(self):
+        values = [3, 5, 10, 2, 7]
+
+        for seq in [values, array.array('q', values)]:
+            summary = stats_utils.summarize(seq)
+
+            self.assertEqual((summary.count, summary.min, summary.max,
+                              summary.total), (5, 2, 10, 27))
+            self.assertAlmostEqual(summary.stdev, statistics.stdev(values))
+
+    def test_large_total(self):
+        values = [2 ** 62] * 4
+        summary = stats_utils.summarize(array.array('q', values))
+
+        self.assertEqual(summary.total, 2 ** 64)
+
+
+class TestFilterRange(unittest.TestCase):
+    def test_filter(self):
+        values = [5, 1, 8, 3, 10]
+
+        self.assertEqual(list(stats_utils.filter_range(values)), values)
+        self.assertEqual(list(stats_utils.filter_range(values, 3)),
+                         [5, 8, 3, 10])
+        self.assertEqual(list(stats_utils.filter_range(values, upper=5)),
+                         [5, 1, 3])
+        self.assertEqual(list(stats_utils.filter_range(values, 3, 8)),
+                         [5, 8, 3])
+
+
+class TestUniformCounts(unittest.TestCase):
+    def test_counts(self):
+        values = [0, 1, 2, 2.5, 5, 7, 9.99, 10, 11]
+
+        self.assertEqual(stats_utils.uniform_counts(values, 0, 10, 4),
+                         [3, 1, 2, 2])
+
+    def test_divisor(self):
+        values = [0, 1000, 2000, 2500, 5000, 7000, 9990, 10000]
+
+        self.assertEqual(stats_utils.uniform_counts(values, 0, 10, 4, 1000),
+                         [3, 1, 2, 2])
+
+    def test_below_range(self):
+        with self.assertRaises(ValueError):
+            stats_utils.uniform_counts([0, 1], 5, 10, 5)
+
+
+class TestLogLinearBucketCounts(unittest.TestCase):
+    def test_counts(self):
+        rand = random.Random(0)
+        values = [rand.randint(0, 10 ** 9) for i in range(1000)] + \
+            [0, 127, 128, 255, 256, 2 ** 62]
+        hist = stats.LogLinearHistogram(sub_bucket_bits=7)
+        expected_counts = {}
+
+        for value in values:
+            index = hist._bucket_index(value)
+            expected_counts[index] = expected_counts.get(index, 0) + 1
+
+        self.assertEqual(stats_utils.log_linear_bucket_counts(values, 7),
+                         expected_counts)
+        self.assertEqual(
+            stats_utils.log_linear_bucket_counts(array.array('q', values), 7),
+            expected_counts)
@@ -0,0 +1,48 @@
+# The MIT License (MIT)
+#
+# Copyright (C) 2026 - agent <agent@local>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import collections
+import unittest
+
+try:
+    from lttnganalyses.core import syscalls
+except ImportError:
+    # the core analyses need babeltrace
+    syscalls = None
+
+
+_Syscall = collections.namedtuple('_Syscall', ['duration', 'ret'])
+
+
+@unittest.skipIf(syscalls is None, 'babeltrace is not available')
+class TestSyscallStats(unittest.TestCase):
+    def test_return_count(self):
+        syscall_stats = syscalls.SyscallStats('open')
+
+        for ret in [3, -2, 4, -2, -11, None]:
+            syscall_stats.update_stats(_Syscall(10, ret), keep_event=False)
+
+        # all the successful return values are counted as 0
+        self.assertEqual(syscall_stats.return_count, {0: 2, -2: 2, -11: 1})
+        self.assertEqual(syscall_stats.count, 6)
+        self.assertEqual(syscall_stats.syscalls_list, [])
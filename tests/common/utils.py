@@ -47,3 +47,25 @@ class TimezoneUtils():
             os.environ['TZ'] = self.original_tz
         else:
             del os.environ['TZ']
+
+
+# Scopes of the fields of a MockEvent
+SCOPE_FIELDS = 0
+SCOPE_PACKET_CONTEXT = 1
+
+
+# Mock of babeltrace's Event
+class MockEvent():
+    def __init__(self, name, timestamp, fields, cpu_id):
+        self.name = name
+        self.timestamp = timestamp
+        self._fields = {
+            SCOPE_FIELDS: fields,
+            SCOPE_PACKET_CONTEXT: {'cpu_id': cpu_id, 'packet_size': 4096},
+        }
+
+    def field_list_with_scope(self, scope):
+        return list(self._fields[scope].keys())
+
+    def field_with_scope(self, field_name, scope):
+        return self._fields[scope].get(field_name)